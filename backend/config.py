@@ -4,12 +4,79 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
 FUSEKI_ENDPOINT = os.getenv("FUSEKI_ENDPOINT", "http://localhost:3030/eco-tourism/sparql")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 USE_GEMINI = os.getenv("USE_GEMINI", "false").lower() == "true"
 BACKEND_PORT = int(os.getenv("BACKEND_PORT", "8000"))
+
+# Fuseki HTTP connection pool
+FUSEKI_TIMEOUT = float(os.getenv("FUSEKI_TIMEOUT", "30"))
+FUSEKI_POOL_CONNECTIONS = int(os.getenv("FUSEKI_POOL_CONNECTIONS", "4"))  # nombre d'hôtes gardés en cache
+FUSEKI_POOL_MAXSIZE = int(os.getenv("FUSEKI_POOL_MAXSIZE", "20"))  # connexions keep-alive par hôte
+FUSEKI_POOL_BLOCK = os.getenv("FUSEKI_POOL_BLOCK", "true").lower() == "true"
+FUSEKI_STREAM_CHUNK_SIZE = int(os.getenv("FUSEKI_STREAM_CHUNK_SIZE", "65536"))  # octets lus par bloc en streaming
+FUSEKI_ASYNC_MAX_CONNECTIONS = int(os.getenv("FUSEKI_ASYNC_MAX_CONNECTIONS", "200"))  # requêtes simultanées (client async)
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 
+# SPARQL result cache
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "512"))
+
+# NL -> SPARQL translation cache
+TRANSLATION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "4096"))
+TRANSLATION_CACHE_FILE = os.getenv(
+    "TRANSLATION_CACHE_FILE",
+    os.path.join(_BACKEND_DIR, ".cache", "translations.json"),
+)  # "" = pas de persistance
+
+# Gemini translation (chemin asynchrone)
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))  # appels LLM simultanés
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "8"))  # budget par question (attente comprise)
+
+# Pagination des endpoints de données (LIMIT/OFFSET poussés dans le SPARQL)
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+# POST /batch
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))  # éléments exécutés en parallèle
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "50"))
+
+# Recommandations: requêtes de candidats exécutées en parallèle
+RECOMMENDATION_WORKERS = int(os.getenv("RECOMMENDATION_WORKERS", "3"))
+RECOMMENDATION_BATCH_MAX = int(os.getenv("RECOMMENDATION_BATCH_MAX", "10000"))  # voyageurs par POST /recommendation/batch
+
+# Optimisation d'itinéraire (budget et plafond CO2)
+ITINERARY_BEAM_WIDTH = int(os.getenv("ITINERARY_BEAM_WIDTH", "64"))  # états gardés à chaque étape
+ITINERARY_POOL_SIZE = int(os.getenv("ITINERARY_POOL_SIZE", "64"))  # activités pré-sélectionnées par critère
+ITINERARY_TIME_BUDGET_MS = int(os.getenv("ITINERARY_TIME_BUDGET_MS", "250"))
+CARBON_BATCH_MAX_LEGS = int(os.getenv("CARBON_BATCH_MAX_LEGS", "2000000"))  # trajets par appel du calculateur en lot
+
+# Écritures différées (avis, signalements): journal local puis INSERT DATA groupés
+WRITE_JOURNAL_FILE = os.getenv(
+    "WRITE_JOURNAL_FILE",
+    os.path.join(_BACKEND_DIR, ".cache", "write_journal.ndjson"),
+)  # "" = pas de journal (écritures perdues en cas d'arrêt brutal)
+WRITE_JOURNAL_FSYNC = os.getenv("WRITE_JOURNAL_FSYNC", "true").lower() == "true"
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "100"))  # enregistrements par INSERT DATA
+WRITE_FLUSH_INTERVAL_MS = int(os.getenv("WRITE_FLUSH_INTERVAL_MS", "200"))  # attente maximale avant envoi
+WRITE_MAX_PENDING = int(os.getenv("WRITE_MAX_PENDING", "10000"))  # au-delà: 503 (backpressure)
+WRITE_MAX_RETRIES = int(os.getenv("WRITE_MAX_RETRIES", "3"))
+WRITE_RETRY_BACKOFF_MS = int(os.getenv("WRITE_RETRY_BACKOFF_MS", "100"))  # doublé à chaque reprise
+WRITE_ENQUEUE_TIMEOUT_MS = int(os.getenv("WRITE_ENQUEUE_TIMEOUT_MS", "500"))  # attente d'une place dans la file
+
+# Chargement en masse (POST /ingest/{kind})
+INGEST_CHUNK_TRIPLES = int(os.getenv("INGEST_CHUNK_TRIPLES", "5000"))  # triplets par INSERT DATA
+INGEST_MAX_ERROR_SAMPLES = int(os.getenv("INGEST_MAX_ERROR_SAMPLES", "20"))  # lignes rejetées détaillées dans le rapport
+INGEST_JOBS_KEPT = int(os.getenv("INGEST_JOBS_KEPT", "20"))  # chargements récents visibles dans /ingest/jobs
+
+# /stats: compteurs maintenus à l'écriture, recomptés périodiquement
+STATS_RECONCILE_SECONDS = float(os.getenv("STATS_RECONCILE_SECONDS", "300"))
+
+# HTTP conditional caching (ETag) on read endpoints
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "0"))  # 0 = revalidation à chaque requête
+
 # CORS configuration
 CORS_ORIGINS = [
     FRONTEND_URL,
@@ -19,3 +86,9 @@ CORS_ORIGINS = [
 
 # Ontology namespace
 ONTOLOGY_NS = "http://www.semanticweb.org/eco-tourism/2025/1/#"
+
+# Ontology file (RDF/XML) loaded into the in-memory store
+ONTOLOGY_FILE = os.getenv("ONTOLOGY_FILE", os.path.join(_BACKEND_DIR, "..", "eco-toursime.rdf"))
+ONTOLOGY_SNAPSHOT = os.getenv("ONTOLOGY_SNAPSHOT", os.path.join(_BACKEND_DIR, ".cache", "eco-toursime.snapshot"))
+# Namespace utilisé dans le fichier OWL, réécrit en ONTOLOGY_NS au chargement
+ONTOLOGY_SOURCE_NS = os.getenv("ONTOLOGY_SOURCE_NS", "http://www.semanticweb.org/achref/ontologies/2025/9/tourism-eco#")
@@ -0,0 +1,56 @@
+import threading
+import time
+import pytest
+from services.mock_fuseki_client import MockFusekiClient
+
+
+class StubFusekiClient:
+    """Client Fuseki de test: store du mock, latence et pannes simulées, appels enregistrés
+
+    `failures` premiers appels (requête ou mise à jour) en échec, `delay`
+    secondes par requête; toute mise à jour contenant `reject` est refusée
+    (erreur permanente).
+    Pas de query_stream: les lectures passent toutes par `query()`.
+    """
+
+    def __init__(self, delay: float = 0, failures: int = 0, reject: str = None):
+        self.mock = MockFusekiClient()
+        self.delay, self.failures, self.reject = delay, failures, reject
+        self.queries, self.updates, self.threads = [], [], set()
+
+    @property
+    def calls(self):
+        return len(self.queries)
+
+    @property
+    def version(self):
+        return self.mock.version
+
+    def _fail(self):
+        if self.failures:
+            self.failures -= 1
+            raise Exception("Fuseki indisponible")
+
+    def query(self, sparql_query):
+        self.queries.append(sparql_query)
+        self.threads.add(threading.current_thread().name)
+        self._fail()
+        if self.delay:
+            time.sleep(self.delay)
+        return self.mock.query(sparql_query)
+
+    def update(self, sparql_update):
+        self.updates.append(sparql_update)
+        self._fail()
+        if self.reject is not None and self.reject in sparql_update:
+            raise Exception("Fuseki 400: requête invalide")
+        return self.mock.update(sparql_update)
+
+    def parse_results(self, results, columnar=False):
+        return self.mock.parse_results(results, columnar)
+
+
+@pytest.fixture
+def stub_client():
+    """Fabrique de StubFusekiClient (un store neuf par client)"""
+    return StubFusekiClient
@@ -1,22 +1,81 @@
 # FastAPI Main Application
-from fastapi import FastAPI, HTTPException, Query, File, UploadFile
+from fastapi import FastAPI, HTTPException, Query, File, UploadFile, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
+from contextlib import asynccontextmanager
+from collections import OrderedDict
+import csv
+import io
+import json
+import time
+import asyncio
+import uuid
 import uvicorn
 from datetime import datetime
-from services import FusekiClient, NLToSparqlConverter
+from services import NLToSparqlConverter
+from services.async_fuseki_client import AsyncClientAdapter
+from services.result_set import ResultSet
+from services.result_cache import ResultCache, CachedFusekiClient, AsyncCachedFusekiClient
+from services import http_cache
+from services.gazetteer import Gazetteer
+from services.translation_cache import TranslationCache
+from services.query_templates import paginate
+from services.write_buffer import WriteBehindBuffer, BufferFull
+from services.bulk_ingest import BulkIngestJob, record_triples, detect_format, iter_rows
+from services.triple_store import Triple, triples_to_sparql
+from services.mock_fuseki_client import item_triples
+from services.stats_counters import StatsCounters
 from services.recommendation_engine import RecommendationEngine
-from config import CORS_ORIGINS, BACKEND_PORT, ONTOLOGY_NS
+from config import CORS_ORIGINS, BACKEND_PORT, ONTOLOGY_NS, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, BATCH_MAX_CONCURRENCY, BATCH_MAX_ITEMS, RECOMMENDATION_BATCH_MAX, CARBON_BATCH_MAX_LEGS, WRITE_ENQUEUE_TIMEOUT_MS, INGEST_JOBS_KEPT
 from example_queries import EXAMPLE_QUERIES
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Vide la file d'écritures, libère les connexions Fuseki et sauvegarde le cache de traductions à l'arrêt"""
+    yield
+    await asyncio.to_thread(write_buffer.stop)
+    nl_converter.translation_cache.save()
+    await async_fuseki_client.aclose()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Tourisme Éco-responsable - NL to SPARQL API",
     description="API pour convertir des questions en langage naturel français en requêtes SPARQL pour le tourisme durable",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Read endpoints polled by the frontend/CDN: answered with ETag and 304
+CONDITIONAL_GET_PATHS = {
+    "/destinations",
+    "/hebergements",
+    "/activites",
+    "/certifications",
+    "/stats",
+    "/recommendation/profiles",
+}
+
+# Registered before CORSMiddleware so that 304 responses also get CORS headers
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    """Ajoute ETag/Cache-Control et répond 304 si les données n'ont pas changé"""
+    if request.method != "GET" or request.url.path not in CONDITIONAL_GET_PATHS:
+        return await call_next(request)
+    # La version est lue avant le traitement: une écriture concurrente
+    # produira au pire un ETag périmé, donc un 200 au prochain appel
+    # /stats est servi par les compteurs, qu'une réconciliation corrige sans écriture
+    revision = stats_counters.revision if request.url.path == "/stats" else None
+    etag = http_cache.make_etag(async_fuseki_client.version, request.url.path, request.url.query, revision)
+    headers = {"ETag": etag, "Cache-Control": http_cache.CACHE_CONTROL}
+    if http_cache.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -27,22 +86,42 @@ app.add_middleware(
 )
 
 # Initialize services
+# Both clients share one result cache: a write through either of them
+# invalidates what the other one has cached
+result_cache = ResultCache()
+
 # Use MockFusekiClient for development (Fuseki dataset needs to be populated)
 print("🔧 Using Mock Fuseki Client with sample eco-tourism data")
 from services.mock_fuseki_client import MockFusekiClient
-fuseki_client = MockFusekiClient()
+mock_client = MockFusekiClient()
+fuseki_client = CachedFusekiClient(mock_client, result_cache)
+# Routes are async: they go through an awaitable client so that a slow
+# SPARQL call never blocks the event loop
+async_fuseki_client = AsyncCachedFusekiClient(AsyncClientAdapter(mock_client), result_cache)
 
 # Uncomment below to use real Fuseki when data is loaded:
+# from services import FusekiClient, AsyncFusekiClient
 # try:
-#     fuseki_client = FusekiClient()
+#     fuseki_client = CachedFusekiClient(FusekiClient(), result_cache)
 #     fuseki_client.query("SELECT * WHERE { ?s ?p ?o . } LIMIT 1")
+#     async_fuseki_client = AsyncCachedFusekiClient(AsyncFusekiClient(), result_cache)
 # except Exception as e:
 #     print(f"⚠️  Fuseki not available, using mock client: {str(e)}")
 #     from services.mock_fuseki_client import MockFusekiClient
-#     fuseki_client = MockFusekiClient()
+#     mock_client = MockFusekiClient()
+#     fuseki_client = CachedFusekiClient(mock_client, result_cache)
+#     async_fuseki_client = AsyncCachedFusekiClient(AsyncClientAdapter(mock_client), result_cache)
 
-nl_converter = NLToSparqlConverter()
+# Noms de lieux du store, tenus à jour à chaque insertion
+gazetteer = Gazetteer.from_store(mock_client.store)
+gazetteer.watch(mock_client.store)
+# Traductions question -> SPARQL: LRU, traductions Gemini persistées entre redémarrages
+nl_converter = NLToSparqlConverter(gazetteer=gazetteer, translation_cache=TranslationCache(), schema_store=mock_client.store)
 recommendation_engine = RecommendationEngine(fuseki_client=fuseki_client)
+# Avis et signalements: acquittés une fois journalisés, envoyés à Fuseki par lots
+write_buffer = WriteBehindBuffer(fuseki_client)
+# /stats: compteurs mis à jour par les écritures du backend, recomptés sans passer par le cache
+stats_counters = StatsCounters(fuseki_client.client)
 
 # Pydantic models
 class QueryRequest(BaseModel):
@@ -67,6 +146,54 @@ class SignalementEcoRequest(BaseModel):
     type_signalement: str  # pollution, destruction, non-respect_eco
     description: str
 
+# Entrées de catalogue (chargement en masse); champs = clés de TABLE_MAPPING
+class DestinationEntry(BaseModel):
+    nom: str
+    localiseDans: Optional[str] = None
+    description: Optional[str] = None
+    scoreDurabilite: Optional[int] = Field(None, ge=0, le=100)
+
+class HebergementEntry(BaseModel):
+    nom: str
+    type: Optional[str] = None  # sous-classe d'Hebergement (GiteRural, ...)
+    localiseDans: Optional[str] = None
+    scoreDurabilite: Optional[int] = Field(None, ge=0, le=100)
+    certification: Optional[str] = None
+    description: Optional[str] = None
+    prix: Optional[float] = Field(None, ge=0, description="Prix par nuit")
+
+class ActiviteEntry(BaseModel):
+    nom: str
+    type: Optional[str] = None  # Sportive, Culturelle, ... ou sous-classe d'ActiviteTouristique
+    description: Optional[str] = None
+    kgCO2: Optional[float] = Field(None, ge=0)
+    profileRecommande: Optional[str] = None
+    prix: Optional[float] = Field(None, ge=0)
+
+class TransportEntry(BaseModel):
+    nom: str
+    type: Optional[str] = None
+    kgCO2: Optional[float] = Field(None, ge=0)
+    prix: Optional[float] = Field(None, ge=0)
+
+class CertificationEntry(BaseModel):
+    nom: str
+    description: Optional[str] = None
+    criteres: Optional[str] = None
+
+class BatchItem(BaseModel):
+    id: Optional[str] = None
+    question: Optional[str] = None  # question en langage naturel
+    sparql: Optional[str] = None  # requête SPARQL directe
+    template: Optional[str] = None  # gabarit nommé (destinations, hebergements, statistiques, ...)
+    params: Dict[str, Any] = {}
+    limit: Optional[int] = Field(None, ge=1, le=MAX_PAGE_SIZE)
+    offset: int = Field(0, ge=0)
+    after: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+
 class RecommendationRequest(BaseModel):
     profile: str = Query(..., description="Profil voyageur: Adventure, Culture, BienEtre, Famille")
     destination: str = Query(..., description="Destination")
@@ -74,6 +201,78 @@ class RecommendationRequest(BaseModel):
     carbon_priority: Optional[bool] = Query(False, description="Priorité à l'écologie")
     days: Optional[int] = Query(3, description="Nombre de jours")
 
+class RecommendationBatchRequest(BaseModel):
+    travellers: List[RecommendationRequest]
+    compare: bool = False  # ajoute compare_packages() sur les recommandations du lot
+
+# Response helpers
+def _results_response(head: Dict[str, Any], result_set: ResultSet, tail: Dict[str, Any] = None, layout: str = "rows") -> Response:
+    """Sérialise directement un ResultSet dans la réponse JSON (chaque valeur distincte encodée une fois)"""
+    body = json.dumps(head, ensure_ascii=False)[:-1] + (", " if head else "")
+    if layout == "columnar":
+        body += '"results": ' + result_set.to_columnar_json()
+    else:
+        body += '"results": ' + result_set.to_json()
+    trailer = {"count": len(result_set)}
+    trailer.update(tail or {})
+    body += ", " + json.dumps(trailer, ensure_ascii=False)[1:]
+    return Response(content=body, media_type="application/json")
+
+# Streaming helpers
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+STREAM_FLUSH_ROWS = 200  # lignes regroupées par chunk HTTP
+
+async def _stream_results(sparql_query: str, stream_format: str, head: Dict[str, Any], tail=None) -> StreamingResponse:
+    """Diffuse les lignes SPARQL en NDJSON ou en JSON chunké sans matérialiser le résultat"""
+    rows = async_fuseki_client.query_stream(sparql_query)
+    # La première ligne est lue avant d'envoyer les en-têtes: une erreur
+    # Fuseki produit donc encore une vraie réponse 500
+    try:
+        first = await rows.__anext__()
+    except StopAsyncIteration:
+        first = None
+
+    async def all_rows():
+        if first is not None:
+            yield first
+            async for row in rows:
+                yield row
+
+    async def ndjson():
+        buffer = []
+        async for row in all_rows():
+            buffer.append(json.dumps(row, ensure_ascii=False))
+            if len(buffer) >= STREAM_FLUSH_ROWS:
+                yield "\n".join(buffer) + "\n"
+                buffer = []
+        if buffer:
+            yield "\n".join(buffer) + "\n"
+
+    async def chunked_json():
+        # Même forme que la réponse non streamée: {...head, "results": [...], "count": n, ...tail}
+        opening = json.dumps(head, ensure_ascii=False)[:-1]
+        yield opening + (", " if head else "") + '"results": ['
+        count = 0
+        buffer = []
+        async for row in all_rows():
+            buffer.append(json.dumps(row, ensure_ascii=False))
+            count += 1
+            if len(buffer) >= STREAM_FLUSH_ROWS:
+                yield ("," if count > len(buffer) else "") + ",".join(buffer)
+                buffer = []
+        if buffer:
+            yield ("," if count > len(buffer) else "") + ",".join(buffer)
+        trailer = {"count": count}
+        if tail:
+            trailer.update(tail())
+        yield "], " + json.dumps(trailer, ensure_ascii=False)[1:]
+
+    body = ndjson() if stream_format == "ndjson" else chunked_json()
+    return StreamingResponse(body, media_type=STREAM_MEDIA_TYPES[stream_format])
+
 # Routes
 
 @app.get("/health", tags=["Health"])
@@ -86,7 +285,7 @@ SELECT (COUNT(*) as ?count)
 WHERE {{
   ?s ?p ?o .
 }}"""
-        fuseki_client.query(test_query)
+        await async_fuseki_client.query(test_query)
         return {
             "status": "healthy",
             "timestamp": datetime.now().isoformat(),
@@ -102,94 +301,188 @@ WHERE {{
             "timestamp": datetime.now().isoformat()
         }
 
+@app.get("/metrics", tags=["Health"])
+async def get_metrics():
+    """Métriques internes: caches (résultats, traductions) et pools de connexions"""
+    metrics = {
+        "result_cache": result_cache.stats(),
+        "translation_cache": nl_converter.translation_cache.stats(),
+        "gemini": nl_converter.gemini_stats,
+        "query_validator": nl_converter.validator.stats(),
+        "write_buffer": write_buffer.stats(),
+        "stats_counters": stats_counters.stats(),
+    }
+    if hasattr(fuseki_client.client, "pool_stats"):
+        metrics["fuseki_pool"] = fuseki_client.pool_stats()
+    return metrics
+
 @app.post("/query", response_model=QueryResponse, tags=["NL Query"])
 @app.post("/query/nl", response_model=QueryResponse, tags=["NL Query"])
-async def natural_language_query(req: QueryRequest):
+async def natural_language_query(
+    req: QueryRequest,
+    stream: Optional[str] = Query(None, pattern="^(json|ndjson)$", description="Diffuser les résultats: 'json' (chunké) ou 'ndjson'")
+):
     """Convertit une question en langage naturel en requête SPARQL et exécute"""
     try:
         start_time = datetime.now()
         
         # Convert NL question to SPARQL
-        sparql_query = nl_converter.convert_question_to_sparql(req.question)
+        sparql_query = await nl_converter.aconvert_question_to_sparql(req.question)
+        
+        if stream:
+            return await _stream_results(
+                sparql_query,
+                stream,
+                head={"question": req.question, "sparql_query": sparql_query},
+                tail=lambda: {"execution_time": (datetime.now() - start_time).total_seconds()}
+            )
         
         # Execute SPARQL query
-        results_json = fuseki_client.query(sparql_query)
-        results = fuseki_client.parse_results(results_json)
+        results_json = await async_fuseki_client.query(sparql_query)
+        results = async_fuseki_client.parse_results(results_json, columnar=True)
         
         execution_time = (datetime.now() - start_time).total_seconds()
         
-        return QueryResponse(
-            question=req.question,
-            sparql_query=sparql_query,
-            results=results,
-            execution_time=execution_time
+        return _results_response(
+            {"question": req.question, "sparql_query": sparql_query},
+            results,
+            tail={"execution_time": execution_time}
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
 
 @app.post("/sparql", tags=["Direct SPARQL"])
-async def direct_sparql_query(query: str = Query(..., description="Requête SPARQL")):
+async def direct_sparql_query(
+    query: str = Query(..., description="Requête SPARQL"),
+    stream: Optional[str] = Query(None, pattern="^(json|ndjson)$", description="Diffuser les résultats: 'json' (chunké) ou 'ndjson'"),
+    layout: str = Query("rows", pattern="^(rows|columnar)$", description="Format des résultats: 'rows' ou 'columnar'")
+):
     """Exécute une requête SPARQL directe"""
     try:
-        results_json = fuseki_client.query(query)
-        results = fuseki_client.parse_results(results_json)
-        return {
-            "query": query,
-            "results": results,
-            "count": len(results)
-        }
+        if stream:
+            return await _stream_results(query, stream, head={"query": query})
+        results_json = await async_fuseki_client.query(query)
+        results = async_fuseki_client.parse_results(results_json, columnar=True)
+        return _results_response({"query": query}, results, layout=layout)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur SPARQL: {str(e)}")
 
-@app.post("/avis", tags=["Community"])
+async def _enqueue_write(record_id: str, triples: List[Triple]) -> int:
+    """Journalise l'écriture et la met en file; 503 si la file reste pleine"""
+    try:
+        queue_depth = await asyncio.to_thread(
+            write_buffer.submit, record_id, triples_to_sparql(triples), WRITE_ENQUEUE_TIMEOUT_MS / 1000
+        )
+    except BufferFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    stats_counters.observe(triples)
+    return queue_depth
+
+@app.post("/avis", status_code=202, tags=["Community"])
 async def add_avis(req: AvisVoyageurRequest):
-    """Ajoute un avis sur une attraction"""
+    """Ajoute un avis sur une attraction (écriture différée)"""
     try:
-        avis_id = f"avis_{datetime.now().timestamp()}"
-        sparql_update = f"""PREFIX eco: <{ONTOLOGY_NS}>
-INSERT DATA {{
-  eco:{avis_id} rdf:type eco:Avis ;
-    eco:note {req.note} ;
-    eco:voyageur "{req.voyageur}" ;
-    eco:surAttraction "{req.attraction_id}" ;
-    eco:typeAttraction "{req.type_attraction}" ;
-    eco:commentaire "{req.commentaire}" ;
-    eco:dateAvis "{datetime.now().isoformat()}"^^xsd:dateTime .
-}}"""
+        avis_id = f"avis_{uuid.uuid4().hex}"
+        triples = record_triples("avis", avis_id, req.model_dump())
         
-        fuseki_client.update(sparql_update)
+        queue_depth = await _enqueue_write(avis_id, triples)
         return {
             "status": "success",
             "avis_id": avis_id,
-            "message": "Avis ajouté avec succès"
+            "queue_depth": queue_depth,
+            "message": "Avis enregistré, publication imminente"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
 
-@app.post("/signalement-eco", tags=["Community"])
+@app.post("/signalement-eco", status_code=202, tags=["Community"])
 async def add_signalement(req: SignalementEcoRequest):
-    """Signale un problème écologique"""
+    """Signale un problème écologique (écriture différée)"""
     try:
-        signalement_id = f"signalement_{datetime.now().timestamp()}"
-        sparql_update = f"""PREFIX eco: <{ONTOLOGY_NS}>
-INSERT DATA {{
-  eco:{signalement_id} rdf:type eco:SignalementEnvironnemental ;
-    eco:voyageur "{req.voyageur}" ;
-    eco:destination "{req.destination}" ;
-    eco:typeProblem "{req.type_signalement}" ;
-    eco:description "{req.description}" ;
-    eco:dateSignalement "{datetime.now().isoformat()}"^^xsd:dateTime .
-}}"""
+        signalement_id = f"signalement_{uuid.uuid4().hex}"
+        triples = record_triples("signalements", signalement_id, req.model_dump())
         
-        fuseki_client.update(sparql_update)
+        queue_depth = await _enqueue_write(signalement_id, triples)
         return {
             "status": "success",
             "signalement_id": signalement_id,
+            "queue_depth": queue_depth,
             "message": "Signalement enregistré avec succès"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
 
+# Chargement en masse: type -> (modèle de validation, table du catalogue ou type d'enregistrement)
+INGEST_KINDS = {
+    "avis": (AvisVoyageurRequest, "avis"),
+    "signalements": (SignalementEcoRequest, "signalements"),
+    "destinations": (DestinationEntry, "destinations"),
+    "hebergements": (HebergementEntry, "hebergements"),
+    "activites": (ActiviteEntry, "activites"),
+    "transports": (TransportEntry, "transports"),
+    "certifications": (CertificationEntry, "certifications"),
+}
+ingest_jobs: "OrderedDict[str, BulkIngestJob]" = OrderedDict()
+
+def _ingest_converter(kind: str):
+    """Ligne brute -> triplets, après validation par le modèle Pydantic du type"""
+    model, target = INGEST_KINDS[kind]
+    if kind in ("avis", "signalements"):
+        prefix = "avis" if kind == "avis" else "signalement"
+        return lambda row: record_triples(target, f"{prefix}_{uuid.uuid4().hex}", model(**row).model_dump())
+    return lambda row: item_triples(target, {
+        key: str(value) for key, value in model(**row).model_dump(exclude_none=True).items()
+    }, hierarchy=nl_converter.hierarchy)
+
+def _ingest_writer(target: str):
+    if target == "store":
+        insert_triples = getattr(fuseki_client.client, "insert_triples", None)
+        if insert_triples is None:
+            raise HTTPException(status_code=400, detail="Store local indisponible avec ce client Fuseki")
+
+        def write(triples):
+            insert_triples(triples)
+            result_cache.invalidate()
+    else:
+        def write(triples):
+            # IRI complètes: pas de préfixe à déclarer
+            fuseki_client.update("INSERT DATA {\n" + triples_to_sparql(triples) + "\n}")
+
+    def write_and_count(triples):
+        write(triples)
+        stats_counters.observe(triples)
+    return write_and_count
+
+@app.post("/ingest/{kind}", tags=["Community"])
+async def bulk_ingest(
+    kind: str,
+    file: UploadFile = File(..., description="Fichier NDJSON (un objet par ligne) ou CSV avec en-tête"),
+    input_format: Optional[str] = Query(None, alias="format", pattern="^(ndjson|csv)$", description="Déduit de l'extension si absent"),
+    target: str = Query("fuseki", pattern="^(fuseki|store)$", description="'fuseki': INSERT DATA par paquets; 'store': store en mémoire"),
+    job_id: Optional[str] = Query(None, description="Identifiant pour suivre la progression (GET /ingest/jobs)")
+):
+    """Charge des avis, signalements ou entrées de catalogue ligne à ligne, écrits par gros paquets"""
+    if kind not in INGEST_KINDS:
+        raise HTTPException(status_code=404, detail=f"Type inconnu: {kind} (attendu: {', '.join(INGEST_KINDS)})")
+    fmt = input_format or detect_format(file.filename, file.content_type)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Format non reconnu: préciser format=ndjson ou format=csv")
+    job = BulkIngestJob(job_id or uuid.uuid4().hex, kind, _ingest_converter(kind), _ingest_writer(target))
+    ingest_jobs[job.job_id] = job
+    while len(ingest_jobs) > INGEST_JOBS_KEPT:
+        ingest_jobs.popitem(last=False)
+    # Lecture et écriture hors de la boucle d'événements (fichier déjà reçu, lu en flux)
+    return await asyncio.to_thread(job.run, iter_rows(file.file, fmt))
+
+@app.get("/ingest/jobs", tags=["Community"])
+async def list_ingest_jobs():
+    """Progression des chargements en masse récents (lignes lues, acceptées, rejetées, paquets écrits)"""
+    return {"jobs": [job.stats() for job in reversed(ingest_jobs.values())]}
+
 @app.get("/examples", tags=["Examples"])
 async def get_example_queries():
     """Retourne les requêtes d'exemple"""
@@ -198,100 +491,201 @@ async def get_example_queries():
         "description": "Exemples de requêtes SPARQL"
     }
 
+# Pagination helpers
+async def _fetch_page(template: str, values: Dict[str, Any], limit: int, offset: int, after: Optional[str]):
+    """Page d'un gabarit: LIMIT/OFFSET et curseur poussés dans la requête SPARQL
+
+    Une ligne de plus que la page est demandée pour savoir s'il reste des résultats.
+    """
+    try:
+        sparql_query = nl_converter.templates.render(template, values, limit=limit + 1, offset=offset, after=after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Paramètre invalide: {str(e)}")
+    results_json = await async_fuseki_client.query(sparql_query)
+    rows = async_fuseki_client.parse_results(results_json)
+    return paginate(rows, nl_converter.templates.key(template), limit)
+
+def _page_info(limit: int, offset: int, count: int, next_cursor: Optional[str]) -> Dict[str, Any]:
+    """Suite de la page: par curseur (next_cursor) ou par OFFSET (next_offset, la page ne coupant pas une ressource)"""
+    return {
+        "limit": limit,
+        "offset": offset,
+        "next_cursor": next_cursor,
+        "next_offset": offset + count if next_cursor is not None else None,
+    }
+
+PAGE_LIMIT = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Taille de page")
+PAGE_OFFSET = Query(0, ge=0, description="Décalage (pagination par OFFSET): next_offset de la page précédente")
+PAGE_AFTER = Query(None, description="Curseur: next_cursor de la page précédente (pagination par clé)")
+
 @app.get("/destinations", tags=["Data"])
-async def get_destinations(region: Optional[str] = None):
+async def get_destinations(
+    region: Optional[str] = None,
+    certification: Optional[str] = None,
+    min_score: Optional[float] = Query(None, ge=0, le=100, description="Score de durabilité minimal"),
+    limit: int = PAGE_LIMIT,
+    offset: int = PAGE_OFFSET,
+    after: Optional[str] = PAGE_AFTER
+):
     """Récupère toutes les destinations éco-responsables"""
     try:
-        if region:
-            question = f"Quelles sont les destinations durables dans {region}?"
+        if region or certification:
+            template = "destinations_region"
+            values = {"region": region, "certification": certification, "min_score": min_score}
         else:
-            question = "Quelles sont les destinations éco-responsables?"
-        
-        sparql_query = nl_converter.convert_question_to_sparql(question)
-        results_json = fuseki_client.query(sparql_query)
-        results = fuseki_client.parse_results(results_json)
+            template = "destinations"
+            values = {"min_score": min_score}
+        results, next_cursor = await _fetch_page(template, values, limit, offset, after)
         
         return {
             "destinations": results,
             "count": len(results),
-            "region": region
+            "region": region,
+            **_page_info(limit, offset, len(results), next_cursor)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
 
 @app.get("/hebergements", tags=["Data"])
-async def get_hebergements(eco_certified: Optional[bool] = False):
+async def get_hebergements(
+    eco_certified: Optional[bool] = False,
+    region: Optional[str] = None,
+    certification: Optional[str] = None,
+    type_hebergement: Optional[str] = Query(None, description="Sous-classe d'Hebergement (ex. GiteRural)"),
+    limit: int = PAGE_LIMIT,
+    offset: int = PAGE_OFFSET,
+    after: Optional[str] = PAGE_AFTER
+):
     """Récupère les hébergements écologiques"""
     try:
-        if eco_certified:
-            question = "Quels sont les hébergements certifiés écologiques?"
-        else:
-            question = "Quels sont les hébergements éco-responsables?"
-        
-        sparql_query = nl_converter.convert_question_to_sparql(question)
-        results_json = fuseki_client.query(sparql_query)
-        results = fuseki_client.parse_results(results_json)
+        values = {
+            "certified": eco_certified,
+            "region": region,
+            "certification": certification,
+            "type": type_hebergement,
+        }
+        results, next_cursor = await _fetch_page("hebergements", values, limit, offset, after)
         return {
             "hebergements": results,
             "count": len(results),
-            "certified_only": eco_certified
+            "certified_only": eco_certified,
+            **_page_info(limit, offset, len(results), next_cursor)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
 
 @app.get("/activites", tags=["Data"])
-async def get_activites(type_activite: Optional[str] = None):
+async def get_activites(
+    type_activite: Optional[str] = None,
+    min_co2: Optional[float] = Query(None, ge=0, description="kgCO2 minimal"),
+    max_co2: Optional[float] = Query(None, ge=0, description="kgCO2 maximal"),
+    limit: int = PAGE_LIMIT,
+    offset: int = PAGE_OFFSET,
+    after: Optional[str] = PAGE_AFTER
+):
     """Récupère les activités éco-responsables"""
     try:
-        if type_activite:
-            question = f"Quelles sont les activités {type_activite}?"
-        else:
-            question = "Quelles sont les activités disponibles?"
-        
-        sparql_query = nl_converter.convert_question_to_sparql(question)
-        results_json = fuseki_client.query(sparql_query)
-        results = fuseki_client.parse_results(results_json)
+        values = {"type": type_activite, "min_co2": min_co2, "max_co2": max_co2}
+        results, next_cursor = await _fetch_page("activites", values, limit, offset, after)
         return {
             "activites": results,
             "count": len(results),
-            "type": type_activite
+            "type": type_activite,
+            **_page_info(limit, offset, len(results), next_cursor)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
 
 @app.get("/certifications", tags=["Data"])
-async def get_certifications():
+async def get_certifications(
+    limit: int = PAGE_LIMIT,
+    offset: int = PAGE_OFFSET,
+    after: Optional[str] = PAGE_AFTER
+):
     """Récupère les certifications écologiques"""
     try:
-        sparql_query = nl_converter.convert_question_to_sparql("Quelles sont les certifications écologiques?")
-        results_json = fuseki_client.query(sparql_query)
-        results = fuseki_client.parse_results(results_json)
+        results, next_cursor = await _fetch_page("certifications", {}, limit, offset, after)
         return {
             "certifications": results,
-            "count": len(results)
+            "count": len(results),
+            **_page_info(limit, offset, len(results), next_cursor)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
 
+# Batch: plusieurs requêtes en un aller-retour
+async def _run_batch_item(index: int, item: BatchItem, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+    """Exécute un élément du lot; une erreur est rapportée dans l'élément, sans faire échouer le lot"""
+    result: Dict[str, Any] = {"id": item.id if item.id is not None else str(index)}
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            sources = [name for name in ("question", "sparql", "template") if getattr(item, name)]
+            if len(sources) != 1:
+                raise ValueError("Un seul champ parmi question, sparql ou template est attendu")
+            key = limit = sparql_query = None
+            if item.question:
+                sparql_query = await nl_converter.aconvert_question_to_sparql(item.question)
+            elif item.sparql:
+                sparql_query = item.sparql
+            elif item.template == "statistiques":
+                # Même ligne que le gabarit, servie sans requête par les compteurs de /stats
+                rows = [await asyncio.to_thread(stats_counters.snapshot)]
+            else:
+                # Gabarits paginables: même découpage que les endpoints de données
+                key = nl_converter.templates.key(item.template)
+                if key is not None:
+                    limit = item.limit or DEFAULT_PAGE_SIZE
+                sparql_query = nl_converter.templates.render(
+                    item.template, item.params,
+                    limit=limit + 1 if key else None, offset=item.offset, after=item.after
+                )
+            if sparql_query is not None:
+                result["sparql_query"] = sparql_query
+                rows = async_fuseki_client.parse_results(await async_fuseki_client.query(sparql_query))
+            if key is not None:
+                rows, next_cursor = paginate(rows, key, limit)
+                result.update(_page_info(limit, item.offset, len(rows), next_cursor))
+            result["results"] = rows
+            result["count"] = len(rows)
+        except Exception as e:
+            result["error"] = str(e)
+        result["execution_time"] = round(time.perf_counter() - start, 6)
+    return result
+
+@app.post("/batch", tags=["Batch"])
+async def run_batch(req: BatchRequest):
+    """Exécute un lot de questions, requêtes SPARQL ou gabarits en parallèle (BATCH_MAX_CONCURRENCY)"""
+    if len(req.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Lot trop grand: {len(req.items)} éléments (max {BATCH_MAX_ITEMS})")
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+    results = await asyncio.gather(*(
+        _run_batch_item(index, item, semaphore) for index, item in enumerate(req.items)
+    ))
+    return {
+        "results": results,
+        "count": len(results),
+        "errors": sum(1 for result in results if "error" in result),
+        "execution_time": round(time.perf_counter() - start, 6)
+    }
+
 @app.get("/stats", tags=["Analytics"])
 async def get_community_stats():
     """Récupère les statistiques du tourisme éco-responsable"""
     try:
-        sparql_query = f"""PREFIX eco: <{ONTOLOGY_NS}>
-SELECT (COUNT(DISTINCT ?voyageur) as ?totalVoyageurs)
-       (COUNT(DISTINCT ?destination) as ?totalDestinations)
-       (COUNT(DISTINCT ?hebergement) as ?totalHebergements)
-       (COUNT(DISTINCT ?activite) as ?totalActivites)
-WHERE {{
-  OPTIONAL {{ ?voyageur rdf:type eco:Voyageur }}
-  OPTIONAL {{ ?destination rdf:type eco:Destination }}
-  OPTIONAL {{ ?hebergement rdf:type eco:Hebergement }}
-  OPTIONAL {{ ?activite rdf:type eco:ActiviteTouristique }}
-}}"""
-        results_json = fuseki_client.query(sparql_query)
-        results = fuseki_client.parse_results(results_json)
+        # Compteurs matérialisés: O(1), sans produit croisé des quatre classes
+        statistics = await asyncio.to_thread(stats_counters.snapshot)
         return {
-            "statistics": results[0] if results else {},
+            "statistics": statistics,
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -348,7 +742,9 @@ async def generate_recommendation(
 ):
     """Génère une recommandation personnalisée"""
     try:
-        recommendation = recommendation_engine.generate_recommendation(
+        # Hors de la boucle d'événements: le moteur attend ses requêtes concurrentes
+        recommendation = await asyncio.to_thread(
+            recommendation_engine.generate_recommendation,
             profile=profile,
             destination=destination,
             budget=budget,
@@ -359,49 +755,169 @@ async def generate_recommendation(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
 
+@app.post("/recommendation/itinerary", tags=["Recommendations"])
+async def optimize_itinerary(
+    profile: str = Query(..., description="Profil voyageur"),
+    budget: float = Query(1000, gt=0, description="Budget total en euros"),
+    days: int = Query(3, ge=0, le=60, description="Nombre de jours (au plus une activité par jour)"),
+    max_co2: Optional[float] = Query(None, ge=0, description="Plafond d'émissions en kgCO2"),
+    carbon_priority: bool = Query(False, description="À score égal, préférer le moins émetteur")
+):
+    """Itinéraire optimal sous contraintes de budget et de CO2, avec le front de Pareto des alternatives"""
+    try:
+        return await asyncio.to_thread(
+            recommendation_engine.optimize_itinerary,
+            profile=profile,
+            budget=budget,
+            days=days,
+            max_co2=max_co2,
+            carbon_priority=carbon_priority
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
+
+@app.post("/recommendation/batch", tags=["Recommendations"])
+async def generate_recommendation_batch(
+    req: RecommendationBatchRequest,
+    stream: str = Query("ndjson", pattern="^(json|ndjson)$", description="ndjson: une recommandation par ligne; json: tableau chunké")
+):
+    """Recommandations pour un lot de voyageurs: catalogue chargé une fois, scoring vectorisé, réponse diffusée"""
+    if len(req.travellers) > RECOMMENDATION_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"Lot trop grand: {len(req.travellers)} voyageurs (max {RECOMMENDATION_BATCH_MAX})")
+    travellers = [traveller.model_dump() for traveller in req.travellers]
+    try:
+        # Catalogue et scores calculés hors de la boucle d'événements, avant l'envoi des en-têtes
+        recommendations = recommendation_engine.generate_recommendations_batch(travellers)
+        first = await asyncio.to_thread(next, recommendations, None)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
+
+    def all_recommendations():
+        if first is not None:
+            yield first
+            yield from recommendations
+
+    def compared(packages):
+        return {"comparison": recommendation_engine.compare_packages(packages)} if req.compare else {}
+
+    # Générateurs synchrones: Starlette les itère dans son pool de threads
+    def ndjson():
+        packages, buffer = [], []
+        for recommendation in all_recommendations():
+            if req.compare:
+                packages.append(recommendation)
+            buffer.append(json.dumps(recommendation, ensure_ascii=False))
+            if len(buffer) >= STREAM_FLUSH_ROWS:
+                yield "\n".join(buffer) + "\n"
+                buffer = []
+        # Dernière ligne: la comparaison du lot
+        if req.compare:
+            buffer.append(json.dumps(compared(packages), ensure_ascii=False))
+        if buffer:
+            yield "\n".join(buffer) + "\n"
+
+    def chunked_json():
+        yield '{"results": ['
+        packages, buffer, count = [], [], 0
+        for recommendation in all_recommendations():
+            if req.compare:
+                packages.append(recommendation)
+            buffer.append(json.dumps(recommendation, ensure_ascii=False))
+            count += 1
+            if len(buffer) >= STREAM_FLUSH_ROWS:
+                yield ("," if count > len(buffer) else "") + ",".join(buffer)
+                buffer = []
+        if buffer:
+            yield ("," if count > len(buffer) else "") + ",".join(buffer)
+        trailer = {"count": count}
+        trailer.update(compared(packages))
+        yield "], " + json.dumps(trailer, ensure_ascii=False)[1:]
+
+    body = ndjson() if stream == "ndjson" else chunked_json()
+    return StreamingResponse(body, media_type=STREAM_MEDIA_TYPES[stream])
+
 @app.get("/recommendation/carbon-calculator", tags=["Recommendations"])
 async def carbon_calculator(
     transport_type: str = Query("Avion"),
     distance_km: float = Query(1000)
 ):
     """Calcule l'empreinte carbone d'un transport"""
-    # CO2 emissions (kg per km)
-    emission_factors = {
-        "Avion": 0.255,
-        "Train": 0.041,
-        "Bus": 0.089,
-        "Voiture": 0.192,
-        "Velo": 0.0
-    }
-    
-    factor = emission_factors.get(transport_type, 0.2)
-    total_co2 = distance_km * factor
-    carbon_score = recommendation_engine.calculate_carbon_score(total_co2)
+    calculator = recommendation_engine.carbon_calculator
+    try:
+        result = calculator.calculate_batch([transport_type], [distance_km])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    columns = calculator.to_columns([transport_type], [distance_km], result)
     
     return {
         "transport": transport_type,
         "distance_km": distance_km,
-        "total_co2_kg": round(total_co2, 2),
-        "carbon_level": carbon_score["level"],
-        "carbon_score": carbon_score["score"],
+        "total_co2_kg": columns["total_co2_kg"][0],
+        "carbon_level": columns["carbon_level"][0],
+        "carbon_score": columns["carbon_score"][0],
+        # Alternatives classées par émissions croissantes
         "alternatives": [
-            {
-                "transport": "Train",
-                "co2_kg": round(distance_km * emission_factors["Train"], 2),
-                "savings": round(total_co2 - (distance_km * emission_factors["Train"]), 2)
-            }
+            {"transport": transport, "co2_kg": co2, "savings": savings}
+            for transport, co2, savings in zip(columns["alternatives"][0], columns["alternative_co2_kg"][0], columns["savings"][0])
         ]
     }
 
+CARBON_CSV_COLUMNS = ["transport", "distance_km", "total_co2_kg", "carbon_level", "carbon_score"]
+
+def _read_carbon_legs(body: bytes, content_type: str):
+    """(types, distances) depuis un corps JSON en colonnes ou un CSV transport_type,distance_km"""
+    if content_type.startswith("text/csv"):
+        lines = io.StringIO(body.decode("utf-8-sig"))
+        reader = csv.reader(lines)
+        header = [name.strip() for name in next(reader, [])]
+        if "transport_type" not in header or "distance_km" not in header:
+            raise ValueError("En-tête CSV attendu: transport_type,distance_km")
+        type_col, distance_col = header.index("transport_type"), header.index("distance_km")
+        rows = [row for row in reader if row]
+        return [row[type_col] for row in rows], [row[distance_col] for row in rows]
+    data = json.loads(body or b"{}")
+    if not isinstance(data, dict) or not isinstance(data.get("transport_type"), list) or not isinstance(data.get("distance_km"), list):
+        raise ValueError('Corps JSON attendu: {"transport_type": [...], "distance_km": [...]}')
+    return data["transport_type"], data["distance_km"]
+
+@app.post("/recommendation/carbon-calculator/batch", tags=["Recommendations"])
+async def carbon_calculator_batch(
+    request: Request,
+    alternatives: int = Query(3, ge=0, le=10, description="Alternatives classées par trajet"),
+    response_format: str = Query("json", alias="format", pattern="^(json|csv)$", description="Format de la réponse: 'json' (colonnes) ou 'csv'")
+):
+    """Empreinte carbone de nombreux trajets: colonnes JSON ou CSV (transport_type,distance_km) en entrée"""
+    body = await request.body()
+    try:
+        transport_types, distances = _read_carbon_legs(body, request.headers.get("content-type", ""))
+        if len(transport_types) > CARBON_BATCH_MAX_LEGS:
+            raise ValueError(f"Lot trop grand: {len(transport_types)} trajets (max {CARBON_BATCH_MAX_LEGS})")
+        calculator = recommendation_engine.carbon_calculator
+        result = await asyncio.to_thread(calculator.calculate_batch, transport_types, distances, alternatives)
+    except (ValueError, TypeError, IndexError) as e:
+        raise HTTPException(status_code=400, detail=f"Requête invalide: {str(e)}")
+    columns = calculator.to_columns(transport_types, distances, result)
+    if response_format == "csv":
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(CARBON_CSV_COLUMNS + [f"alternative_{i + 1}" for i in range(result["alternatives"].shape[1])])
+        writer.writerows(
+            [*values, *alternatives_row]
+            for *values, alternatives_row in zip(*(columns[name] for name in CARBON_CSV_COLUMNS), columns["alternatives"])
+        )
+        return Response(content=output.getvalue(), media_type="text/csv")
+    return dict(columns, count=len(columns["transport"]), total_co2_kg_sum=round(float(result["total_co2_kg"].sum()), 2))
+
 @app.get("/recommendation/activities", tags=["Recommendations"])
 async def get_recommended_activities(profile: str = Query(...)):
     """Récupère les activités recommandées pour un profil"""
     try:
-        activities = recommendation_engine.get_activities_for_profile(profile)
+        candidates = await asyncio.to_thread(recommendation_engine.load_candidates)
+        activities = recommendation_engine.get_activities_for_profile(profile, candidates, limit=10)
         return {
             "profile": profile,
-            "activities": activities[:10],
-            "total": len(activities)
+            "activities": activities,
+            "total": len(candidates["activities"])
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
@@ -410,7 +926,7 @@ async def get_recommended_activities(profile: str = Query(...)):
 async def get_recommended_accommodations(profile: str = Query(...)):
     """Récupère les hébergements recommandés"""
     try:
-        accommodations = recommendation_engine.get_accommodations_for_profile(profile)
+        accommodations = await asyncio.to_thread(recommendation_engine.get_accommodations_for_profile, profile)
         return {
             "profile": profile,
             "accommodations": accommodations,
@@ -423,7 +939,7 @@ async def get_recommended_accommodations(profile: str = Query(...)):
 async def get_transport_options(carbon_sensitive: bool = Query(False)):
     """Récupère les options de transport"""
     try:
-        transports = recommendation_engine.get_transport_options(carbon_sensitive)
+        transports = await asyncio.to_thread(recommendation_engine.get_transport_options, carbon_sensitive)
         return {
             "carbon_sensitive": carbon_sensitive,
             "transports": transports,
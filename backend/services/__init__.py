@@ -1,6 +1,7 @@
 # __init__.py for services
 from .fuseki_client import FusekiClient
+from .async_fuseki_client import AsyncFusekiClient
 from .nl_to_sparql import NLToSparqlConverter
 from .recommendation_engine import RecommendationEngine
 
-__all__ = ["FusekiClient", "NLToSparqlConverter", "RecommendationEngine"]
+__all__ = ["FusekiClient", "AsyncFusekiClient", "NLToSparqlConverter", "RecommendationEngine"]
@@ -0,0 +1,144 @@
+# Async Fuseki Client Service
+import asyncio
+import itertools
+import httpx
+from typing import Dict, List, Any, AsyncIterator, Union
+from config import (
+    FUSEKI_ENDPOINT,
+    FUSEKI_TIMEOUT,
+    FUSEKI_POOL_MAXSIZE,
+    FUSEKI_ASYNC_MAX_CONNECTIONS,
+    FUSEKI_STREAM_CHUNK_SIZE,
+)
+from .fuseki_client import FusekiClient
+from .result_stream import aiter_rows
+from .result_set import ResultSet
+
+# Lignes lues par aller-retour de thread quand on adapte un flux synchrone
+STREAM_BATCH_SIZE = 500
+
+
+def _next_batch(rows, size: int) -> List[Dict[str, str]]:
+    """Lit au plus size lignes d'un itérateur"""
+    return list(itertools.islice(rows, size))
+
+
+class AsyncFusekiClient:
+    """Client asyncio pour Apache Jena Fuseki (ne bloque pas la boucle d'événements)"""
+
+    def __init__(
+        self,
+        endpoint: str = FUSEKI_ENDPOINT,
+        max_connections: int = FUSEKI_ASYNC_MAX_CONNECTIONS,
+        max_keepalive: int = FUSEKI_POOL_MAXSIZE,
+        timeout: float = FUSEKI_TIMEOUT
+    ):
+        self.endpoint = endpoint
+        self.update_endpoint = endpoint.replace("/sparql", "/update")
+        self.headers = {
+            "Accept": "application/sparql-results+json",
+            "Content-Type": "application/sparql-query"
+        }
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive
+        )
+        # Comme FusekiClient: un pool pour les lectures, un pour les écritures
+        self._query_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+        self._update_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+        # Version du jeu de données, incrémentée à chaque écriture réussie
+        self.version = 0
+
+    async def query(self, sparql_query: str) -> Dict[str, Any]:
+        """Exécute une requête SPARQL SELECT"""
+        try:
+            response = await self._query_client.post(
+                self.endpoint,
+                content=sparql_query.encode("utf-8"),
+                headers=self.headers
+            )
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            raise Exception(f"Erreur Fuseki: {str(e)}")
+
+    async def query_stream(self, sparql_query: str) -> AsyncIterator[Dict[str, str]]:
+        """Exécute une requête SELECT et produit les lignes au fil de la réception"""
+        try:
+            async with self._query_client.stream(
+                "POST",
+                self.endpoint,
+                content=sparql_query.encode("utf-8"),
+                headers=self.headers
+            ) as response:
+                response.raise_for_status()
+                async for row in aiter_rows(response.aiter_bytes(FUSEKI_STREAM_CHUNK_SIZE)):
+                    yield row
+        except httpx.HTTPError as e:
+            raise Exception(f"Erreur Fuseki: {str(e)}")
+
+    async def update(self, sparql_update: str) -> bool:
+        """Exécute une requête SPARQL UPDATE"""
+        try:
+            response = await self._update_client.post(
+                self.update_endpoint,
+                content=sparql_update.encode("utf-8"),
+                headers={"Content-Type": "application/sparql-update"}
+            )
+            response.raise_for_status()
+            self.version += 1
+            return True
+        except httpx.HTTPError as e:
+            raise Exception(f"Erreur mise à jour Fuseki: {str(e)}")
+
+    def parse_results(self, results: Dict[str, Any], columnar: bool = False) -> Union[List[Dict[str, str]], ResultSet]:
+        """Parse les résultats SPARQL (columnar=True retourne un ResultSet compact)"""
+        return FusekiClient.parse_results(self, results, columnar)
+
+    async def aclose(self):
+        """Ferme les connexions des deux pools"""
+        await self._query_client.aclose()
+        await self._update_client.aclose()
+
+
+class AsyncClientAdapter:
+    """Expose un client synchrone (FusekiClient, MockFusekiClient) avec l'interface async"""
+
+    def __init__(self, client):
+        self.client = client
+
+    @property
+    def version(self) -> int:
+        """Version du jeu de données du client sous-jacent"""
+        return self.client.version
+
+    async def query(self, sparql_query: str) -> Dict[str, Any]:
+        """Exécute la requête dans un thread pour libérer la boucle d'événements"""
+        return await asyncio.to_thread(self.client.query, sparql_query)
+
+    async def query_stream(self, sparql_query: str) -> AsyncIterator[Dict[str, str]]:
+        """Consomme le flux synchrone par lots, chaque lot étant lu dans un thread"""
+        rows = self.client.query_stream(sparql_query)
+        try:
+            while True:
+                batch = await asyncio.to_thread(_next_batch, rows, STREAM_BATCH_SIZE)
+                if not batch:
+                    break
+                for row in batch:
+                    yield row
+        finally:
+            rows.close()
+
+    async def update(self, sparql_update: str) -> bool:
+        """Exécute la mise à jour dans un thread"""
+        return await asyncio.to_thread(self.client.update, sparql_update)
+
+    def parse_results(self, results: Dict[str, Any], columnar: bool = False) -> Union[List[Dict[str, str]], ResultSet]:
+        """Parse les résultats SPARQL"""
+        return self.client.parse_results(results, columnar)
+
+    async def aclose(self):
+        """Ferme le client sous-jacent s'il le permet"""
+        close = getattr(self.client, "close", None)
+        if close:
+            close()
@@ -0,0 +1,215 @@
+# Bulk Ingest (NDJSON / CSV)
+import csv
+import io
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Iterator, Optional, Tuple, BinaryIO
+from config import ONTOLOGY_NS, INGEST_CHUNK_TRIPLES, INGEST_MAX_ERROR_SAMPLES
+from .triple_store import Triple, RDF_TYPE, XSD_NS, iri, literal, term_to_sparql
+
+# Enregistrements communautaires: type -> (classe, propriété de date, {champ: propriété})
+RECORD_KINDS = {
+    "avis": ("Avis", "dateAvis", {
+        "note": "note",
+        "voyageur": "voyageur",
+        "attraction_id": "surAttraction",
+        "type_attraction": "typeAttraction",
+        "commentaire": "commentaire",
+    }),
+    "signalements": ("SignalementEnvironnemental", "dateSignalement", {
+        "voyageur": "voyageur",
+        "destination": "destination",
+        "type_signalement": "typeProblem",
+        "description": "description",
+    }),
+}
+
+INGEST_FORMATS = {
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+
+def _typed_literal(value: Any):
+    if isinstance(value, bool):
+        return literal(str(value).lower(), XSD_NS + "boolean")
+    if isinstance(value, (int, float)):
+        if float(value).is_integer():
+            return literal(int(value), XSD_NS + "integer")
+        return literal(repr(float(value)), XSD_NS + "decimal")
+    return literal(value)
+
+
+def record_triples(kind: str, record_id: str, fields: Dict[str, Any], namespace: str = ONTOLOGY_NS, timestamp: datetime = None) -> List[Triple]:
+    """Triplets d'un avis ou d'un signalement (littéraux typés, échappés à la sérialisation)"""
+    class_name, date_property, properties = RECORD_KINDS[kind]
+    node = iri(namespace + record_id)
+    triples = [(node, iri(RDF_TYPE), iri(namespace + class_name))]
+    for field, predicate in properties.items():
+        if fields.get(field) is not None:
+            triples.append((node, iri(namespace + predicate), _typed_literal(fields[field])))
+    stamp = (timestamp or datetime.now()).isoformat()
+    triples.append((node, iri(namespace + date_property), literal(stamp, XSD_NS + "dateTime")))
+    return triples
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """'ndjson' ou 'csv' d'après l'extension du fichier, sinon son type MIME"""
+    name = (filename or "").lower()
+    for suffix, fmt in INGEST_FORMATS.items():
+        if suffix.startswith(".") and name.endswith(suffix):
+            return fmt
+    return INGEST_FORMATS.get((content_type or "").split(";")[0].strip())
+
+
+def iter_rows(stream: BinaryIO, fmt: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """(numéro de ligne, ligne, erreur) lus au fil du fichier; une ligne illisible n'arrête pas la lecture
+
+    En CSV, les cellules vides sont considérées comme absentes.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text)
+            for row in reader:
+                if None in row:
+                    yield reader.line_num, None, "Plus de colonnes que l'en-tête"
+                    continue
+                yield reader.line_num, {key: value for key, value in row.items() if value != ""}, None
+            return
+        for number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield number, None, f"JSON invalide: {e.msg}"
+                continue
+            if isinstance(row, dict):
+                yield number, row, None
+            else:
+                yield number, None, "Objet JSON attendu"
+    finally:
+        # Le flux appartient à l'appelant
+        text.detach()
+
+
+def _describe(error: Exception) -> str:
+    errors = getattr(error, "errors", None)
+    if callable(errors):
+        return "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in errors())
+    return str(error)
+
+
+class BulkIngestJob:
+    """Chargement d'un fichier ligne à ligne, écrit par paquets d'au plus `chunk_triples` triplets
+
+    `to_triples(row)` valide une ligne et retourne ses triplets (ValueError ou
+    erreur de validation: ligne rejetée, la lecture continue); chaque terme
+    est ensuite vérifié, pour qu'une ligne ne puisse pas faire échouer son
+    paquet. `write_chunk(triples)` écrit un paquet (INSERT DATA ou store
+    local); un paquet en échec compte ses lignes comme rejetées et la lecture
+    continue. Seuls le paquet courant et quelques exemples d'erreurs sont
+    gardés en mémoire.
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        kind: str,
+        to_triples: Callable[[Dict[str, Any]], List[Triple]],
+        write_chunk: Callable[[List[Triple]], Any],
+        chunk_triples: int = INGEST_CHUNK_TRIPLES,
+        max_error_samples: int = INGEST_MAX_ERROR_SAMPLES,
+    ):
+        self.job_id = job_id
+        self.kind = kind
+        self.to_triples = to_triples
+        self.write_chunk = write_chunk
+        self.chunk_triples = chunk_triples
+        self.max_error_samples = max_error_samples
+        self.status = "pending"
+        self.counters = {"rows": 0, "accepted": 0, "rejected": 0, "triples": 0, "chunks": 0, "failed_chunks": 0}
+        self.errors: List[Dict[str, Any]] = []
+        self._started = None
+        self._elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def run(self, rows: Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]) -> Dict[str, Any]:
+        self.status = "running"
+        self._started = time.perf_counter()
+        chunk: List[Triple] = []
+        chunk_lines: List[int] = []
+        try:
+            for line, row, error in rows:
+                triples = None
+                if error is None:
+                    try:
+                        triples = self.to_triples(row)
+                        for triple in triples:
+                            for term in triple:
+                                term_to_sparql(term)
+                    except Exception as e:
+                        error = _describe(e)
+                with self._lock:
+                    self.counters["rows"] += 1
+                    if error is not None:
+                        self._reject(line, error, 1)
+                        continue
+                chunk.extend(triples)
+                chunk_lines.append(line)
+                if len(chunk) >= self.chunk_triples:
+                    self._flush(chunk, chunk_lines)
+                    chunk, chunk_lines = [], []
+            if chunk:
+                self._flush(chunk, chunk_lines)
+            if not self.counters["failed_chunks"]:
+                self.status = "done"
+            else:
+                self.status = "partial" if self.counters["chunks"] else "failed"
+        except Exception as e:
+            # Lecture interrompue: les lignes des paquets déjà écrits restent acquises
+            self.status = "failed"
+            with self._lock:
+                self.errors.append({"line": None, "error": f"Chargement interrompu: {e}"})
+        finally:
+            self._elapsed = time.perf_counter() - self._started
+        return self.stats()
+
+    def _reject(self, line: Optional[int], error: str, rows: int):
+        """Compte des lignes rejetées (appelé verrou tenu), avec un exemple d'erreur"""
+        self.counters["rejected"] += rows
+        if len(self.errors) < self.max_error_samples:
+            self.errors.append({"line": line, "error": error})
+
+    def _flush(self, chunk: List[Triple], lines: List[int]):
+        try:
+            self.write_chunk(chunk)
+        except Exception as e:
+            with self._lock:
+                self.counters["failed_chunks"] += 1
+                self._reject(lines[0], f"Paquet non écrit (lignes {lines[0]} à {lines[-1]}): {e}", len(lines))
+            return
+        with self._lock:
+            self.counters["accepted"] += len(lines)
+            self.counters["triples"] += len(chunk)
+            self.counters["chunks"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = time.perf_counter() - self._started if self.status == "running" else self._elapsed
+            return dict(
+                self.counters,
+                job_id=self.job_id,
+                kind=self.kind,
+                status=self.status,
+                elapsed_seconds=round(elapsed, 3),
+                rows_per_second=round(self.counters["rows"] / elapsed, 1) if elapsed else 0,
+                errors=list(self.errors),
+            )
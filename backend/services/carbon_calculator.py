@@ -0,0 +1,101 @@
+# Calculateur d'empreinte carbone (vectorisé)
+from typing import Dict, List, Any, Iterable, Sequence, Tuple
+import numpy as np
+
+# Émissions en kg de CO2 par km et par voyageur
+EMISSION_FACTORS = {
+    "Avion": 0.255,
+    "Train": 0.041,
+    "Bus": 0.089,
+    "Voiture": 0.192,
+    "Velo": 0.0,
+}
+DEFAULT_EMISSION_FACTOR = 0.2  # transport inconnu
+CARBON_LEVELS = ("Faible", "Moyen", "Élevé")
+
+
+def carbon_scores(co2_kg: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(indice de niveau dans CARBON_LEVELS, score 0-100) pour chaque valeur; même barème que calculate_carbon_score"""
+    co2_kg = np.asarray(co2_kg, dtype=float)
+    levels = np.where(co2_kg <= 50, 0, np.where(co2_kg <= 150, 1, 2)).astype(np.int8)
+    scores = np.select(
+        [levels == 0, levels == 1],
+        [100.0, np.maximum(0, 100 - ((co2_kg - 50) / 100) * 50)],
+        np.maximum(0, 50 - ((co2_kg - 150) / 100) * 50),
+    )
+    return levels, np.round(scores, 2)
+
+
+class CarbonCalculator:
+    """Émissions de lots de trajets (type de transport, distance) en tableaux NumPy
+
+    Les types sont encodés une fois par valeur distincte (np.unique), puis
+    émissions, niveaux, scores et alternatives sont calculés par opérations
+    sur colonnes entières, sans boucle Python par trajet.
+    """
+
+    def __init__(self, factors: Dict[str, float] = None, default_factor: float = DEFAULT_EMISSION_FACTOR):
+        factors = EMISSION_FACTORS if factors is None else factors
+        self.modes = list(factors)
+        self._indices = {mode: i for i, mode in enumerate(self.modes)}
+        # Dernière case: transports inconnus (jamais proposés comme alternative)
+        self.factors = np.array([factors[m] for m in self.modes] + [default_factor], dtype=float)
+        # Alternatives classées par émissions croissantes (identique pour chaque trajet, distances >= 0)
+        self._ranking = np.argsort(self.factors[:-1], kind="stable")
+        self._rank_of = np.empty(len(self.modes) + 1, dtype=np.int64)
+        self._rank_of[self._ranking] = np.arange(len(self.modes))
+        self._rank_of[-1] = len(self.modes)
+
+    def factor(self, transport_type: str) -> float:
+        return float(self.factors[self._indices.get(transport_type, len(self.modes))])
+
+    def encode(self, transport_types: Sequence[str]) -> np.ndarray:
+        """Types -> indices dans `factors` (le dernier pour un type inconnu)"""
+        distinct, inverse = np.unique(np.asarray(transport_types, dtype=str), return_inverse=True)
+        codes = np.array([self._indices.get(t, len(self.modes)) for t in distinct.tolist()], dtype=np.int64)
+        return codes[inverse.reshape(-1)] if len(distinct) else np.empty(0, dtype=np.int64)
+
+    def calculate_batch(self, transport_types: Sequence[str], distances_km: Iterable[float], alternatives: int = 3) -> Dict[str, Any]:
+        """Émissions, niveaux et scores de chaque trajet, et ses `alternatives` moins émettrices
+
+        Retourne des colonnes: total_co2_kg, carbon_level, carbon_score (n,),
+        puis alternatives/alternative_co2_kg/savings (n, k), les alternatives
+        étant classées par émissions croissantes, sans le transport du trajet.
+        """
+        modes = self.encode(transport_types)
+        distances = np.asarray(distances_km, dtype=float).reshape(-1)
+        if len(distances) != len(modes):
+            raise ValueError(f"{len(modes)} transports pour {len(distances)} distances")
+        if not np.isfinite(distances).all() or (distances < 0).any():
+            raise ValueError("Les distances doivent être des nombres positifs")
+
+        co2 = distances * self.factors[modes]
+        levels, scores = carbon_scores(co2)
+
+        # j-ième alternative: j-ième rang du classement, en sautant celui du trajet
+        k = max(0, min(alternatives, len(self.modes) - 1))
+        ranks = np.arange(k)[None, :]
+        alternative_modes = self._ranking[ranks + (ranks >= self._rank_of[modes][:, None])]
+        alternative_co2 = distances[:, None] * self.factors[alternative_modes]
+        return {
+            "total_co2_kg": np.round(co2, 2),
+            "carbon_level": levels,
+            "carbon_score": scores,
+            "alternatives": alternative_modes,
+            "alternative_co2_kg": np.round(alternative_co2, 2),
+            "savings": np.round(co2[:, None] - alternative_co2, 2),
+        }
+
+    def to_columns(self, transport_types: Sequence[str], distances_km: Sequence[float], result: Dict[str, Any]) -> Dict[str, List[Any]]:
+        """Résultat de calculate_batch en colonnes JSON (noms de transports et de niveaux)"""
+        modes = np.array(self.modes, dtype=object)
+        return {
+            "transport": list(transport_types),
+            "distance_km": np.asarray(distances_km, dtype=float).tolist(),
+            "total_co2_kg": result["total_co2_kg"].tolist(),
+            "carbon_level": np.array(CARBON_LEVELS, dtype=object)[result["carbon_level"]].tolist(),
+            "carbon_score": result["carbon_score"].tolist(),
+            "alternatives": modes[result["alternatives"]].tolist(),
+            "alternative_co2_kg": result["alternative_co2_kg"].tolist(),
+            "savings": result["savings"].tolist(),
+        }
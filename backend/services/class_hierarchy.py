@@ -0,0 +1,142 @@
+# Class Hierarchy (materialised rdfs:subClassOf closure)
+import os
+from collections import deque
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Tuple, Optional
+from config import ONTOLOGY_NS, ONTOLOGY_FILE, ONTOLOGY_SNAPSHOT, ONTOLOGY_SOURCE_NS
+from .triple_store import TripleStore, RDFS_NS, iri
+
+RDFS_SUBCLASS_OF = RDFS_NS + "subClassOf"
+
+
+class ClassHierarchy:
+    """Fermeture transitive de rdfs:subClassOf, calculée une fois
+
+    Les classes sont des IRI; les méthodes acceptent aussi un nom local,
+    complété avec `namespace`.
+    """
+
+    def __init__(self, edges: Iterable[Tuple[str, str]], namespace: str = ONTOLOGY_NS):
+        self.namespace = namespace
+        parents: Dict[str, list] = {}
+        children: Dict[str, list] = {}
+        for sub, sup in edges:
+            if sub == sup:
+                continue
+            parents.setdefault(sub, []).append(sup)
+            children.setdefault(sup, []).append(sub)
+            parents.setdefault(sup, [])
+            children.setdefault(sub, [])
+        # Ancêtres par distance croissante (plus proche d'abord), ordre stable
+        self._ancestors: Dict[str, Tuple[str, ...]] = {
+            cls: self._walk(cls, parents) for cls in parents
+        }
+        self._superclasses: Dict[str, FrozenSet[str]] = {
+            cls: frozenset((cls,) + ancestors) for cls, ancestors in self._ancestors.items()
+        }
+        self._subclasses: Dict[str, FrozenSet[str]] = {
+            cls: frozenset((cls,) + self._walk(cls, children)) for cls in children
+        }
+        self._type_patterns: Dict[Tuple[str, str], str] = {}
+
+    @staticmethod
+    def _walk(start: str, graph: Dict[str, list]) -> Tuple[str, ...]:
+        seen = {start}
+        order = []
+        queue = deque([start])
+        while queue:
+            for neighbour in sorted(graph.get(queue.popleft(), ())):
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    order.append(neighbour)
+                    queue.append(neighbour)
+        return tuple(order)
+
+    @classmethod
+    def from_store(cls, store: TripleStore, namespace: str = ONTOLOGY_NS) -> "ClassHierarchy":
+        """Construit la hiérarchie depuis les triplets rdfs:subClassOf d'un store"""
+        edges = [
+            (sub[1], sup[1])
+            for sub, _, sup in store.triples(None, iri(RDFS_SUBCLASS_OF), None)
+            if sub[0] == "uri" and sup[0] == "uri"
+        ]
+        return cls(edges, namespace)
+
+    def _iri(self, name: str) -> str:
+        return name if "://" in name else self.namespace + name
+
+    def local_name(self, class_iri: str) -> str:
+        if class_iri.startswith(self.namespace):
+            return class_iri[len(self.namespace):]
+        return class_iri.rsplit("#", 1)[-1].rsplit("/", 1)[-1]
+
+    def subclasses(self, name: str) -> FrozenSet[str]:
+        """La classe et toutes ses sous-classes (IRI)"""
+        class_iri = self._iri(name)
+        return self._subclasses.get(class_iri, frozenset((class_iri,)))
+
+    def superclasses(self, name: str) -> FrozenSet[str]:
+        """La classe et toutes ses super-classes (IRI)"""
+        class_iri = self._iri(name)
+        return self._superclasses.get(class_iri, frozenset((class_iri,)))
+
+    def is_subclass(self, name: str, parent: str) -> bool:
+        """name ⊑ parent (réflexif)"""
+        return self._iri(parent) in self.superclasses(name)
+
+    def find_subclass(self, term: str, base: str) -> Optional[str]:
+        """Nom local de la sous-classe de `base` désignée par `term` ('culturelle' -> 'ActiviteCulturelle')
+
+        Nom exact d'abord (sans casse ni accents), sinon parmi les noms qui le
+        contiennent: celui qui englobe tous les autres, à défaut le plus court.
+        """
+        from .gazetteer import fold
+        wanted = fold(term).replace(" ", "").replace("-", "")
+        names = sorted(self.local_name(c) for c in self.subclasses(base))
+        for name in names:
+            if fold(name) == wanted:
+                return name
+        matches = [name for name in names if wanted and wanted in fold(name)]
+        for name in matches:
+            if all(self.is_subclass(other, name) for other in matches):
+                return name
+        return min(matches, key=len) if matches else None
+
+    def type_pattern(self, var: str, class_name: str) -> str:
+        """Motif SPARQL ?var rdf:type <classe ou une de ses sous-classes> (VALUES, sans property path)"""
+        pattern = self._type_patterns.get((var, class_name))
+        if pattern is not None:
+            return pattern
+        classes = sorted(self.subclasses(class_name))
+        if len(classes) == 1:
+            pattern = f"?{var} rdf:type <{classes[0]}> ."
+        else:
+            values = " ".join(f"<{cls}>" for cls in classes)
+            pattern = f"VALUES ?{var}Class {{ {values} }}\n  ?{var} rdf:type ?{var}Class ."
+        self._type_patterns[(var, class_name)] = pattern
+        return pattern
+
+    def resolve(self, name: str, candidates) -> Optional[str]:
+        """Nom local de la classe la plus proche (elle-même puis ses ancêtres) présente dans `candidates`"""
+        class_iri = self._iri(name)
+        for current in (class_iri,) + self._ancestors.get(class_iri, ()):
+            local = self.local_name(current)
+            if local in candidates:
+                return local
+        return None
+
+
+@lru_cache(maxsize=1)
+def get_ontology_store() -> TripleStore:
+    """Triplets de l'ontologie du projet (chargés via le snapshot binaire), partagés en lecture seule"""
+    from .rdf_loader import load_ontology
+    store = TripleStore()
+    if os.path.exists(ONTOLOGY_FILE):
+        load_ontology(store, ONTOLOGY_FILE, ONTOLOGY_SNAPSHOT, {ONTOLOGY_SOURCE_NS: ONTOLOGY_NS})
+    return store
+
+
+@lru_cache(maxsize=1)
+def get_class_hierarchy() -> ClassHierarchy:
+    """Hiérarchie de l'ontologie du projet"""
+    return ClassHierarchy.from_store(get_ontology_store())
@@ -1,50 +1,121 @@
 # Fuseki Client Service
+import threading
 import requests
-from typing import Dict, List, Any
-from config import FUSEKI_ENDPOINT
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Any, Iterator, Union
+from config import (
+    FUSEKI_ENDPOINT,
+    FUSEKI_TIMEOUT,
+    FUSEKI_POOL_CONNECTIONS,
+    FUSEKI_POOL_MAXSIZE,
+    FUSEKI_POOL_BLOCK,
+    FUSEKI_STREAM_CHUNK_SIZE,
+)
+from .result_stream import iter_rows
+from .result_set import ResultSet
 
 class FusekiClient:
     """Client pour interagir avec Apache Jena Fuseki"""
-    
-    def __init__(self, endpoint: str = FUSEKI_ENDPOINT):
+
+    def __init__(
+        self,
+        endpoint: str = FUSEKI_ENDPOINT,
+        pool_connections: int = FUSEKI_POOL_CONNECTIONS,
+        pool_maxsize: int = FUSEKI_POOL_MAXSIZE,
+        pool_block: bool = FUSEKI_POOL_BLOCK,
+        timeout: float = FUSEKI_TIMEOUT
+    ):
         self.endpoint = endpoint
+        self.update_endpoint = endpoint.replace("/sparql", "/update")
+        self.timeout = timeout
         self.headers = {
             "Accept": "application/sparql-results+json",
             "Content-Type": "application/sparql-query"
         }
-    
+
+        # Un pool keep-alive par endpoint: les écritures ne monopolisent
+        # jamais les connexions utilisées par les lectures
+        self._sessions = {
+            "query": self._create_session(pool_connections, pool_maxsize, pool_block),
+            "update": self._create_session(pool_connections, pool_maxsize, pool_block),
+        }
+        self._lock = threading.Lock()
+        self._requests = {"query": 0, "update": 0}
+        self._in_flight = {"query": 0, "update": 0}
+        # Version du jeu de données, incrémentée à chaque écriture réussie
+        self.version = 0
+
+    @staticmethod
+    def _create_session(pool_connections: int, pool_maxsize: int, pool_block: bool) -> requests.Session:
+        """Crée une session HTTP avec un pool de connexions dimensionné"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["Connection"] = "keep-alive"
+        return session
+
+    def _post(self, kind: str, url: str, data: str, headers: Dict[str, str], stream: bool = False) -> requests.Response:
+        """Envoie un POST via le pool dédié en comptant les requêtes en vol"""
+        with self._lock:
+            self._requests[kind] += 1
+            self._in_flight[kind] += 1
+        try:
+            return self._sessions[kind].post(
+                url,
+                data=data.encode("utf-8"),
+                headers=headers,
+                timeout=self.timeout,
+                stream=stream
+            )
+        finally:
+            with self._lock:
+                self._in_flight[kind] -= 1
+
     def query(self, sparql_query: str) -> Dict[str, Any]:
         """Exécute une requête SPARQL SELECT"""
         try:
-            response = requests.post(
-                self.endpoint,
-                data=sparql_query,
-                headers=self.headers,
-                timeout=30
-            )
+            response = self._post("query", self.endpoint, sparql_query, self.headers)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             raise Exception(f"Erreur Fuseki: {str(e)}")
-    
+
+    def query_stream(self, sparql_query: str) -> Iterator[Dict[str, str]]:
+        """Exécute une requête SELECT et produit les lignes au fil de la réception"""
+        try:
+            response = self._post("query", self.endpoint, sparql_query, self.headers, stream=True)
+            with response:
+                response.raise_for_status()
+                yield from iter_rows(response.iter_content(chunk_size=FUSEKI_STREAM_CHUNK_SIZE))
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Erreur Fuseki: {str(e)}")
+
     def update(self, sparql_update: str) -> bool:
         """Exécute une requête SPARQL UPDATE"""
         try:
-            update_endpoint = self.endpoint.replace("/sparql", "/update")
-            response = requests.post(
-                update_endpoint,
-                data=sparql_update,
-                headers={"Content-Type": "application/sparql-update"},
-                timeout=30
+            response = self._post(
+                "update",
+                self.update_endpoint,
+                sparql_update,
+                {"Content-Type": "application/sparql-update"}
             )
             response.raise_for_status()
+            with self._lock:
+                self.version += 1
             return True
         except requests.exceptions.RequestException as e:
             raise Exception(f"Erreur mise à jour Fuseki: {str(e)}")
-    
-    def parse_results(self, results: Dict[str, Any]) -> List[Dict[str, str]]:
-        """Parse les résultats SPARQL"""
+
+    def parse_results(self, results: Dict[str, Any], columnar: bool = False) -> Union[List[Dict[str, str]], ResultSet]:
+        """Parse les résultats SPARQL (columnar=True retourne un ResultSet compact)"""
         try:
+            if columnar:
+                return ResultSet.from_sparql_json(results)
             bindings = results.get("results", {}).get("bindings", [])
             parsed = []
             for binding in bindings:
@@ -56,3 +127,29 @@ class FusekiClient:
             return parsed
         except Exception as e:
             raise Exception(f"Erreur parsing résultats: {str(e)}")
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Statistiques des pools de connexions (hits, misses, en vol)"""
+        stats = {}
+        for kind, session in self._sessions.items():
+            adapter = session.get_adapter(self.endpoint)
+            pools = adapter.poolmanager.pools
+            # Chaque pool urllib3 compte les connexions TCP qu'il a dû ouvrir
+            misses = sum(pools[key].num_connections for key in pools.keys())
+            with self._lock:
+                total = self._requests[kind]
+                in_flight = self._in_flight[kind]
+            stats[kind] = {
+                "requests": total,
+                "hits": max(0, total - misses),
+                "misses": misses,
+                "in_flight": in_flight,
+                "hosts": len(pools),
+                "pool_maxsize": adapter._pool_maxsize,
+            }
+        return stats
+
+    def close(self):
+        """Ferme les connexions keep-alive des deux pools"""
+        for session in self._sessions.values():
+            session.close()
@@ -0,0 +1,210 @@
+# Place-Name Gazetteer (Aho-Corasick)
+import re
+import threading
+import unicodedata
+from collections import deque
+from typing import Dict, List, Any, Iterable
+from config import ONTOLOGY_NS
+from .triple_store import TripleStore, Triple, RDF_TYPE, iri
+from .class_hierarchy import ClassHierarchy, get_class_hierarchy
+
+_FOLD_CACHE: Dict[str, str] = {}
+_SEPARATORS_RE = re.compile(r"[\W_]+")
+
+
+def fold(text: str) -> str:
+    """Minuscules sans accents ('Île de Djerba' -> 'ile de djerba'), caractère par caractère"""
+    folded = []
+    for char in text:
+        mapped = _FOLD_CACHE.get(char)
+        if mapped is None:
+            decomposed = unicodedata.normalize("NFD", char)
+            mapped = "".join(c for c in decomposed if not unicodedata.combining(c)).lower() or char
+            _FOLD_CACHE[char] = mapped
+        folded.append(mapped)
+    return "".join(folded)
+
+
+def normalize(text: str) -> str:
+    """Texte plié, ponctuation et espaces réduits à un espace ('Eco-Resort !' -> 'eco resort')"""
+    return _SEPARATORS_RE.sub(" ", fold(text)).strip()
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum()
+
+
+class Gazetteer:
+    """Dictionnaire de lieux compilé en automate d'Aho-Corasick
+
+    La recherche est en O(longueur de la question + nombre de correspondances),
+    quel que soit le nombre de noms. Noms et questions sont comparés une fois
+    normalisés (`normalize`), comme les clés du cache de traductions. L'ajout d'un nom étend le trie tout de
+    suite; les liens d'échec sont recalculés paresseusement à la recherche
+    suivante.
+    """
+
+    def __init__(self, hierarchy: ClassHierarchy = None, namespace: str = ONTOLOGY_NS):
+        self.namespace = namespace
+        self._hierarchy = hierarchy
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Motifs se terminant dans l'état (longueur du motif plié)
+        self._outputs: List[List[int]] = [[]]
+        # Lien vers le plus proche suffixe qui est un état de sortie
+        self._output_link: List[int] = [0]
+        self._patterns: List[str] = []
+        self._entities: List[List[Dict[str, str]]] = []
+        self._pattern_ids: Dict[str, int] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        # Incrémenté à chaque nom ajouté (invalide les traductions mises en cache)
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    @property
+    def hierarchy(self) -> ClassHierarchy:
+        if self._hierarchy is None:
+            self._hierarchy = get_class_hierarchy()
+        return self._hierarchy
+
+    # --- Construction -----------------------------------------------------
+
+    def add(self, label: str, entity_type: str, uri: str = None) -> bool:
+        """Ajoute un nom de lieu; retourne False s'il était déjà connu pour ce type"""
+        key = normalize(label)
+        if not key:
+            return False
+        entity = {"label": label, "type": entity_type}
+        if uri:
+            entity["uri"] = uri
+        with self._lock:
+            pattern_id = self._pattern_ids.get(key)
+            if pattern_id is not None:
+                entities = self._entities[pattern_id]
+                if any(e["type"] == entity_type and e["label"] == label for e in entities):
+                    return False
+                entities.append(entity)
+                self.version += 1
+                return True
+            pattern_id = len(self._patterns)
+            self._patterns.append(key)
+            self._entities.append([entity])
+            self._pattern_ids[key] = pattern_id
+            state = 0
+            for char in key:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._outputs.append([])
+                    self._output_link.append(0)
+                    self._goto[state][char] = next_state
+                state = next_state
+            self._outputs[state].append(pattern_id)
+            self._dirty = True
+            self.version += 1
+            return True
+
+    def _build_links(self):
+        """Calcule les liens d'échec (parcours en largeur du trie)"""
+        goto, fail, outputs, output_link = self._goto, self._fail, self._outputs, self._output_link
+        queue = deque()
+        for state in goto[0].values():
+            fail[state] = 0
+            output_link[state] = 0
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for char, child in goto[state].items():
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(char, 0)
+                fail[child] = target if target != child else 0
+                output_link[child] = fail[child] if outputs[fail[child]] else output_link[fail[child]]
+                queue.append(child)
+        self._dirty = False
+
+    # --- Recherche --------------------------------------------------------
+
+    def find(self, text: str) -> List[Dict[str, Any]]:
+        """Lieux cités dans le texte: mots entiers, correspondances les plus longues, sans chevauchement"""
+        if not self._patterns:
+            return []
+        with self._lock:
+            if self._dirty:
+                self._build_links()
+        folded = normalize(text)
+        goto, fail, outputs, output_link = self._goto, self._fail, self._outputs, self._output_link
+        patterns = self._patterns
+        candidates = []
+        state = 0
+        for index, char in enumerate(folded):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            match_state = state if outputs[state] else output_link[state]
+            while match_state:
+                end = index + 1
+                after_ok = end == len(folded) or not _is_word_char(folded[end])
+                for pattern_id in outputs[match_state]:
+                    start = end - len(patterns[pattern_id])
+                    if after_ok and (start == 0 or not _is_word_char(folded[start - 1])):
+                        candidates.append((start, end, pattern_id))
+                match_state = output_link[match_state]
+
+        # Sélection gauche-droite, plus long d'abord
+        candidates.sort(key=lambda c: (c[0], -(c[1] - c[0])))
+        matches = []
+        position = 0
+        for start, end, pattern_id in candidates:
+            if start < position:
+                continue
+            for entity in self._entities[pattern_id]:
+                matches.append(dict(entity, start=start, end=end))
+            position = end
+        return matches
+
+    # --- Alimentation depuis le triple store --------------------------------
+
+    @classmethod
+    def from_store(cls, store: TripleStore, hierarchy: ClassHierarchy = None, namespace: str = ONTOLOGY_NS) -> "Gazetteer":
+        """Construit le dictionnaire depuis les régions (localiseDans) et les noms de destinations"""
+        gazetteer = cls(hierarchy, namespace)
+        gazetteer._index_triples(store, store.triples(None, iri(namespace + "localiseDans"), None))
+        for class_iri in gazetteer.hierarchy.subclasses("Destination"):
+            for subject in store.subjects(iri(RDF_TYPE), iri(class_iri)):
+                for name in store.objects(subject, iri(namespace + "nom")):
+                    gazetteer.add(name[1], "destination", subject[1])
+        return gazetteer
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, str]], label_key: str = "label", type_key: str = "type") -> "Gazetteer":
+        """Construit le dictionnaire depuis des lignes de résultats SPARQL (Fuseki distant)"""
+        gazetteer = cls()
+        for row in rows:
+            if row.get(label_key):
+                gazetteer.add(row[label_key], row.get(type_key, "region"), row.get("uri"))
+        return gazetteer
+
+    def watch(self, store: TripleStore):
+        """Met le dictionnaire à jour quand des destinations ou régions sont insérées"""
+        store.add_listener(lambda triples: self._index_triples(store, triples))
+
+    def _index_triples(self, store: TripleStore, triples: Iterable[Triple]):
+        namespace = self.namespace
+        located_in, name, rdf_type = iri(namespace + "localiseDans"), iri(namespace + "nom"), iri(RDF_TYPE)
+        destination_classes = self.hierarchy.subclasses("Destination")
+        for s, p, o in triples:
+            if p == located_in and o[0] == "literal":
+                self.add(o[1], "region")
+            elif p == name and o[0] == "literal":
+                if any(t[1] in destination_classes for t in store.objects(s, rdf_type)):
+                    self.add(o[1], "destination", s[1])
+            elif p == rdf_type and o[1] in destination_classes:
+                for label in store.objects(s, name):
+                    self.add(label[1], "destination", s[1])
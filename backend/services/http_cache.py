@@ -0,0 +1,38 @@
+# HTTP Conditional Caching Helpers (ETag / 304)
+import hashlib
+import uuid
+from typing import Optional
+from config import HTTP_CACHE_MAX_AGE
+
+# Distingue les versions de deux processus successifs: le compteur de
+# version repart de zéro à chaque démarrage
+BOOT_ID = uuid.uuid4().hex[:8]
+
+CACHE_CONTROL = f"public, max-age={HTTP_CACHE_MAX_AGE}, must-revalidate"
+
+
+def make_etag(dataset_version: int, path: str, query_string: str = "", revision: Optional[int] = None) -> str:
+    """ETag faible dérivé de la version des données et de l'URL demandée
+
+    `revision`: état propre à la ressource qui peut changer sans écriture
+    dans le dataset (compteurs de /stats recomptés, par exemple).
+    """
+    digest = hashlib.blake2s(f"{path}?{query_string}".encode("utf-8"), digest_size=6).hexdigest()
+    version = dataset_version if revision is None else f"{dataset_version}.{revision}"
+    return f'W/"{BOOT_ID}-{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compare l'en-tête If-None-Match à l'ETag courant (comparaison faible)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    current = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == current:
+            return True
+    return False
@@ -0,0 +1,169 @@
+# Itinerary Optimizer (beam search multi-objectif)
+import time
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+
+# Index d'option quand une catégorie (hébergement, transport) est vide
+NO_OPTION = -1
+
+
+def pareto_mask(objectives: np.ndarray) -> np.ndarray:
+    """Lignes non dominées d'une matrice (états x objectifs à maximiser); doublons: la première est gardée"""
+    count = len(objectives)
+    if count <= 1:
+        return np.ones(count, dtype=bool)
+    weakly = (objectives[:, None, :] >= objectives[None, :, :]).all(axis=2)
+    strictly = (objectives[:, None, :] > objectives[None, :, :]).any(axis=2)
+    # dominated[i, j]: i domine j, ou j est un doublon d'un i antérieur
+    dominated = weakly & (strictly | np.triu(np.ones((count, count), dtype=bool), 1))
+    np.fill_diagonal(dominated, False)
+    return ~dominated.any(axis=0)
+
+
+def front_2d(cost: np.ndarray, co2: np.ndarray) -> np.ndarray:
+    """Indices du front (coût, CO2) à minimiser, en O(n log n), par coût croissant"""
+    order = np.lexsort((co2, cost))
+    best = np.minimum.accumulate(co2[order])
+    # Gardé si son CO2 est strictement inférieur à tout ce qui coûte moins ou autant
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = co2[order][1:] < best[:-1]
+    return order[keep]
+
+
+class ItineraryOptimizer:
+    """Choix d'un transport, d'un hébergement et d'au plus `days` activités
+
+    Maximise la somme des scores de compatibilité sous un plafond de budget
+    et de CO2, et retourne le front de Pareto (score, coût, CO2). Recherche
+    en faisceau: les activités (pré-sélectionnées, `pool_size` par critère)
+    sont examinées une à une, meilleur score d'abord; à chaque étape seuls les
+    états non dominés sont gardés, au plus `beam_width`. Passé `time_budget`
+    secondes, le meilleur front trouvé est retourné (complete=False).
+    """
+
+    def __init__(self, beam_width: int = 64, pool_size: int = 64, time_budget: float = 0.25):
+        self.beam_width = beam_width
+        self.pool_size = pool_size
+        self.time_budget = time_budget
+
+    def candidate_pool(self, match: np.ndarray, cost: np.ndarray, co2: np.ndarray, budget: float, max_co2: float) -> np.ndarray:
+        """Activités examinées: les meilleures par score, prix, CO2 et score par euro, faisables seules"""
+        usable = np.flatnonzero((match > 0) & (cost <= budget) & (co2 <= max_co2))
+        if len(usable) <= self.pool_size:
+            selected = usable
+        else:
+            criteria = (-match[usable], cost[usable], co2[usable], -match[usable] / (cost[usable] + 1))
+            selected = np.unique(np.concatenate([
+                usable[np.argpartition(values, self.pool_size - 1)[:self.pool_size]] for values in criteria
+            ]))
+        # Meilleur score d'abord (à score égal, le moins cher): le front utile est trouvé tôt
+        return selected[np.lexsort((cost[selected], -match[selected]))]
+
+    def solve(
+        self,
+        activities: Tuple[np.ndarray, np.ndarray, np.ndarray],
+        accommodations: Tuple[np.ndarray, np.ndarray],
+        transports: Tuple[np.ndarray, np.ndarray],
+        days: int,
+        budget: float,
+        max_co2: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Front de Pareto des itinéraires faisables
+
+        `activities` = (score, prix, kgCO2) par activité; `accommodations` =
+        (prix du séjour, kgCO2 du séjour); `transports` = (prix, kgCO2).
+        Chaque itinéraire du front est un dict d'indices dans ces tableaux.
+        """
+        started = time.perf_counter()
+        max_co2 = np.inf if max_co2 is None else max_co2
+        match, act_cost, act_co2 = (np.asarray(a, dtype=float) for a in activities)
+
+        # Couples (transport, hébergement) non dominés en (coût, CO2)
+        transport_ids, transport_cost, transport_co2 = self._options(*transports)
+        stay_ids, stay_cost, stay_co2 = self._options(*accommodations)
+        pair_cost = (transport_cost[:, None] + stay_cost[None, :]).ravel()
+        pair_co2 = (transport_co2[:, None] + stay_co2[None, :]).ravel()
+        pairs = front_2d(pair_cost, pair_co2)
+        pairs = pairs[(pair_cost[pairs] <= budget) & (pair_co2[pairs] <= max_co2)][:self.beam_width]
+
+        states = {
+            "match": np.zeros(len(pairs)),
+            "cost": pair_cost[pairs],
+            "co2": pair_co2[pairs],
+            "count": np.zeros(len(pairs), dtype=np.int64),
+            "transport": transport_ids[pairs // len(stay_ids)],
+            "accommodation": stay_ids[pairs % len(stay_ids)],
+        }
+        chosen: List[tuple] = [()] * len(pairs)
+
+        pool = self.candidate_pool(match, act_cost, act_co2, budget, max_co2) if days > 0 and len(pairs) else np.empty(0, dtype=np.int64)
+        examined = 0
+        complete = True
+        for item in pool.tolist():
+            if time.perf_counter() - started > self.time_budget:
+                complete = False
+                break
+            examined += 1
+            fits = (
+                (states["count"] < days)
+                & (states["cost"] + act_cost[item] <= budget)
+                & (states["co2"] + act_co2[item] <= max_co2)
+            )
+            if not fits.any():
+                continue
+            extended = np.flatnonzero(fits)
+            states = {
+                "match": np.concatenate([states["match"], states["match"][extended] + match[item]]),
+                "cost": np.concatenate([states["cost"], states["cost"][extended] + act_cost[item]]),
+                "co2": np.concatenate([states["co2"], states["co2"][extended] + act_co2[item]]),
+                "count": np.concatenate([states["count"], states["count"][extended] + 1]),
+                "transport": np.concatenate([states["transport"], states["transport"][extended]]),
+                "accommodation": np.concatenate([states["accommodation"], states["accommodation"][extended]]),
+            }
+            chosen = chosen + [chosen[s] + (item,) for s in extended.tolist()]
+            # Moins d'activités à score égal laisse plus de place aux suivantes: objectif de recherche
+            keep = self._prune(states, -states["count"])
+            states = {name: values[keep] for name, values in states.items()}
+            chosen = [chosen[s] for s in keep.tolist()]
+
+        front = np.flatnonzero(pareto_mask(np.stack([states["match"], -states["cost"], -states["co2"]], axis=1)))
+        front = front[np.lexsort((states["co2"][front], states["cost"][front], -states["match"][front]))]
+        return {
+            "front": [
+                {
+                    "match_score": float(states["match"][s]),
+                    "cost": float(states["cost"][s]),
+                    "kg_co2": float(states["co2"][s]),
+                    "transport": int(states["transport"][s]),
+                    "accommodation": int(states["accommodation"][s]),
+                    "activities": list(chosen[s]),
+                }
+                for s in front.tolist()
+            ],
+            "complete": complete,
+            "candidates": len(pool),
+            "examined": examined,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def _options(self, cost: np.ndarray, co2: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(indices, coûts, CO2) du front d'une catégorie; une option vide et gratuite si aucune"""
+        cost, co2 = np.asarray(cost, dtype=float), np.asarray(co2, dtype=float)
+        if len(cost) == 0:
+            return np.array([NO_OPTION]), np.zeros(1), np.zeros(1)
+        ids = front_2d(cost, co2)[:self.beam_width]
+        return ids, cost[ids], co2[ids]
+
+    def _prune(self, states: Dict[str, np.ndarray], extra: np.ndarray) -> np.ndarray:
+        """États non dominés; au-delà de beam_width, moitié par score, moitié par marge restante"""
+        keep = np.flatnonzero(pareto_mask(np.stack([states["match"], -states["cost"], -states["co2"], extra], axis=1)))
+        if len(keep) <= self.beam_width:
+            return keep
+        by_match = keep[np.lexsort((states["cost"][keep], -states["match"][keep]))]
+        half = self.beam_width // 2
+        selected = list(by_match[:half])
+        rest = by_match[half:]
+        # Marge: coût et CO2 normalisés (les états économes laissent place à d'autres activités)
+        slack = states["cost"][rest] / max(states["cost"][rest].max(), 1) + states["co2"][rest] / max(states["co2"][rest].max(), 1)
+        selected.extend(rest[np.argsort(slack, kind="stable")[:self.beam_width - half]])
+        return np.sort(np.array(selected, dtype=np.int64))
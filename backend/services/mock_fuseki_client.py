@@ -1,12 +1,55 @@
 # Mock Fuseki Client - Works without actual Fuseki server
-import json
-from typing import Dict, List, Any
-from datetime import datetime
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Any, Iterator, Union
+from config import ONTOLOGY_NS, ONTOLOGY_FILE, ONTOLOGY_SOURCE_NS
+from .result_set import ResultSet
+from .triple_store import TripleStore, Triple, RDF_TYPE, XSD_NS, iri, literal
+from .sparql_engine import SparqlEngine
+from .rdf_loader import load_ontology
+from .class_hierarchy import ClassHierarchy
+
+# Table -> (classes rdf:type, propriétés typées {clé: (propriété, datatype)})
+TABLE_MAPPING = {
+    "destinations": (["Destination"], {"scoreDurabilite": ("scoreDurabilite", XSD_NS + "integer")}),
+    "hebergements": (["Hebergement"], {
+        "scoreDurabilite": ("scoreDurabilite", XSD_NS + "integer"),
+        "certification": ("aCertification", None),
+        "prix": ("prix", XSD_NS + "decimal"),  # par nuit
+    }),
+    "activites": (["ActiviteTouristique"], {
+        "kgCO2": ("kgCO2", XSD_NS + "decimal"),
+        "prix": ("prix", XSD_NS + "decimal"),
+    }),
+    "certifications": (["CertificatEco"], {}),
+    "transports": (["Transport"], {
+        "kgCO2": ("kgCO2", XSD_NS + "decimal"),
+        "prix": ("prix", XSD_NS + "decimal"),
+    }),
+    "voyageurs": (["Voyageur"], {
+        "profil": ("aProfil", None),
+        "empreinteCarbone": ("empreinteCarbone", XSD_NS + "decimal"),
+        "avis": ("note", XSD_NS + "integer"),
+    }),
+}
+
+# Type d'activité du jeu de données -> classe de l'ontologie
+ACTIVITY_CLASSES = {
+    "Sportive": "ActiviteSportive",
+    "Culturelle": "ActiviteCulturelle",
+    "Detente": "ActiviteDetente",
+    "Educative": "ActiviteEducative",
+    "Familiale": "ActiviteEducative",
+}
 
 class MockFusekiClient:
     """Mock Fuseki Client for development without actual Fuseki server"""
     
     def __init__(self):
+        # Version du jeu de données, incrémentée à chaque écriture
+        self.version = 0
         # In-memory storage - Eco-Tourism Data
         self.data = {
             "destinations": [
@@ -17,75 +60,69 @@ class MockFusekiClient:
                 {"nom": "Medina de Tunis - Patrimoine", "localiseDans": "Tunis", "description": "Exploration culturelle avec artisans locaux", "scoreDurabilite": "80"},
             ],
             "hebergements": [
-                {"nom": "Hotel Écologique Paradise", "localiseDans": "Djerba", "type": "HotelEcologique", "scoreDurabilite": "95", "certification": "EcoTourism", "description": "Hôtel 5 étoiles avec panneaux solaires et gestion écologique de l'eau"},
-                {"nom": "Gîte Rural Nomade", "localiseDans": "Douz", "type": "GiteRural", "scoreDurabilite": "88", "certification": "GreenGlobe", "description": "Hébergement traditionnel avec matériaux locaux"},
-                {"nom": "Auberge Bio Oasis", "localiseDans": "Tozeur", "type": "Auberge", "scoreDurabilite": "85", "certification": "EcoTourism", "description": "Auberge avec jardin bio et cuisine locale"},
-                {"nom": "Camping Écologique Plage", "localiseDans": "Bizerte", "type": "CampingEcoResponsable", "scoreDurabilite": "90", "certification": "GreenGlobe", "description": "Camping zéro déchet face à la mer"},
-                {"nom": "Resort Durable Méditerranée", "localiseDans": "Hammamet", "type": "HotelEcologique", "scoreDurabilite": "92", "certification": "EcoTourism", "description": "Resort avec certification environnementale"},
+                {"nom": "Hotel Écologique Paradise", "localiseDans": "Djerba", "type": "HotelEcologique", "scoreDurabilite": "95", "certification": "EcoTourism", "description": "Hôtel 5 étoiles avec panneaux solaires et gestion écologique de l'eau", "prix": "180"},
+                {"nom": "Gîte Rural Nomade", "localiseDans": "Douz", "type": "GiteRural", "scoreDurabilite": "88", "certification": "GreenGlobe", "description": "Hébergement traditionnel avec matériaux locaux", "prix": "45"},
+                {"nom": "Auberge Bio Oasis", "localiseDans": "Tozeur", "type": "Auberge", "scoreDurabilite": "85", "certification": "EcoTourism", "description": "Auberge avec jardin bio et cuisine locale", "prix": "60"},
+                {"nom": "Camping Écologique Plage", "localiseDans": "Bizerte", "type": "CampingEcoResponsable", "scoreDurabilite": "90", "certification": "GreenGlobe", "description": "Camping zéro déchet face à la mer", "prix": "25"},
+                {"nom": "Resort Durable Méditerranée", "localiseDans": "Hammamet", "type": "HotelEcologique", "scoreDurabilite": "92", "certification": "EcoTourism", "description": "Resort avec certification environnementale", "prix": "150"},
             ],
             "activites": [
-                {"nom": "Randonnée Écologique Ichkeul", "description": "Découverte de la biodiversité", "type": "Sportive", "kgCO2": "2.5", "profileRecommande": "Adventure"},
-                {"nom": "Visite Artisans Médina", "description": "Immersion culturelle avec artisans locaux", "type": "Culturelle", "kgCO2": "0.8", "profileRecommande": "Culture"},
-                {"nom": "Yoga au Coucher de Soleil", "description": "Séance de relaxation en nature", "type": "Detente", "kgCO2": "0.3", "profileRecommande": "BienEtre"},
-                {"nom": "Excursion Famille Désert", "description": "Safari écologique en 4x4 électrique", "type": "Familiale", "kgCO2": "5.2", "profileRecommande": "Famille"},
-                {"nom": "Atelier Cuisine Locale Durable", "description": "Cours de cuisine avec produits locaux bio", "type": "Educative", "kgCO2": "1.1", "profileRecommande": "Culture"},
+                {"nom": "Randonnée Écologique Ichkeul", "description": "Découverte de la biodiversité", "type": "Sportive", "kgCO2": "2.5", "profileRecommande": "Adventure", "prix": "25"},
+                {"nom": "Visite Artisans Médina", "description": "Immersion culturelle avec artisans locaux", "type": "Culturelle", "kgCO2": "0.8", "profileRecommande": "Culture", "prix": "40"},
+                {"nom": "Yoga au Coucher de Soleil", "description": "Séance de relaxation en nature", "type": "Detente", "kgCO2": "0.3", "profileRecommande": "BienEtre", "prix": "20"},
+                {"nom": "Excursion Famille Désert", "description": "Safari écologique en 4x4 électrique", "type": "Familiale", "kgCO2": "5.2", "profileRecommande": "Famille", "prix": "120"},
+                {"nom": "Atelier Cuisine Locale Durable", "description": "Cours de cuisine avec produits locaux bio", "type": "Educative", "kgCO2": "1.1", "profileRecommande": "Culture", "prix": "55"},
             ],
             "certifications": [
                 {"nom": "EcoTourism Certified", "description": "Certification internationale de tourisme écologique", "criteres": "Respect environnement et communautés locales"},
                 {"nom": "Green Globe", "description": "Standard global pour tourisme durable", "criteres": "Performance environnementale et sociale"},
                 {"nom": "Eco-Label Européen", "description": "Label UE pour tourisme responsable", "criteres": "Excellence environnementale"},
             ],
+            "transports": [
+                {"nom": "Train Régional", "kgCO2": "15", "type": "Train", "prix": "30"},
+                {"nom": "Bus Électrique", "kgCO2": "25", "type": "Bus", "prix": "20"},
+                {"nom": "Voiture Partagée", "kgCO2": "45", "type": "TransportTerrestre", "prix": "60"},
+                {"nom": "Vélo", "kgCO2": "0", "type": "VelosElectrique", "prix": "15"},
+                {"nom": "Avion Low-Cost", "kgCO2": "250", "type": "Avion", "prix": "120"},
+            ],
             "voyageurs": [
                 {"nom": "Ahmed", "profil": "Adventure", "empreinteCarbone": "45", "avis": "5"},
                 {"nom": "Fatima", "profil": "Culture", "empreinteCarbone": "28", "avis": "5"},
                 {"nom": "Mohamed", "profil": "BienEtre", "empreinteCarbone": "15", "avis": "4"},
             ]
         }
+        self.store = self._build_store()
+        # Classes et propriétés de l'ontologie (snapshot binaire après le premier chargement)
+        if os.path.exists(ONTOLOGY_FILE):
+            load_ontology(self.store, ONTOLOGY_FILE, namespace_map={ONTOLOGY_SOURCE_NS: ONTOLOGY_NS})
+        self.engine = SparqlEngine(self.store, {"eco": ONTOLOGY_NS, "wm": ONTOLOGY_NS})
+        self._lock = threading.Lock()
     
     def query(self, sparql_query: str) -> Dict[str, Any]:
-        """Mock SPARQL query execution"""
+        """Mock SPARQL query execution (évaluée sur le triple store en mémoire)"""
         print(f"[MOCK FUSEKI] Executing: {sparql_query[:100]}...")
-        
-        # Parse the query to determine what to return
-        query_lower = sparql_query.lower()
-        
-        if "destination" in query_lower:
-            results = self._format_results(self.data["destinations"])
-        elif "hebergement" in query_lower:
-            results = self._format_results(self.data["hebergements"])
-        elif "activit" in query_lower:
-            results = self._format_results(self.data["activites"])
-        elif "certification" in query_lower:
-            results = self._format_results(self.data["certifications"])
-        elif "voyageur" in query_lower or "profile" in query_lower:
-            results = self._format_results(self.data["voyageurs"])
-        elif "count" in query_lower:
-            results = {
-                "results": {
-                    "bindings": [
-                        {
-                            "totalVoyageurs": {"type": "literal", "value": str(len(self.data["voyageurs"]))},
-                            "totalDestinations": {"type": "literal", "value": str(len(self.data["destinations"]))},
-                            "totalHebergements": {"type": "literal", "value": str(len(self.data["hebergements"]))},
-                            "totalActivites": {"type": "literal", "value": str(len(self.data["activites"]))}
-                        }
-                    ]
-                }
-            }
-        else:
-            results = {"results": {"bindings": []}}
-        
-        return results
+        with self._lock:
+            return self.engine.query(sparql_query)
     
+    def query_stream(self, sparql_query: str) -> Iterator[Dict[str, str]]:
+        """Mock streaming: produit les lignes une à une"""
+        with self._lock:
+            rows = list(self.engine.iter_rows(sparql_query))
+        yield from rows
+
     def update(self, sparql_update: str) -> bool:
-        """Mock SPARQL update execution"""
+        """Mock SPARQL update execution (INSERT DATA / DELETE DATA)"""
         print(f"[MOCK FUSEKI] Updating: {sparql_update[:100]}...")
-        # Simulate successful update
+        with self._lock:
+            self.engine.update(sparql_update)
+            self.version += 1
         return True
     
-    def parse_results(self, results: Dict[str, Any]) -> List[Dict[str, str]]:
-        """Parse SPARQL results"""
+    def parse_results(self, results: Dict[str, Any], columnar: bool = False) -> Union[List[Dict[str, str]], ResultSet]:
+        """Parse SPARQL results (columnar=True returns a compact ResultSet)"""
         try:
+            if columnar:
+                return ResultSet.from_sparql_json(results)
             bindings = results.get("results", {}).get("bindings", [])
             parsed = []
             for binding in bindings:
@@ -100,19 +137,50 @@ class MockFusekiClient:
         except Exception as e:
             raise Exception(f"Erreur parsing résultats: {str(e)}")
     
-    def _format_results(self, data: List[Dict]) -> Dict[str, Any]:
-        """Format data as SPARQL results"""
-        bindings = []
-        for item in data:
-            binding = {}
-            for key, value in item.items():
-                binding[key] = {
-                    "type": "literal" if not key.startswith("http") else "uri",
-                    "value": str(value)
-                }
-            bindings.append(binding)
-        
-        return {
-            "head": {"vars": list(data[0].keys()) if data else []},
-            "results": {"bindings": bindings}
-        }
+    def insert_triples(self, triples: List[Triple]) -> int:
+        """Ajout direct dans le store en mémoire (chargement en masse, sans passer par SPARQL)"""
+        with self._lock:
+            added = self.store.add_many(triples)
+            self.version += 1
+        return added
+
+    def _build_store(self) -> TripleStore:
+        """Convertit self.data en triplets RDF (IRI = namespace + nom normalisé)"""
+        store = TripleStore()
+        store.add_many(
+            triple
+            for table in TABLE_MAPPING
+            for item in self.data[table]
+            for triple in item_triples(table, item)
+        )
+        return store
+
+
+def item_triples(table: str, item: Dict[str, str], namespace: str = ONTOLOGY_NS, hierarchy: ClassHierarchy = None) -> List[Triple]:
+    """Triplets d'une entrée de catalogue (clés de TABLE_MAPPING, valeurs lexicales)
+
+    Avec `hierarchy` (entrées non sûres), le champ `type` doit désigner une
+    sous-classe de la classe de la table, sinon ValueError.
+    """
+    classes, fields = TABLE_MAPPING[table]
+    node = iri(namespace + _slug(item["nom"]))
+    rdf_type = iri(RDF_TYPE)
+    triples = [(node, rdf_type, iri(namespace + class_name)) for class_name in classes]
+    for key, value in item.items():
+        if key == "type":
+            class_name = ACTIVITY_CLASSES.get(value, value) if table == "activites" else value
+            if hierarchy is not None:
+                class_name = hierarchy.find_subclass(class_name, classes[0])
+                if class_name is None:
+                    raise ValueError(f"type: {value!r} n'est pas une sous-classe de {classes[0]}")
+            triples.append((node, rdf_type, iri(namespace + class_name)))
+            continue
+        predicate, datatype = fields.get(key, (key, None))
+        triples.append((node, iri(namespace + predicate), literal(value, datatype)))
+    return triples
+
+
+def _slug(name: str) -> str:
+    """Nom local d'IRI: sans accents, caractères non alphanumériques remplacés par '_'"""
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^A-Za-z0-9]+", "_", ascii_name).strip("_")
@@ -1,7 +1,16 @@
 # NL to SPARQL Conversion Service
 import re
-from typing import Dict, List, Tuple
-from config import ONTOLOGY_NS, USE_GEMINI, GEMINI_API_KEY
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Iterable
+from config import ONTOLOGY_NS, USE_GEMINI, GEMINI_API_KEY, GEMINI_MAX_CONCURRENCY, GEMINI_TIMEOUT_SECONDS
+from .class_hierarchy import ClassHierarchy, get_class_hierarchy, get_ontology_store
+from .gazetteer import Gazetteer, fold
+from .translation_cache import TranslationCache, normalize_question
+from .query_validator import QueryValidator
+from .query_templates import TemplateRegistry
+from .sparql_engine import SparqlError
+from .triple_store import TripleStore, RDF_TYPE, RDFS_NS, OWL_NS, iri
 
 try:
     import google.generativeai as genai
@@ -23,11 +32,187 @@ QUERY_PATTERNS = {
     r"impacte?.*environnemental|impact.*écolog|pollution|durabilité": "impacts_eco",
 }
 
+
+def _split_alternatives(pattern: str) -> List[str]:
+    """Découpe un motif sur les '|' de premier niveau (hors groupes et classes de caractères)"""
+    parts, depth, in_class, start, i = [], 0, False, 0, 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            parts.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    parts.append(pattern[start:])
+    return parts
+
+
+def _defer_wildcard(alternative: str) -> str:
+    """'A.*B' -> 'A(?=.*B)': seul le mot-clé initial est consommé, la suite est vérifiée en lookahead
+
+    Sans cela, une alternative consommerait le reste de la question et
+    masquerait les mots-clés des autres intentions lors du balayage unique.
+    """
+    depth = 0
+    for index in range(len(alternative) - 1):
+        char = alternative[index]
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif alternative.startswith(".*", index) and depth == 0 and (index == 0 or alternative[index - 1] != "\\"):
+            if index == 0:
+                return alternative
+            return f"{alternative[:index]}(?={alternative[index:]})"
+    return alternative
+
+
+_LITERAL_RE = re.compile(r"[^\\.^$*+?{}\[\]|()]+")
+
+
+def _compile_intents(patterns: Dict[str, str]):
+    """Compile QUERY_PATTERNS en un seul automate (trie de mots-clés) pour un balayage unique
+
+    Les têtes littérales des alternatives ('hébergement', 'co2', ...) sont
+    factorisées en trie: à chaque position, le moteur ne suit qu'une branche
+    au lieu d'essayer toutes les alternatives. Chaque feuille se termine par
+    un groupe vide nommé qui identifie l'intention (`match.lastgroup`).
+    Retourne (regex, {groupe: intention}).
+    """
+    trie: Dict[str, dict] = {}
+    residual = []
+    for pattern, query_type in patterns.items():
+        for alternative in _split_alternatives(pattern):
+            alternative = _defer_wildcard(alternative)
+            split = alternative.find("(?=")
+            head, tail = (alternative, "") if split < 0 else (alternative[:split], alternative[split:])
+            if _LITERAL_RE.fullmatch(head):
+                node = trie
+                for char in head:
+                    node = node.setdefault(char, {})
+                node.setdefault("", []).append((tail, query_type))
+            else:
+                residual.append((alternative, query_type))
+
+    markers: Dict[str, str] = {}
+
+    def marker(query_type: str) -> str:
+        name = f"i{len(markers)}"
+        markers[name] = query_type
+        return f"(?P<{name}>)"
+
+    def emit(node: dict) -> str:
+        # Mots-clés les plus longs d'abord, puis les fins de mot-clé à ce nœud
+        branches = [re.escape(char) + emit(node[char]) for char in sorted(key for key in node if key)]
+        branches += [tail + marker(query_type) for tail, query_type in node.get("", [])]
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    parts = [emit(trie)] if trie else []
+    parts += [f"(?:{alternative}){marker(query_type)}" for alternative, query_type in residual]
+    return re.compile("|".join(parts)), markers
+
+
+# Motifs et questions comparés sans casse ni accents, comme les clés du cache de traductions
+_INTENT_RE, _INTENT_MARKERS = _compile_intents({fold(pattern): query_type for pattern, query_type in QUERY_PATTERNS.items()})
+_INTENT_ORDER = {query_type: index for index, query_type in enumerate(QUERY_PATTERNS.values())}
+
+
+def _classify(question: str) -> str:
+    """Intention la mieux classée: première mentionnée, puis la plus citée, puis l'ordre de QUERY_PATTERNS
+
+    En français la question nomme d'abord ce qu'elle cherche ("les hébergements
+    avec certification..."): les intentions suivantes ne sont que des critères.
+    """
+    first_seen: Dict[str, int] = {}
+    hits: Dict[str, int] = {}
+    for match in _INTENT_RE.finditer(normalize_question(question)):
+        query_type = _INTENT_MARKERS[match.lastgroup]
+        if query_type not in hits:
+            first_seen[query_type] = match.start()
+            hits[query_type] = 1
+        else:
+            hits[query_type] += 1
+    if not hits:
+        return "generic"
+    return min(hits, key=lambda query_type: (first_seen[query_type], -hits[query_type], _INTENT_ORDER[query_type]))
+
+
+_PROMPT_INSTRUCTIONS = "Tu es un expert en SPARQL pour le tourisme éco-responsable. Convertis cette question française en requête SPARQL valide."
+
+
+def build_prompt_prefix(store: TripleStore, namespace: str = ONTOLOGY_NS) -> str:
+    """Partie statique du prompt: classes et propriétés réellement présentes dans le store"""
+    rdf_type = iri(RDF_TYPE)
+    classes = {s[1] for s in store.subjects(rdf_type, iri(OWL_NS + "Class"))}
+    classes.update(o[1] for _, _, o in store.triples(None, rdf_type, None))
+    properties = {p[1] for _, p, _ in store.triples()}
+    domains = {s[1]: o[1] for s, _, o in store.triples(None, iri(RDFS_NS + "domain"), None)}
+    ranges = {s[1]: o[1] for s, _, o in store.triples(None, iri(RDFS_NS + "range"), None)}
+
+    def local(value: str) -> str:
+        return value.rsplit("#", 1)[-1]
+
+    property_lines = []
+    for prop in sorted(p for p in properties if p.startswith(namespace)):
+        signature = ""
+        if prop in domains or prop in ranges:
+            signature = f" ({local(domains.get(prop, '?'))} -> {local(ranges.get(prop, '?'))})"
+        property_lines.append(f"- {local(prop)}{signature}")
+    return (
+        f"{_PROMPT_INSTRUCTIONS}\n"
+        f"Utilise le namespace: {namespace} (PREFIX eco: <{namespace}>)\n"
+        f"Classes: {', '.join(sorted(local(c) for c in classes if c.startswith(namespace)))}\n"
+        "Propriétés:\n" + "\n".join(property_lines) + "\n"
+    )
+
+
 class NLToSparqlConverter:
     """Convertit des questions en langage naturel français en requêtes SPARQL"""
     
-    def __init__(self):
-        if USE_GEMINI and GEMINI_AVAILABLE and GEMINI_API_KEY:
+    def __init__(
+        self,
+        hierarchy: ClassHierarchy = None,
+        gazetteer: Gazetteer = None,
+        translation_cache: TranslationCache = None,
+        model=None,
+        schema_store: TripleStore = None,
+        max_concurrency: int = GEMINI_MAX_CONCURRENCY,
+        timeout: float = GEMINI_TIMEOUT_SECONDS,
+    ):
+        # Fermeture rdfs:subClassOf: les requêtes par type incluent les sous-classes
+        self.hierarchy = hierarchy if hierarchy is not None else get_class_hierarchy()
+        # Gabarits SPARQL compilés une fois (motifs de type inclus)
+        self.templates = TemplateRegistry(self.hierarchy)
+        # Noms de lieux connus (vide tant qu'aucun store n'est fourni)
+        self.gazetteer = gazetteer if gazetteer is not None else Gazetteer(self.hierarchy)
+        # Traductions déjà calculées (sans persistance par défaut: voir main.py)
+        self.translation_cache = translation_cache if translation_cache is not None else TranslationCache(path=None)
+        # Chemin asynchrone: appels bornés, budget de latence, questions identiques fusionnées
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._semaphore = None
+        # Client synchrone: un thread par appel en vol, jamais plus que la limite
+        self._executor = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.gemini_stats = {"calls": 0, "coalesced": 0, "timeouts": 0, "invalid": 0, "errors": 0}
+        # Prompt: schéma construit une fois (ontologie par défaut); sorties du LLM validées localement
+        self._schema_store = schema_store
+        self._prompt_prefix = None
+        self.validator = QueryValidator()
+        if model is not None:
+            # Modèle fourni (ex. stub local en test): mêmes méthodes que genai.GenerativeModel
+            self.model = model
+        elif USE_GEMINI and GEMINI_AVAILABLE and GEMINI_API_KEY:
             try:
                 genai.configure(api_key=GEMINI_API_KEY)
                 self.model = genai.GenerativeModel("gemini-pro")
@@ -40,162 +225,152 @@ class NLToSparqlConverter:
                 print("⚠️  google-generativeai not installed. Install with: pip install google-generativeai")
     
     def detect_query_type(self, question: str) -> str:
-        """Détecte le type de requête basée sur le contenu"""
-        question_lower = question.lower()
-        for pattern, query_type in QUERY_PATTERNS.items():
-            if re.search(pattern, question_lower, re.IGNORECASE):
-                return query_type
-        return "generic"
+        """Détecte le type de requête basée sur le contenu (un seul passage sur la question)"""
+        return _classify(question)
+
+    def detect_query_types(self, questions: Iterable[str]) -> List[str]:
+        """Classe un lot de questions (analyse de journaux de requêtes)"""
+        return list(map(_classify, questions))
     
     def extract_city_name(self, question: str) -> str:
         """Extrait le nom d'une région/destination de la question"""
-        # Liste commune de destinations touristiques
-        destinations = ["paris", "lyon", "marseille", "côte d'azur", "alpes", "périgord", "bretagne", "provence", "corsica"]
-        question_lower = question.lower()
-        for dest in destinations:
-            if dest in question_lower:
-                return dest.capitalize()
-        return ""
+        matches = self.gazetteer.find(question)
+        return matches[0]["label"] if matches else ""
+
+    def extract_places(self, question: str) -> Dict[str, str]:
+        """Paramètres de lieu de la question: {"region": ...} et/ou {"destination": ...}"""
+        params = {}
+        for match in self.gazetteer.find(question):
+            params.setdefault(match["type"], match["label"])
+        return params
     
     def build_sparql_query(self, query_type: str, params: Dict = None) -> str:
-        """Construit une requête SPARQL basée sur le type"""
-        ns = ONTOLOGY_NS
-        
-        if query_type == "destinations":
-            region = params.get("region", "") if params else ""
-            if region:
-                return f"""PREFIX eco: <{ns}>
-SELECT ?destination ?nom ?description ?region ?certification
-WHERE {{
-  ?destination rdf:type eco:Destination .
-  ?destination wm:nom ?nom .
-  OPTIONAL {{ ?destination wm:description ?description }}
-  OPTIONAL {{ ?destination wm:localiseDans ?region }}
-  OPTIONAL {{ ?destination eco:aCertification ?certification }}
-}}"""
-            else:
-                return f"""PREFIX eco: <{ns}>
-SELECT ?destination ?nom ?type ?description
-WHERE {{
-  ?destination rdf:type eco:Destination .
-  ?destination wm:nom ?nom .
-  OPTIONAL {{ ?destination rdf:type ?type }}
-  OPTIONAL {{ ?destination wm:description ?description }}
-}}"""
-        
-        elif query_type == "hebergements":
-            return f"""PREFIX eco: <{ns}>
-SELECT ?hebergement ?nom ?type ?certification ?impact
-WHERE {{
-  ?hebergement rdf:type eco:Hebergement .
-  ?hebergement wm:nom ?nom .
-  OPTIONAL {{ ?hebergement rdf:type ?type }}
-  OPTIONAL {{ ?hebergement eco:aCertification ?certification }}
-  OPTIONAL {{ ?hebergement eco:aEmpreinte ?impact }}
-}}"""
-        
-        elif query_type == "activites":
-            return f"""PREFIX eco: <{ns}>
-SELECT ?activite ?nom ?type ?description ?destination
-WHERE {{
-  ?activite rdf:type eco:ActiviteTouristique .
-  ?activite wm:nom ?nom .
-  OPTIONAL {{ ?activite rdf:type ?type }}
-  OPTIONAL {{ ?activite wm:description ?description }}
-  OPTIONAL {{ ?activite eco:aLieu ?destination }}
-}}"""
-        
-        elif query_type == "transports_eco":
-            return f"""PREFIX eco: <{ns}>
-SELECT ?transport ?nom ?empreinte_co2 ?niveau_impact
-WHERE {{
-  ?transport rdf:type eco:Transport .
-  ?transport wm:nom ?nom .
-  OPTIONAL {{ ?transport eco:aEmpreinte ?empreinte }}
-  OPTIONAL {{ ?empreinte eco:kgCO2 ?empreinte_co2 }}
-  OPTIONAL {{ ?empreinte eco:niveauImpact ?niveau_impact }}
-}}"""
-        
-        elif query_type == "certifications":
-            return f"""PREFIX eco: <{ns}>
-SELECT ?cert ?nom ?description ?label
-WHERE {{
-  ?cert rdf:type eco:CertificatEco .
-  ?cert wm:nom ?nom .
-  OPTIONAL {{ ?cert wm:description ?description }}
-  OPTIONAL {{ ?cert rdfs:label ?label }}
-}}"""
-        
-        elif query_type == "voyageurs":
-            return f"""PREFIX eco: <{ns}>
-SELECT ?voyageur ?nom ?profil ?budget
-WHERE {{
-  ?voyageur rdf:type eco:Voyageur .
-  OPTIONAL {{ ?voyageur wm:nom ?nom }}
-  OPTIONAL {{ ?voyageur eco:aProfil ?profil }}
-  OPTIONAL {{ ?voyageur eco:budget ?budget }}
-}}"""
-        
-        elif query_type == "recommandations":
-            return f"""PREFIX eco: <{ns}>
-SELECT ?recommandation ?destination ?hebergement ?activite ?score
-WHERE {{
-  ?recommandation rdf:type eco:Recommandation .
-  OPTIONAL {{ ?recommandation eco:recommande ?destination }}
-  OPTIONAL {{ ?recommandation eco:recommande ?hebergement }}
-  OPTIONAL {{ ?recommandation eco:recommande ?activite }}
-  OPTIONAL {{ ?recommandation eco:scoreRecommandation ?score }}
-}}"""
-        
-        elif query_type == "impacts_eco":
-            return f"""PREFIX eco: <{ns}>
-SELECT ?element ?impact ?kgco2 ?niveau
-WHERE {{
-  ?element eco:aEmpreinte ?impact .
-  OPTIONAL {{ ?impact eco:kgCO2 ?kgco2 }}
-  OPTIONAL {{ ?impact rdf:type ?niveau }}
-}}"""
-        
-        return ""
+        """Construit une requête SPARQL basée sur le type (gabarits précompilés, valeurs échappées)"""
+        params = params or {}
+        # Une région citée sélectionne la variante filtrée des destinations
+        if query_type == "destinations" and params.get("region"):
+            query_type = "destinations_region"
+        if query_type not in self.templates:
+            return ""
+        # Seuls les paramètres propres au gabarit sont liés (ex. pas de région pour les activités)
+        accepted = self.templates.get(query_type).params
+        return self.templates.render(query_type, {k: v for k, v in params.items() if k in accepted})
     
     def convert_question_to_sparql(self, question: str) -> str:
-        """Convertit une question française en requête SPARQL"""
+        """Convertit une question française en requête SPARQL (mise en cache par question normalisée)"""
         
         # Si USE_GEMINI est activé, utiliser l'API Gemini
-        if USE_GEMINI and self.model:
-            return self._convert_with_gemini(question)
+        if self.model is not None:
+            cached = self.translation_cache.get(question, "gemini")
+            if cached is not None:
+                return cached
+            try:
+                sparql_query = self._convert_with_gemini(question)
+            except Exception as e:
+                # Fallback sur pattern matching (non mis en cache comme traduction Gemini)
+                print(f"⚠️  Gemini indisponible, fallback pattern matching: {e}")
+                return self._convert_with_patterns(question)
+            self.translation_cache.set(question, "gemini", sparql_query)
+            return sparql_query
         
         # Sinon, utiliser pattern matching
+        return self._convert_with_patterns(question)
+
+    def _convert_with_patterns(self, question: str) -> str:
+        """Traduction par motifs + gazetteer; la clé inclut la version du gazetteer"""
+        context = self.gazetteer.version
+        cached = self.translation_cache.get(question, "pattern", context)
+        if cached is not None:
+            return cached
         query_type = self.detect_query_type(question)
         params = {}
         
-        # Extraire la ville si mentionnée
-        city = self.extract_city_name(question)
-        if city:
-            params["city"] = city
+        # Lieux mentionnés (gazetteer construit depuis le store)
+        params.update(self.extract_places(question))
         
         sparql_query = self.build_sparql_query(query_type, params)
-        return sparql_query if sparql_query else self._build_generic_query(question)
+        sparql_query = sparql_query if sparql_query else self._build_generic_query(question)
+        self.translation_cache.set(question, "pattern", sparql_query, context)
+        return sparql_query
     
-    def _convert_with_gemini(self, question: str) -> str:
-        """Utilise Gemini pour convertir la question en SPARQL"""
-        prompt = f"""
-Tu es un expert en SPARQL pour le tourisme éco-responsable. Convertis cette question française en requête SPARQL valide.
-Utilise le namespace: {ONTOLOGY_NS}
-Les classes principales sont: Destination, Hebergement, ActiviteTouristique, Voyageur, Transport, Certifications, EmpreinteCarbone, Recommandation, Avis
-Les propriétés includes: aProfil, aEmpreinte, aCertification, recommande, pourVoyageur, nom, description, budget, kgCO2, scoreDurabilite, etc.
+    async def aconvert_question_to_sparql(self, question: str) -> str:
+        """Version asynchrone: Gemini sans bloquer la boucle, avec repli sur les motifs hors budget"""
+        if self.model is None:
+            return self._convert_with_patterns(question)
+        cached = self.translation_cache.get(question, "gemini")
+        if cached is not None:
+            return cached
 
+        # Une seule requête Gemini en vol par question normalisée
+        key = normalize_question(question)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._translate_with_budget(question))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.gemini_stats["coalesced"] += 1
+        # shield: l'annulation d'un appelant n'interrompt pas les autres
+        sparql_query = await asyncio.shield(task)
+        return sparql_query if sparql_query is not None else self._convert_with_patterns(question)
+
+    async def _translate_with_budget(self, question: str):
+        """Traduction Gemini dans le budget (attente du sémaphore comprise); None en cas d'échec"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            sparql_query = await asyncio.wait_for(self._ask_gemini(question), self.timeout)
+        except asyncio.TimeoutError:
+            self.gemini_stats["timeouts"] += 1
+            print(f"⚠️  Gemini hors budget ({self.timeout}s), fallback pattern matching")
+            return None
+        except SparqlError as e:
+            self.gemini_stats["invalid"] += 1
+            print(f"⚠️  Requête Gemini rejetée ({e}), fallback pattern matching")
+            return None
+        except Exception as e:
+            self.gemini_stats["errors"] += 1
+            print(f"⚠️  Gemini indisponible, fallback pattern matching: {e}")
+            return None
+        self.translation_cache.set(question, "gemini", sparql_query)
+        return sparql_query
+
+    async def _ask_gemini(self, question: str) -> str:
+        async with self._semaphore:
+            self.gemini_stats["calls"] += 1
+            prompt = self._gemini_prompt(question)
+            generate_async = getattr(self.model, "generate_content_async", None)
+            if generate_async is not None:
+                response = await generate_async(prompt)
+            else:
+                # Client synchrone: exécuté dans le pool pour libérer la boucle. Un
+                # appel hors budget garde son thread jusqu'à la réponse de Gemini
+                # (le budget n'interrompt que l'attente de l'appelant): les suivants
+                # attendent un thread libre et le plafond d'appels en vol tient
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="gemini")
+                loop = asyncio.get_running_loop()
+                response = await loop.run_in_executor(self._executor, self.model.generate_content, prompt)
+            return self.validator.validate(response.text)
+
+    @property
+    def prompt_prefix(self) -> str:
+        if self._prompt_prefix is None:
+            store = self._schema_store if self._schema_store is not None else get_ontology_store()
+            self._prompt_prefix = build_prompt_prefix(store)
+        return self._prompt_prefix
+
+    def _gemini_prompt(self, question: str) -> str:
+        return f"""{self.prompt_prefix}
 Question: {question}
 
 Réponds UNIQUEMENT avec la requête SPARQL sans explications additionnelles.
 """
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
-        except Exception as e:
-            # Fallback sur pattern matching
-            query_type = self.detect_query_type(question)
-            return self.build_sparql_query(query_type)
+
+    def _convert_with_gemini(self, question: str) -> str:
+        """Utilise Gemini pour convertir la question en SPARQL (lève une exception si l'appel échoue ou si la requête est invalide)"""
+        response = self.model.generate_content(self._gemini_prompt(question))
+        return self.validator.validate(response.text)
     
     def _build_generic_query(self, question: str) -> str:
         """Construit une requête générique pour questions non reconnues"""
@@ -0,0 +1,298 @@
+# Precompiled SPARQL Query Templates
+import re
+import math
+from typing import Dict, List, Any, Optional, Tuple
+from config import ONTOLOGY_NS
+from .class_hierarchy import ClassHierarchy
+from .triple_store import term_to_sparql, literal
+
+_SLOT_RE = re.compile(r"\$(\w+)")
+_KEYSET_SLOT = "__keyset"
+
+
+def sparql_number(value: Any) -> str:
+    """Littéral numérique SPARQL (rejette ce qui n'est pas un nombre fini)"""
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"Nombre invalide: {value!r}")
+    return repr(int(number)) if number.is_integer() else repr(number)
+
+
+class Param:
+    """Paramètre typé d'un gabarit: fragment inséré si la valeur est fournie (`$value` = valeur échappée)
+
+    Types: "string" (littéral échappé), "number", "flag" (booléen), "class"
+    (nom local d'une sous-classe de `base`, remplacé par le motif de type).
+    """
+
+    def __init__(self, kind: str, present: str = "", absent: str = "", base: str = None, var: str = None):
+        self.kind = kind
+        self.present = present
+        self.absent = absent
+        self.base = base
+        self.var = var
+
+
+class QueryTemplate:
+    """Gabarit découpé une fois en segments fixes et emplacements `$nom`
+
+    `key` est la variable de pagination (None: requête agrégée, non paginable).
+    """
+
+    def __init__(self, name: str, text: str, key: Optional[str], params: Dict[str, Param] = None, namespace: str = ONTOLOGY_NS):
+        self.name = name
+        self.key = key
+        self.params = params or {}
+        text = text.replace("<$ns>", f"<{namespace}>")
+        # Emplacement de pagination par clé juste avant la fermeture du WHERE
+        closing = text.rstrip().rfind("}")
+        text = text[:closing] + f"${_KEYSET_SLOT}" + text[closing:]
+        parts = _SLOT_RE.split(text)
+        self._segments: List[str] = parts[0::2]
+        self._slots: List[str] = parts[1::2]
+        unknown = set(self._slots) - set(self.params) - {_KEYSET_SLOT}
+        if unknown:
+            raise ValueError(f"Gabarit {name}: emplacements sans paramètre {sorted(unknown)}")
+
+    def render(self, hierarchy: ClassHierarchy, values: Dict[str, Any] = None,
+               limit: Optional[int] = None, offset: int = 0, after: Optional[str] = None) -> str:
+        """Requête avec valeurs liées; `after` = dernière clé de la page précédente (pagination par clé)"""
+        values = values or {}
+        if self.key is None and (limit is not None or offset or after):
+            raise ValueError(f"Le gabarit {self.name} n'est pas paginable")
+        unknown = set(k for k, v in values.items() if v not in (None, "")) - set(self.params)
+        if unknown:
+            raise ValueError(f"Paramètres inconnus pour {self.name}: {sorted(unknown)}")
+        bound = {name: self._bind(hierarchy, name, param, values.get(name)) for name, param in self.params.items()}
+        bound[_KEYSET_SLOT] = f"\n  FILTER(STR(?{self.key}) > {term_to_sparql(literal(after))})" if after else ""
+
+        pieces = [self._segments[0]]
+        for slot, segment in zip(self._slots, self._segments[1:]):
+            pieces.append(bound[slot])
+            pieces.append(segment)
+        if limit is not None or offset or after:
+            # Ordre stable requis pour paginer: par clé (IRI) croissante
+            pieces.append(f"\nORDER BY ?{self.key}")
+        if limit is not None:
+            pieces.append(f"\nLIMIT {int(limit)}")
+        if offset:
+            pieces.append(f"\nOFFSET {int(offset)}")
+        return "".join(pieces)
+
+    @staticmethod
+    def _bind(hierarchy: ClassHierarchy, name: str, param: Param, value: Any) -> str:
+        if param.kind == "class":
+            class_name = hierarchy.find_subclass(value, param.base) if value else param.base
+            if class_name is None:
+                raise ValueError(f"{name}: {value!r} n'est pas une sous-classe de {param.base}")
+            return hierarchy.type_pattern(param.var, class_name)
+        if value is None or value == "" or (param.kind == "flag" and not value):
+            return param.absent
+        if param.kind == "string":
+            bound = term_to_sparql(literal(value))
+        elif param.kind == "number":
+            bound = sparql_number(value)
+        elif param.kind == "flag":
+            bound = "true"
+        else:
+            raise ValueError(f"Type de paramètre inconnu: {param.kind}")
+        return param.present.replace("$value", bound)
+
+
+def _optional(var: str, prop: str, target: str) -> Param:
+    """Propriété en OPTIONAL, rendue obligatoire et filtrée quand une valeur est donnée"""
+    return Param(
+        "string",
+        present=f"?{var} {prop} ?{target} .\n  FILTER(STR(?{target}) = $value)",
+        absent=f"OPTIONAL {{ ?{var} {prop} ?{target} }}",
+    )
+
+
+def _certification(var: str) -> Param:
+    # Certification littérale ("GreenGlobe") ou IRI (eco:GreenGlobe)
+    return Param(
+        "string",
+        present=f"?{var} eco:aCertification ?certification .\n"
+                f"  FILTER(STR(?certification) = $value || STRENDS(STR(?certification), CONCAT(\"#\", $value)))",
+        absent=f"OPTIONAL {{ ?{var} eco:aCertification ?certification }}",
+    )
+
+
+TEMPLATES = [
+    QueryTemplate("destinations", """PREFIX eco: <$ns>
+SELECT DISTINCT ?destination ?nom ?type ?description ?localiseDans ?scoreDurabilite
+WHERE {
+  $type
+  ?destination wm:nom ?nom .$destination
+  OPTIONAL { ?destination rdf:type ?type FILTER(?type != eco:Destination) }
+  OPTIONAL { ?destination wm:description ?description }
+  OPTIONAL { ?destination wm:localiseDans ?localiseDans }
+  OPTIONAL { ?destination eco:scoreDurabilite ?scoreDurabilite }$min_score
+}""", key="destination", params={
+        "type": Param("class", base="Destination", var="destination"),
+        "destination": Param("string", present="\n  FILTER(STR(?nom) = $value)"),
+        "min_score": Param("number", present="\n  FILTER(?scoreDurabilite >= $value)"),
+    }),
+    QueryTemplate("destinations_region", """PREFIX eco: <$ns>
+SELECT DISTINCT ?destination ?nom ?description ?region ?certification ?scoreDurabilite
+WHERE {
+  $type
+  ?destination wm:nom ?nom .$destination
+  ?destination wm:localiseDans ?region .$region
+  OPTIONAL { ?destination wm:description ?description }
+  $certification
+  OPTIONAL { ?destination eco:scoreDurabilite ?scoreDurabilite }$min_score
+}""", key="destination", params={
+        "type": Param("class", base="Destination", var="destination"),
+        "destination": Param("string", present="\n  FILTER(STR(?nom) = $value)"),
+        "region": Param("string", present="\n  FILTER(STR(?region) = $value)"),
+        "certification": _certification("destination"),
+        "min_score": Param("number", present="\n  FILTER(?scoreDurabilite >= $value)"),
+    }),
+    QueryTemplate("hebergements", """PREFIX eco: <$ns>
+SELECT DISTINCT ?hebergement ?nom ?type ?certification ?impact ?localiseDans ?scoreDurabilite ?description
+WHERE {
+  $type
+  ?hebergement wm:nom ?nom .
+  OPTIONAL { ?hebergement rdf:type ?type FILTER(?type != eco:Hebergement) }
+  $certification$certified
+  OPTIONAL { ?hebergement eco:aEmpreinte ?impact }
+  $region
+  OPTIONAL { ?hebergement eco:scoreDurabilite ?scoreDurabilite }
+  OPTIONAL { ?hebergement wm:description ?description }$min_score
+}""", key="hebergement", params={
+        "type": Param("class", base="Hebergement", var="hebergement"),
+        "certification": _certification("hebergement"),
+        "certified": Param("flag", present="\n  FILTER(BOUND(?certification))"),
+        "region": _optional("hebergement", "wm:localiseDans", "localiseDans"),
+        "min_score": Param("number", present="\n  FILTER(?scoreDurabilite >= $value)"),
+    }),
+    QueryTemplate("activites", """PREFIX eco: <$ns>
+SELECT DISTINCT ?activite ?nom ?type ?description ?destination ?kgCO2 ?profileRecommande
+WHERE {
+  $type
+  ?activite wm:nom ?nom .
+  OPTIONAL { ?activite rdf:type ?type FILTER(?type != eco:ActiviteTouristique) }
+  OPTIONAL { ?activite wm:description ?description }
+  OPTIONAL { ?activite eco:aLieu ?destination }
+  OPTIONAL { ?activite eco:kgCO2 ?kgCO2 }
+  OPTIONAL { ?activite eco:profileRecommande ?profileRecommande }$min_co2$max_co2
+}""", key="activite", params={
+        "type": Param("class", base="ActiviteTouristique", var="activite"),
+        "min_co2": Param("number", present="\n  FILTER(?kgCO2 >= $value)"),
+        "max_co2": Param("number", present="\n  FILTER(?kgCO2 <= $value)"),
+    }),
+    QueryTemplate("transports_eco", """PREFIX eco: <$ns>
+SELECT DISTINCT ?transport ?nom ?empreinte_co2 ?niveau_impact
+WHERE {
+  $type
+  ?transport wm:nom ?nom .
+  OPTIONAL { ?transport eco:aEmpreinte ?empreinte }
+  OPTIONAL { ?empreinte eco:kgCO2 ?empreinte_co2 }
+  OPTIONAL { ?empreinte eco:niveauImpact ?niveau_impact }$min_co2$max_co2
+}""", key="transport", params={
+        "type": Param("class", base="Transport", var="transport"),
+        "min_co2": Param("number", present="\n  FILTER(?empreinte_co2 >= $value)"),
+        "max_co2": Param("number", present="\n  FILTER(?empreinte_co2 <= $value)"),
+    }),
+    QueryTemplate("certifications", """PREFIX eco: <$ns>
+SELECT DISTINCT ?cert ?nom ?description ?label ?criteres
+WHERE {
+  $type
+  ?cert wm:nom ?nom .
+  OPTIONAL { ?cert wm:description ?description }
+  OPTIONAL { ?cert rdfs:label ?label }
+  OPTIONAL { ?cert eco:criteres ?criteres }
+}""", key="cert", params={
+        "type": Param("class", base="CertificatEco", var="cert"),
+    }),
+    QueryTemplate("voyageurs", """PREFIX eco: <$ns>
+SELECT ?voyageur ?nom ?profil ?budget
+WHERE {
+  ?voyageur rdf:type eco:Voyageur .
+  OPTIONAL { ?voyageur wm:nom ?nom }
+  $profil
+  OPTIONAL { ?voyageur eco:budget ?budget }
+}""", key="voyageur", params={
+        "profil": _optional("voyageur", "eco:aProfil", "profil"),
+    }),
+    QueryTemplate("recommandations", """PREFIX eco: <$ns>
+SELECT ?recommandation ?destination ?hebergement ?activite ?score
+WHERE {
+  ?recommandation rdf:type eco:Recommandation .
+  OPTIONAL { ?recommandation eco:recommande ?destination }
+  OPTIONAL { ?recommandation eco:recommande ?hebergement }
+  OPTIONAL { ?recommandation eco:recommande ?activite }
+  OPTIONAL { ?recommandation eco:scoreRecommandation ?score }
+}""", key="recommandation"),
+    QueryTemplate("impacts_eco", """PREFIX eco: <$ns>
+SELECT ?element ?impact ?kgco2 ?niveau
+WHERE {
+  ?element eco:aEmpreinte ?impact .
+  OPTIONAL { ?impact eco:kgCO2 ?kgco2 }
+  OPTIONAL { ?impact rdf:type ?niveau }$max_co2
+}""", key="element", params={
+        "max_co2": Param("number", present="\n  FILTER(?kgco2 <= $value)"),
+    }),
+    QueryTemplate("statistiques", """PREFIX eco: <$ns>
+SELECT (COUNT(DISTINCT ?voyageur) as ?totalVoyageurs)
+       (COUNT(DISTINCT ?destination) as ?totalDestinations)
+       (COUNT(DISTINCT ?hebergement) as ?totalHebergements)
+       (COUNT(DISTINCT ?activite) as ?totalActivites)
+WHERE {
+  { ?voyageur rdf:type eco:Voyageur }
+  UNION { ?destination rdf:type eco:Destination }
+  UNION { ?hebergement rdf:type eco:Hebergement }
+  UNION { ?activite rdf:type eco:ActiviteTouristique }
+}""", key=None),
+]
+
+
+class TemplateRegistry:
+    """Gabarits nommés, compilés une fois pour une hiérarchie de classes"""
+
+    def __init__(self, hierarchy: ClassHierarchy, templates: List[QueryTemplate] = None):
+        self.hierarchy = hierarchy
+        self.templates: Dict[str, QueryTemplate] = {}
+        for template in templates if templates is not None else TEMPLATES:
+            self.register(template)
+
+    def register(self, template: QueryTemplate):
+        self.templates[template.name] = template
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.templates
+
+    def get(self, name: str) -> QueryTemplate:
+        template = self.templates.get(name)
+        if template is None:
+            raise ValueError(f"Gabarit inconnu: {name}")
+        return template
+
+    def key(self, name: str) -> Optional[str]:
+        """Variable de pagination du gabarit (None si non paginable)"""
+        return self.get(name).key
+
+    def render(self, name: str, values: Dict[str, Any] = None, limit: Optional[int] = None,
+               offset: int = 0, after: Optional[str] = None) -> str:
+        """Requête du gabarit `name`; ValueError si un paramètre est invalide"""
+        return self.get(name).render(self.hierarchy, values, limit, offset, after)
+
+
+def paginate(rows: List[Dict[str, str]], key: str, limit: int) -> Tuple[List[Dict[str, str]], Optional[str]]:
+    """Découpe une page obtenue avec LIMIT limit+1: (lignes, curseur suivant ou None)
+
+    Une ressource peut produire plusieurs lignes (OPTIONAL multivalués): la
+    page ne coupe pas une ressource en deux, sauf si elle remplit seule la page.
+    Elle peut donc compter moins de `limit` lignes: en pagination par OFFSET,
+    la page suivante commence à offset + len(lignes), pas à offset + limit.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    last = page[-1].get(key)
+    if rows[limit].get(key) == last:
+        trimmed = [row for row in page if row.get(key) != last]
+        if trimmed:
+            page = trimmed
+    return page, page[-1].get(key)
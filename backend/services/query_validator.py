@@ -0,0 +1,174 @@
+# Local SPARQL Validation (LLM output)
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from config import ONTOLOGY_NS
+from .triple_store import RDF_NS, RDFS_NS, XSD_NS, OWL_NS
+from .sparql_engine import SparqlError, parse_query, tokenize
+
+_FENCE_RE = re.compile(r"```[ \t]*(?:sparql)?[ \t]*\n?(.*?)```", re.DOTALL | re.IGNORECASE)
+_MASKED_KINDS = {"string": '""', "number": "0"}
+_BRACKETS = {"{": "}", "(": ")", "[": "]"}
+_TERMS = ("pname", "iri")
+_FORMS = ("SELECT", "ASK", "CONSTRUCT", "DESCRIBE")
+
+# Préfixes souvent utilisés sans déclaration: ajoutés à la requête (Fuseki ne les connaît pas)
+IMPLICIT_PREFIXES = {
+    "rdf": RDF_NS,
+    "rdfs": RDFS_NS,
+    "xsd": XSD_NS,
+    "owl": OWL_NS,
+    "eco": ONTOLOGY_NS,
+    "wm": ONTOLOGY_NS,
+}
+
+
+def strip_code_fences(text: str) -> str:
+    """Extrait la requête d'une réponse de LLM (bloc ```sparql ... ``` éventuel)"""
+    match = _FENCE_RE.search(text)
+    return (match.group(1) if match else text).strip()
+
+
+def unsupported_construct(tokens) -> Optional[str]:
+    """Construction SPARQL 1.1 valide mais hors du sous-ensemble du moteur local, ou None
+
+    Property paths (`rdf:type/rdfs:subClassOf*`, `|`, `^`), sous-requêtes,
+    CONSTRUCT et DESCRIBE, GRAPH et SERVICE.
+    """
+    depth = 0
+    for i, (kind, value) in enumerate(tokens):
+        upper = value.upper() if kind == "name" else None
+        if upper in ("CONSTRUCT", "DESCRIBE", "GRAPH", "SERVICE"):
+            return upper
+        if upper == "SELECT" and depth > 0:
+            return "sous-requête"
+        if kind != "punct":
+            continue
+        if value == "{":
+            depth += 1
+        elif value == "}":
+            depth -= 1
+        previous = tokens[i - 1] if i else ("", "")
+        following = tokens[i + 1] if i + 1 < len(tokens) else ("eof", "")
+        if value in ("|", "^") or (value == "/" and previous[0] in _TERMS):
+            return "property path"
+        if value in ("*", "+", "?") and previous[0] in _TERMS and following[0] in ("var", "iri", "pname", "punct", "bnode"):
+            return "property path"
+    return None
+
+
+class QueryValidator:
+    """Vérifie syntaxe et variables d'une requête avant tout appel à Fuseki
+
+    Le résultat est mis en cache par « forme » de requête: la suite de jetons
+    où littéraux et nombres sont masqués. Une forme déjà vue (valide ou non)
+    est tranchée sans ré-analyse.
+
+    Les constructions SPARQL 1.1 que le moteur local n'analyse pas (voir
+    `unsupported_construct`) ne sont pas rejetées: seules la structure
+    (accolades, forme de requête, préfixes) et les variables projetées sont
+    vérifiées, et Fuseki tranche.
+    """
+
+    def __init__(self, max_entries: int = 1024, implicit_prefixes: Dict[str, str] = None):
+        self.max_entries = max_entries
+        self.implicit_prefixes = IMPLICIT_PREFIXES if implicit_prefixes is None else implicit_prefixes
+        # forme -> (message d'erreur ou None, préfixes implicites utilisés)
+        self._shapes: "OrderedDict[Tuple, Tuple[Optional[str], Tuple[str, ...]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats_counters = {"hits": 0, "misses": 0, "rejected": 0, "unchecked": 0}
+
+    def validate(self, text: str) -> str:
+        """Requête prête à exécuter (préfixes implicites déclarés); lève SparqlError si invalide"""
+        query_text = strip_code_fences(text)
+        tokens = tokenize(query_text)
+        shape = tuple((kind, _MASKED_KINDS.get(kind, value)) for kind, value in tokens)
+        with self._lock:
+            verdict = self._shapes.get(shape)
+            if verdict is not None:
+                self._shapes.move_to_end(shape)
+                self.stats_counters["hits"] += 1
+        if verdict is None:
+            verdict = self._check(query_text, tokens)
+            with self._lock:
+                self.stats_counters["misses"] += 1
+                self._shapes[shape] = verdict
+                while len(self._shapes) > self.max_entries:
+                    self._shapes.popitem(last=False)
+        error, missing_prefixes = verdict
+        if error is not None:
+            with self._lock:
+                self.stats_counters["rejected"] += 1
+            raise SparqlError(error)
+        if not missing_prefixes:
+            return query_text
+        declarations = "".join(f"PREFIX {p}: <{self.implicit_prefixes[p]}>\n" for p in missing_prefixes)
+        return declarations + query_text
+
+    def _check(self, query_text: str, tokens) -> Tuple[Optional[str], Tuple[str, ...]]:
+        declared = {
+            tokens[i + 1][1][:-1]
+            for i, (kind, value) in enumerate(tokens[:-1])
+            if kind == "name" and value.upper() == "PREFIX"
+        }
+        used = {value.partition(":")[0] for kind, value in tokens if kind == "pname"}
+        missing = tuple(sorted(p for p in used - declared if p in self.implicit_prefixes))
+        try:
+            query = parse_query(query_text, self.implicit_prefixes)
+        except SparqlError as e:
+            construct = unsupported_construct(tokens)
+            if construct is None:
+                return str(e), ()
+            error = self._check_structure(tokens, used - declared - set(self.implicit_prefixes))
+            if error is None:
+                with self._lock:
+                    self.stats_counters["unchecked"] += 1
+            return error, missing
+        where_variables = set(query.variables)
+        if query.projection is None and not where_variables:
+            return "SELECT * sans variable dans le WHERE", ()
+        for name, expr in query.projection or ():
+            if expr is None and name not in where_variables:
+                return f"Variable ?{name} projetée mais absente du WHERE", ()
+        return None, missing
+
+    @staticmethod
+    def _check_structure(tokens, undeclared) -> Optional[str]:
+        """Vérification minimale d'une requête que le moteur local ne sait pas analyser"""
+        if undeclared:
+            return f"Préfixe non déclaré: {sorted(undeclared)[0]}:"
+        stack = []
+        for kind, value in tokens:
+            if kind != "punct":
+                continue
+            if value in _BRACKETS:
+                stack.append(_BRACKETS[value])
+            elif value in _BRACKETS.values():
+                if not stack or stack.pop() != value:
+                    return f"'{value}' inattendu"
+        if stack:
+            return f"'{stack[-1]}' manquant"
+        keywords = [value.upper() for kind, value in tokens if kind == "name" and value.upper() not in ("PREFIX", "BASE")]
+        if not keywords or keywords[0] not in _FORMS:
+            return "Forme de requête non reconnue"
+        if keywords[0] == "SELECT":
+            # Variables projetées (hors expressions AS) présentes ailleurs dans la requête
+            start = next(i for i, (kind, value) in enumerate(tokens) if kind == "name" and value.upper() == "SELECT")
+            projected, depth = [], 0
+            for kind, value in tokens[start + 1:]:
+                if (kind == "punct" and value == "{") or (kind == "name" and value.upper() in ("WHERE", "FROM")):
+                    break
+                if kind == "punct":
+                    depth += {"(": 1, ")": -1}.get(value, 0)
+                elif kind == "var" and depth == 0:
+                    projected.append(value[1:])
+            variables = [value[1:] for kind, value in tokens if kind == "var"]
+            for name in projected:
+                if variables.count(name) < 2:
+                    return f"Variable ?{name} projetée mais absente du WHERE"
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats_counters, shapes=len(self._shapes))
@@ -0,0 +1,342 @@
+# Ontology Loader (RDF/XML + binary snapshot)
+import os
+import sys
+import mmap
+import struct
+import hashlib
+import xml.etree.ElementTree as ET
+from array import array
+from itertools import count
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+from config import ONTOLOGY_FILE, ONTOLOGY_SNAPSHOT
+from .triple_store import TripleStore, Term, Triple, RDF_NS, iri, literal, bnode
+
+XML_NS = "http://www.w3.org/XML/1998/namespace"
+RDF_XMLLITERAL = RDF_NS + "XMLLiteral"
+
+# Attributs de syntaxe RDF/XML (jamais des propriétés)
+_SYNTAX_ATTRIBUTES = {
+    f"{{{RDF_NS}}}{name}" for name in ("about", "ID", "nodeID", "resource", "datatype", "parseType")
+}
+
+# --- Format du snapshot ---------------------------------------------------
+#
+#   en-tête  | kinds (1 octet par terme) | bourrage | offsets uint32 (2n+1)
+#            | triplets uint32 (3m) | valeurs UTF-8
+#
+# Les termes sont encodés en dictionnaire (valeur + extra concaténés dans un
+# seul blob), les triplets sont des triplets d'identifiants compacts lus via
+# mmap sans copie.
+SNAPSHOT_MAGIC = b"ECOSNAP1"
+_HEADER = struct.Struct("<8sqQ32sII")
+_KINDS = ("uri", "literal", "bnode")
+_KIND_CODES = {kind: code for code, kind in enumerate(_KINDS)}
+
+
+class RDFXMLParser:
+    """Parseur RDF/XML (sous-ensemble utilisé par Protégé/OWL API)"""
+
+    def __init__(self, base: str = ""):
+        self.base = base
+        self.triples: List[Triple] = []
+        self._bnode_ids = count()
+        self._node_ids: Dict[str, Term] = {}
+
+    def parse(self, source) -> List[Triple]:
+        root = ET.parse(source).getroot()
+        base = root.get(f"{{{XML_NS}}}base", self.base)
+        if root.tag == f"{{{RDF_NS}}}RDF":
+            for child in root:
+                self._node_element(child, base, root.get(f"{{{XML_NS}}}lang", ""))
+        else:
+            self._node_element(root, base, "")
+        return self.triples
+
+    def _new_bnode(self) -> Term:
+        return bnode(f"ont{next(self._bnode_ids)}")
+
+    def _named_bnode(self, node_id: str) -> Term:
+        term = self._node_ids.get(node_id)
+        if term is None:
+            term = self._node_ids[node_id] = self._new_bnode()
+        return term
+
+    @staticmethod
+    def _tag_iri(tag: str) -> str:
+        namespace, _, local = tag[1:].partition("}")
+        return namespace + local
+
+    def _node_element(self, elem, base: str, lang: str) -> Term:
+        base = elem.get(f"{{{XML_NS}}}base", base)
+        lang = elem.get(f"{{{XML_NS}}}lang", lang)
+        about = elem.get(f"{{{RDF_NS}}}about")
+        if about is not None:
+            subject = iri(urljoin(base, about))
+        elif elem.get(f"{{{RDF_NS}}}ID") is not None:
+            subject = iri(urljoin(base, "#" + elem.get(f"{{{RDF_NS}}}ID")))
+        elif elem.get(f"{{{RDF_NS}}}nodeID") is not None:
+            subject = self._named_bnode(elem.get(f"{{{RDF_NS}}}nodeID"))
+        else:
+            subject = self._new_bnode()
+
+        if elem.tag != f"{{{RDF_NS}}}Description":
+            self.triples.append((subject, iri(RDF_NS + "type"), iri(self._tag_iri(elem.tag))))
+        self._property_attributes(subject, elem, lang)
+
+        li_index = count(1)
+        for child in elem:
+            self._property_element(subject, child, base, lang, li_index)
+        return subject
+
+    def _property_attributes(self, subject: Term, elem, lang: str):
+        for name, value in elem.attrib.items():
+            if name in _SYNTAX_ATTRIBUTES or name.startswith(f"{{{XML_NS}}}") or not name.startswith("{"):
+                continue
+            if name == f"{{{RDF_NS}}}type":
+                self.triples.append((subject, iri(RDF_NS + "type"), iri(value)))
+            else:
+                self.triples.append((subject, iri(self._tag_iri(name)), literal(value, lang=lang or None)))
+
+    def _property_element(self, subject: Term, elem, base: str, lang: str, li_index):
+        base = elem.get(f"{{{XML_NS}}}base", base)
+        lang = elem.get(f"{{{XML_NS}}}lang", lang)
+        if elem.tag == f"{{{RDF_NS}}}li":
+            predicate = iri(f"{RDF_NS}_{next(li_index)}")
+        else:
+            predicate = iri(self._tag_iri(elem.tag))
+        parse_type = elem.get(f"{{{RDF_NS}}}parseType")
+        resource = elem.get(f"{{{RDF_NS}}}resource")
+        node_id = elem.get(f"{{{RDF_NS}}}nodeID")
+        children = list(elem)
+
+        if parse_type == "Resource":
+            obj = self._new_bnode()
+            nested_index = count(1)
+            for child in children:
+                self._property_element(obj, child, base, lang, nested_index)
+        elif parse_type == "Literal":
+            inner = (elem.text or "") + "".join(ET.tostring(child, encoding="unicode") for child in children)
+            obj = literal(inner, RDF_XMLLITERAL)
+        elif parse_type == "Collection":
+            obj = self._collection([self._node_element(child, base, lang) for child in children])
+        elif resource is not None or node_id is not None:
+            obj = iri(urljoin(base, resource)) if resource is not None else self._named_bnode(node_id)
+            self._property_attributes(obj, elem, lang)
+        elif children:
+            obj = self._node_element(children[0], base, lang)
+        elif any(name not in _SYNTAX_ATTRIBUTES and name.startswith("{") and not name.startswith(f"{{{XML_NS}}}")
+                 for name in elem.attrib):
+            # Élément vide avec attributs de propriété: nœud anonyme
+            obj = self._new_bnode()
+            self._property_attributes(obj, elem, lang)
+        else:
+            datatype = elem.get(f"{{{RDF_NS}}}datatype")
+            text = elem.text or ""
+            obj = literal(text, datatype) if datatype else literal(text, lang=lang or None)
+
+        self.triples.append((subject, predicate, obj))
+        if elem.get(f"{{{RDF_NS}}}ID") is not None:
+            self._reify(iri(urljoin(base, "#" + elem.get(f"{{{RDF_NS}}}ID"))), subject, predicate, obj)
+
+    def _collection(self, items: List[Term]) -> Term:
+        head = iri(RDF_NS + "nil")
+        for item in reversed(items):
+            node = self._new_bnode()
+            self.triples.append((node, iri(RDF_NS + "first"), item))
+            self.triples.append((node, iri(RDF_NS + "rest"), head))
+            head = node
+        return head
+
+    def _reify(self, statement: Term, subject: Term, predicate: Term, obj: Term):
+        self.triples.extend([
+            (statement, iri(RDF_NS + "type"), iri(RDF_NS + "Statement")),
+            (statement, iri(RDF_NS + "subject"), subject),
+            (statement, iri(RDF_NS + "predicate"), predicate),
+            (statement, iri(RDF_NS + "object"), obj),
+        ])
+
+
+def parse_rdfxml(path: str) -> List[Triple]:
+    """Parse un fichier RDF/XML en liste de triplets"""
+    return RDFXMLParser(base=path).parse(path)
+
+# --- Snapshot binaire -------------------------------------------------------
+
+
+def file_sha256(path: str) -> bytes:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def write_snapshot(snapshot_path: str, triples: List[Triple], mtime_ns: int, size: int, sha256: bytes):
+    """Écrit le snapshot (écriture atomique: fichier temporaire puis rename)"""
+    term_ids: Dict[Term, int] = {}
+    terms: List[Term] = []
+    encoded = array("I")
+    for triple in triples:
+        for term in triple:
+            term_id = term_ids.get(term)
+            if term_id is None:
+                term_id = term_ids[term] = len(terms)
+                terms.append(term)
+            encoded.append(term_id)
+
+    kinds = bytes(_KIND_CODES[kind] for kind, _, _ in terms)
+    offsets = array("I", [0])
+    blob = bytearray()
+    for _, value, extra in terms:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+        blob += extra.encode("utf-8")
+        offsets.append(len(blob))
+    if sys.byteorder != "little":
+        offsets.byteswap()
+        encoded.byteswap()
+
+    header = _HEADER.pack(SNAPSHOT_MAGIC, mtime_ns, size, sha256, len(terms), len(encoded) // 3)
+    padding = b"\0" * (-(len(header) + len(kinds)) % 4)
+
+    os.makedirs(os.path.dirname(os.path.abspath(snapshot_path)), exist_ok=True)
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(header)
+        out.write(kinds)
+        out.write(padding)
+        out.write(offsets.tobytes())
+        out.write(encoded.tobytes())
+        out.write(blob)
+    os.replace(tmp_path, snapshot_path)
+
+
+class Snapshot:
+    """Snapshot ouvert en mmap: termes décodés à la demande, triplets lus sans copie"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as source:
+            self._mmap = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, self.mtime_ns, self.size, self.sha256, self.term_count, self.triple_count = \
+                _HEADER.unpack_from(self._mmap, 0)
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError("Snapshot invalide")
+            self._view = view = memoryview(self._mmap)
+            position = _HEADER.size
+            self._kinds = view[position:position + self.term_count]
+            position += self.term_count
+            position += -position % 4
+            offsets_end = position + 4 * (2 * self.term_count + 1)
+            triples_end = offsets_end + 12 * self.triple_count
+            self._offsets = view[position:offsets_end].cast("I")
+            self.triples = view[offsets_end:triples_end].cast("I")
+            self._blob = view[triples_end:]
+            if len(self._blob) != self._offsets[-1]:
+                raise ValueError("Snapshot tronqué")
+        except Exception:
+            self.close()
+            raise
+
+    def terms(self) -> List[Term]:
+        offsets, blob, kinds = self._offsets, self._blob, self._kinds
+        result = []
+        for index in range(self.term_count):
+            start, middle, end = offsets[2 * index], offsets[2 * index + 1], offsets[2 * index + 2]
+            result.append((
+                _KINDS[kinds[index]],
+                str(blob[start:middle], "utf-8"),
+                str(blob[middle:end], "utf-8"),
+            ))
+        return result
+
+    def close(self):
+        for name in ("_kinds", "_offsets", "triples", "_blob", "_view"):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+
+def open_snapshot(snapshot_path: str, source_path: str) -> Optional[Snapshot]:
+    """Ouvre le snapshot s'il correspond encore au fichier source (mtime/taille, sinon SHA-256)"""
+    if not os.path.exists(snapshot_path):
+        return None
+    try:
+        snapshot = Snapshot(snapshot_path)
+    except (OSError, ValueError, struct.error):
+        return None
+    if sys.byteorder != "little":
+        snapshot.close()
+        return None
+    stat = os.stat(source_path)
+    if snapshot.mtime_ns == stat.st_mtime_ns and snapshot.size == stat.st_size:
+        return snapshot
+    # Fichier touché (checkout, copie...): on ne re-parse que si le contenu a changé
+    if snapshot.size == stat.st_size and snapshot.sha256 == file_sha256(source_path):
+        _update_snapshot_mtime(snapshot_path, snapshot, stat.st_mtime_ns)
+        return snapshot
+    snapshot.close()
+    return None
+
+
+def _update_snapshot_mtime(snapshot_path: str, snapshot: Snapshot, mtime_ns: int):
+    """Réécrit l'en-tête avec le nouveau mtime: les démarrages suivants se contentent d'un stat"""
+    header = _HEADER.pack(SNAPSHOT_MAGIC, mtime_ns, snapshot.size, snapshot.sha256, snapshot.term_count, snapshot.triple_count)
+    try:
+        with open(snapshot_path, "r+b") as out:
+            out.write(header)
+    except OSError as e:
+        print(f"⚠️  En-tête du snapshot non mis à jour: {e}")
+        return
+    snapshot.mtime_ns = mtime_ns
+
+# --- Chargement dans le store -----------------------------------------------
+
+
+def _remap(term: Term, namespace_map: Dict[str, str]) -> Term:
+    if term[0] == "uri":
+        for source, target in namespace_map.items():
+            if term[1].startswith(source):
+                return ("uri", target + term[1][len(source):], "")
+    return term
+
+
+def load_ontology(
+    store: TripleStore,
+    path: str = ONTOLOGY_FILE,
+    snapshot_path: Optional[str] = ONTOLOGY_SNAPSHOT,
+    namespace_map: Dict[str, str] = None,
+) -> int:
+    """Charge le fichier RDF/XML dans le store, via le snapshot binaire s'il est à jour
+
+    `namespace_map` réécrit les IRI ({namespace source: namespace cible}).
+    Retourne le nombre de triplets ajoutés.
+    """
+    namespace_map = namespace_map or {}
+    snapshot = open_snapshot(snapshot_path, path) if snapshot_path else None
+    if snapshot is not None:
+        try:
+            term_ids = [store.encode(_remap(term, namespace_map)) for term in snapshot.terms()]
+            encoded = snapshot.triples
+            return store.add_many_ids(
+                (term_ids[encoded[i]], term_ids[encoded[i + 1]], term_ids[encoded[i + 2]])
+                for i in range(0, len(encoded), 3)
+            )
+        finally:
+            snapshot.close()
+
+    triples = parse_rdfxml(path)
+    if snapshot_path:
+        stat = os.stat(path)
+        try:
+            write_snapshot(snapshot_path, triples, stat.st_mtime_ns, stat.st_size, file_sha256(path))
+        except OSError as e:
+            print(f"⚠️  Snapshot de l'ontologie non écrit: {e}")
+    if namespace_map:
+        triples = [tuple(_remap(term, namespace_map) for term in triple) for triple in triples]
+    return store.add_many(triples)
@@ -1,15 +1,324 @@
 # Service de Recommandations Intelligentes
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 import math
+import heapq
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from config import RECOMMENDATION_WORKERS, ITINERARY_BEAM_WIDTH, ITINERARY_POOL_SIZE, ITINERARY_TIME_BUDGET_MS
+from .class_hierarchy import ClassHierarchy, get_class_hierarchy
+from .itinerary_optimizer import ItineraryOptimizer, NO_OPTION
+from .carbon_calculator import CarbonCalculator
+
+# Transports proposés quand le dataset n'en contient aucun
+DEFAULT_TRANSPORTS = [
+    {"nom": "Train Régional", "kgCO2": "15", "type": "Train", "prix": "30"},
+    {"nom": "Bus Électrique", "kgCO2": "25", "type": "Bus", "prix": "20"},
+    {"nom": "Voiture Partagée", "kgCO2": "45", "type": "Voiture", "prix": "60"},
+    {"nom": "Vélo", "kgCO2": "0", "type": "Velo", "prix": "15"},
+    {"nom": "Avion Low-Cost", "kgCO2": "250", "type": "Avion", "prix": "120"}
+]
+
+# Compatibilité profil -> type d'activité (0-100); types absents: super-classe la plus proche, sinon 50
+COMPATIBILITY_MATRIX = {
+    "Adventure": {
+        "ActiviteSportive": 100,
+        "Randonnee": 100,
+        "Plongee": 90,
+        "ActiviteEducative": 40,
+        "ActiviteCulturelle": 30,
+        "ActiviteDetente": 20,
+    },
+    "Culture": {
+        "ActiviteCulturelle": 100,
+        "VisiteHistorique": 100,
+        "Musee": 95,
+        "ActiviteEducative": 80,
+        "Atelier_culinaire": 70,
+        "ActiviteSportive": 30,
+        "Randonnee": 20,
+    },
+    "BienEtre": {
+        "ActiviteDetente": 100,
+        "Spa": 100,
+        "Meditation": 95,
+        "ActiviteEducative": 60,
+        "ActiviteCulturelle": 50,
+        "ActiviteSportive": 30,
+    },
+    "Famille": {
+        "ActiviteEducative": 100,
+        "Atelier_culinaire": 90,
+        "ActiviteCulturelle": 85,
+        "ActiviteDetente": 70,
+        "ActiviteSportive": 60,
+    }
+}
+DEFAULT_MATCH_SCORE = 50
+# Valeurs d'un voyageur absentes ou nulles (champs optionnels de l'API)
+TRAVELLER_DEFAULTS = {"budget": 1000, "carbon_priority": False, "days": 3}
+# Lignes demandées par résultat voulu (une ressource peut occuper plusieurs lignes)
+TOP_K_OVERFETCH = 4
+
+
+def _number(value: Any, default: float) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def top_k(rows: Iterator[Dict[str, Any]], k: int, key, identity: str) -> List[Dict[str, Any]]:
+    """k lignes de plus grande clé via un tas borné, une par ressource (première ligne reçue)
+
+    Équivaut à sorted(rows, key=key, reverse=True)[:k], ordre d'arrivée conservé à clé égale.
+    """
+    seen = set()
+
+    def unique():
+        for row in rows:
+            resource = row.get(identity)
+            if resource is None or resource not in seen:
+                seen.add(resource)
+                yield row
+    return heapq.nlargest(k, unique(), key=key)
+
+
+def _first_rows(rows: List[Dict[str, Any]], identity: str) -> Iterator[bool]:
+    seen = set()
+    for row in rows:
+        resource = row.get(identity)
+        yield resource is None or resource not in seen
+        seen.add(resource)
+
+
+class CompatibilityMatrix:
+    """Matrice NumPy profils x types d'activité, calculée une fois
+
+    Chaque type connu de la hiérarchie a une colonne (score de la classe ou de
+    son plus proche ancêtre présent dans la table); la dernière colonne sert
+    aux types inconnus, la dernière ligne aux profils inconnus.
+    """
+
+    def __init__(self, table: Dict[str, Dict[str, int]], hierarchy: ClassHierarchy):
+        self.profiles = {profile: row for row, profile in enumerate(table)}
+        types = sorted(
+            {hierarchy.local_name(c) for c in hierarchy.subclasses("ActiviteTouristique")}
+            | {name for scores in table.values() for name in scores}
+        )
+        self.types = {name: column for column, name in enumerate(types)}
+        self.unknown_type = len(types)
+        self.matrix = np.full((len(table) + 1, len(types) + 1), DEFAULT_MATCH_SCORE, dtype=np.int64)
+        for profile, row in self.profiles.items():
+            scores = table[profile]
+            for name, column in self.types.items():
+                matched = name if name in scores else hierarchy.resolve(name, scores)
+                if matched is not None:
+                    self.matrix[row, column] = scores[matched]
+        self._hierarchy = hierarchy
+
+    def type_index(self, activity_type: str) -> int:
+        return self.types.get(self._hierarchy.local_name(activity_type or ""), self.unknown_type)
+
+    def encode(self, activity_types: List[str]) -> np.ndarray:
+        """Types d'activité -> indices de colonne (int32)"""
+        return np.fromiter((self.type_index(t) for t in activity_types), dtype=np.int32, count=len(activity_types))
+
+    def row(self, profile: str) -> np.ndarray:
+        return self.matrix[self.profile_index(profile)]
+
+    def score(self, profile: str, activity_type: str) -> int:
+        return int(self.row(profile)[self.type_index(activity_type)])
+
+    def profile_index(self, profile: str) -> int:
+        return self.profiles.get(profile, len(self.profiles))
+
+    def top_k(self, profile: str, type_indices: np.ndarray, k: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(positions, scores) des k meilleurs candidats, score décroissant puis ordre d'origine"""
+        positions, scores = self.top_k_many(np.array([self.profile_index(profile)]), type_indices, k)
+        return positions[0], scores[0]
+
+    def top_k_many(self, profile_indices: np.ndarray, type_indices: np.ndarray, k: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """top_k pour plusieurs lignes de profils à la fois: matrices (profils x k)
+
+        Un seul gather vectorisé, puis sélection partielle (argpartition) en O(n) par ligne.
+        """
+        scores = self.matrix[np.asarray(profile_indices)][:, type_indices]
+        rows, n = scores.shape
+        if k is None or k >= n:
+            k = n
+        if k <= 0:
+            return np.empty((rows, 0), dtype=np.int64), np.empty((rows, 0), dtype=np.int64)
+        # Clé entière: score d'abord, puis position (à score égal, l'ordre d'origine est conservé)
+        keys = scores * n + (n - 1 - np.arange(n))
+        if k < n:
+            candidates = np.argpartition(-keys, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(n), (rows, n))
+        order = np.argsort(-np.take_along_axis(keys, candidates, axis=1), axis=1)
+        positions = np.take_along_axis(candidates, order, axis=1)
+        return positions, np.take_along_axis(scores, positions, axis=1)
+
 
 class RecommendationEngine:
-    """Moteur de recommandations intelligentes basé sur profils et impact carbone"""
+    """Moteur de recommandations intelligentes basé sur profils et impact carbone
+
+    Les candidats (activités, hébergements, transports) ne dépendent pas du
+    profil: ils sont chargés par trois requêtes concurrentes et partagés, en
+    lecture seule, tant que la version du dataset ne change pas.
+    """
     
-    def __init__(self, fuseki_client=None):
+    def __init__(self, fuseki_client=None, hierarchy: ClassHierarchy = None, max_workers: int = RECOMMENDATION_WORKERS):
         # Accept fuseki client from outside (can be mock or real)
         self.fuseki = fuseki_client
         from config import ONTOLOGY_NS
         self.ns = ONTOLOGY_NS
+        # Fermeture rdfs:subClassOf précalculée (Musee ⊑ ActiviteCulturelle, ...)
+        self.hierarchy = hierarchy if hierarchy is not None else get_class_hierarchy()
+        # Matrice profil x type d'activité (types résolus via la hiérarchie)
+        self.compatibility = CompatibilityMatrix(COMPATIBILITY_MATRIX, self.hierarchy)
+        self._queries = self._build_queries()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="recommendation")
+        # Résultats mémorisés par version du dataset: clé -> (version, valeur)
+        self._memo: Dict[tuple, tuple] = {}
+        self._memo_locks: Dict[tuple, threading.Lock] = {}
+        self._memo_guard = threading.Lock()
+        self.optimizer = ItineraryOptimizer(ITINERARY_BEAM_WIDTH, ITINERARY_POOL_SIZE, ITINERARY_TIME_BUDGET_MS / 1000)
+        self.carbon_calculator = CarbonCalculator()
+
+    def _build_queries(self) -> Dict[str, str]:
+        """Requêtes des candidats, construites une fois"""
+        return {
+            "activities": f"""PREFIX eco: <{self.ns}>
+SELECT DISTINCT ?activite ?nom ?type ?description ?kgCO2 ?prix ?profileRecommande
+WHERE {{
+  {self.hierarchy.type_pattern("activite", "ActiviteTouristique")}
+  ?activite eco:nom ?nom .
+  OPTIONAL {{ ?activite rdf:type ?type FILTER(?type != eco:ActiviteTouristique) }}
+  OPTIONAL {{ ?activite eco:description ?description }}
+  OPTIONAL {{ ?activite eco:kgCO2 ?kgCO2 }}
+  OPTIONAL {{ ?activite eco:prix ?prix }}
+  OPTIONAL {{ ?activite eco:profileRecommande ?profileRecommande }}
+}}""",
+            "accommodations": f"""PREFIX eco: <{self.ns}>
+SELECT DISTINCT ?hebergement ?nom ?type ?localiseDans ?scoreDurabilite ?certification ?description ?prix
+WHERE {{
+  {self.hierarchy.type_pattern("hebergement", "Hebergement")}
+  ?hebergement eco:nom ?nom .
+  OPTIONAL {{ ?hebergement rdf:type ?type FILTER(?type != eco:Hebergement) }}
+  OPTIONAL {{ ?hebergement eco:localiseDans ?localiseDans }}
+  OPTIONAL {{ ?hebergement eco:scoreDurabilite ?scoreDurabilite }}
+  OPTIONAL {{ ?hebergement eco:aCertification ?certification }}
+  OPTIONAL {{ ?hebergement eco:description ?description }}
+  OPTIONAL {{ ?hebergement eco:prix ?prix }}
+}}""",
+            "transports": f"""PREFIX eco: <{self.ns}>
+SELECT DISTINCT ?transport ?nom ?type ?kgCO2 ?prix
+WHERE {{
+  {self.hierarchy.type_pattern("transport", "Transport")}
+  ?transport eco:nom ?nom .
+  OPTIONAL {{ ?transport rdf:type ?type FILTER(?type != eco:Transport) }}
+  OPTIONAL {{ ?transport eco:kgCO2 ?directCO2 }}
+  OPTIONAL {{ ?transport eco:aEmpreinte ?empreinte . ?empreinte eco:kgCO2 ?empreinteCO2 }}
+  OPTIONAL {{ ?transport eco:prix ?prix }}
+  BIND(COALESCE(?directCO2, ?empreinteCO2) AS ?kgCO2)
+}}""",
+        }
+
+    def _fetch(self, name: str) -> List[Dict[str, Any]]:
+        return self.fuseki.parse_results(self.fuseki.query(self._queries[name]))
+
+    def _memoized(self, key: tuple, loader):
+        """Valeur calculée une fois par version du dataset (chargements concurrents fusionnés)
+
+        Un chargement en échec lève son exception et n'est pas mémorisé.
+        """
+        version = getattr(self.fuseki, "version", None)
+        entry = self._memo.get(key)
+        if version is not None and entry is not None and entry[0] == version:
+            return entry[1]
+        with self._memo_guard:
+            lock = self._memo_locks.setdefault(key, threading.Lock())
+        with lock:
+            entry = self._memo.get(key)
+            if version is not None and entry is not None and entry[0] == version:
+                return entry[1]
+            value = loader()
+            if version is not None:
+                self._memo[key] = (version, value)
+            return value
+
+    def _memoized_or(self, key: tuple, loader, fallback):
+        """_memoized, ou `fallback` si Fuseki échoue (réessayé au prochain appel)"""
+        try:
+            return self._memoized(key, loader)
+        except Exception as e:
+            print(f"Error getting {key[0]}: {e}")
+            return fallback
+
+    def load_candidates(self) -> Dict[str, Any]:
+        """Instantané des activités candidates (le score dépend du profil: toutes sont nécessaires)
+
+        Réutilisé tant que `fuseki.version` ne change pas (un client sans
+        version est interrogé à chaque appel). Les lignes sont partagées: ne
+        pas les modifier.
+        """
+        if not self.fuseki:
+            return self._snapshot([])
+
+        return self._memoized_or(("activities",), lambda: self._snapshot(self._fetch("activities")), self._snapshot([]))
+
+    def _snapshot(self, activities: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # Types, prix (0 si inconnu) et kgCO2 encodés une fois par instantané
+        count = len(activities)
+        return {
+            "activities": activities,
+            "activity_types": self.compatibility.encode([a.get("type", "") for a in activities]),
+            "activity_costs": np.fromiter((_number(a.get("prix"), 0) for a in activities), dtype=float, count=count),
+            "activity_co2": np.fromiter((_number(a.get("kgCO2"), 0) for a in activities), dtype=float, count=count),
+            # Première ligne de chaque ressource (une activité ne peut être choisie deux fois)
+            "activity_first": np.array(list(_first_rows(activities, "activite")), dtype=bool).reshape(count),
+        }
+
+    def stream_top_k(self, name: str, k: int, order: str, key, identity: str) -> List[Dict[str, Any]]:
+        """k meilleurs candidats: ORDER BY ... LIMIT k poussé dans SPARQL, lignes lues en flux dans un tas borné
+
+        Le tas (O(n log k)) classe à nouveau les lignes reçues: il garantit
+        l'ordre même si le store ignore ORDER BY, et déduplique par ressource
+        (plusieurs lignes par ressource avec les OPTIONAL multivalués).
+        """
+        if k <= 0:
+            return []
+        query = f"{self._queries[name]}\nORDER BY {order}\nLIMIT {k * TOP_K_OVERFETCH}"
+        stream = getattr(self.fuseki, "query_stream", None)
+        rows = stream(query) if stream is not None else iter(self.fuseki.parse_results(self.fuseki.query(query)))
+        return top_k(rows, k, key, identity)
+
+    def top_accommodations(self, k: int = 1) -> List[Dict[str, Any]]:
+        """Hébergements les plus durables (score décroissant), mémorisés par version du dataset"""
+        if not self.fuseki:
+            return []
+        rows = self._memoized_or(("accommodations", k), lambda: self.stream_top_k(
+            "accommodations", k, "DESC(?scoreDurabilite)",
+            key=lambda row: _number(row.get("scoreDurabilite"), 0), identity="hebergement",
+        ), [])
+        return [dict(row) for row in rows]
+
+    def top_transports(self, k: int = 1) -> List[Dict[str, Any]]:
+        """Transports les moins émetteurs (kgCO2 croissant, score carbone associé)"""
+        if not self.fuseki:
+            return []
+        rows = self._memoized_or(("transports", k), lambda: self.stream_top_k(
+            "transports", k, "ASC(COALESCE(?kgCO2, 100))",
+            key=lambda row: -_number(row.get("kgCO2"), 100), identity="transport",
+        ), [])
+        if not rows:
+            rows = top_k(iter(DEFAULT_TRANSPORTS), k, lambda row: -_number(row.get("kgCO2"), 100), "nom")
+        return [self._with_carbon(row) for row in rows]
+
+    def _with_carbon(self, transport: Dict[str, Any]) -> Dict[str, Any]:
+        kg_co2 = _number(transport.get('kgCO2'), 100)
+        return dict(transport, type=self.hierarchy.local_name(transport.get('type', '')), carbon=self.calculate_carbon_score(kg_co2))
     
     def calculate_carbon_score(self, co2_kg: float) -> Dict[str, Any]:
         """Calcule le score d'impact carbone"""
@@ -29,135 +338,51 @@ class RecommendationEngine:
             "kg_co2": co2_kg
         }
     
+    def calculate_carbon_batch(self, transport_types: List[str], distances_km: List[float], alternatives: int = 3) -> Dict[str, Any]:
+        """Empreinte de nombreux trajets en une passe vectorisée (voir CarbonCalculator.calculate_batch)"""
+        return self.carbon_calculator.calculate_batch(transport_types, distances_km, alternatives)
+
     def calculate_match_score(self, traveler_profile: str, activity_type: str) -> float:
         """Calcule la compatibilité entre profil et activité (0-100)"""
-        compatibility_matrix = {
-            "Adventure": {
-                "ActiviteSportive": 100,
-                "Randonnee": 100,
-                "Plongee": 90,
-                "ActiviteEducative": 40,
-                "ActiviteCulturelle": 30,
-                "ActiviteDetente": 20,
-            },
-            "Culture": {
-                "ActiviteCulturelle": 100,
-                "VisiteHistorique": 100,
-                "Musee": 95,
-                "ActiviteEducative": 80,
-                "Atelier_culinaire": 70,
-                "ActiviteSportive": 30,
-                "Randonnee": 20,
-            },
-            "BienEtre": {
-                "ActiviteDetente": 100,
-                "Spa": 100,
-                "Meditation": 95,
-                "ActiviteEducative": 60,
-                "ActiviteCulturelle": 50,
-                "ActiviteSportive": 30,
-            },
-            "Famille": {
-                "ActiviteEducative": 100,
-                "Atelier_culinaire": 90,
-                "ActiviteCulturelle": 85,
-                "ActiviteDetente": 70,
-                "ActiviteSportive": 60,
-            }
-        }
-        
-        profile_compat = compatibility_matrix.get(traveler_profile, {})
-        return profile_compat.get(activity_type, 50)
+        return self.compatibility.score(traveler_profile, activity_type)
     
-    def get_activities_for_profile(self, profile: str) -> List[Dict[str, Any]]:
-        """Récupère les activités recommandées pour un profil"""
+    def get_activities_for_profile(self, profile: str, candidates: Dict[str, Any] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Récupère les activités recommandées pour un profil (les `limit` meilleures si précisé)"""
         if not self.fuseki:
             return []
-            
-        # Simple query for activities
-        query = "activites"
+        candidates = candidates if candidates is not None else self.load_candidates()
+        activities = candidates["activities"]
         
-        try:
-            results_json = self.fuseki.query(query)
-            activities = self.fuseki.parse_results(results_json)
-            
-            # Score each activity based on profile
-            scored = []
-            for activity in activities:
-                # Extract activity type from data
-                activity_type = activity.get('type', activity.get('nom', ''))
-                
-                # Normalize type to match compatibility matrix format
-                # Mock returns "Sportive", "Culturelle", "Detente", "Educative", "Familiale"
-                # Matrix expects "ActiviteSportive", "ActiviteCulturelle", "ActiviteDetente", etc.
-                if activity_type and not activity_type.startswith('Activite'):
-                    # Map simple names to matrix keys
-                    type_mapping = {
-                        "Sportive": "ActiviteSportive",
-                        "Culturelle": "ActiviteCulturelle",
-                        "Detente": "ActiviteDetente",
-                        "Educative": "ActiviteEducative",
-                        "Familiale": "ActiviteEducative"  # Familiale maps to Educative
-                    }
-                    activity_type = type_mapping.get(activity_type, activity_type)
-                
-                score = self.calculate_match_score(profile, activity_type)
-                activity['match_score'] = score
-                scored.append(activity)
-            
-            # Sort by score
-            scored.sort(key=lambda x: x.get('match_score', 0), reverse=True)
-            return scored
-        except Exception as e:
-            print(f"Error getting activities: {e}")
-            return []
+        # Score each activity based on profile: gather vectorisé + top-k partiel
+        positions, scores = self.compatibility.top_k(profile, candidates["activity_types"], limit)
+        # Copies: l'instantané est partagé
+        return [dict(activities[p], match_score=int(score)) for p, score in zip(positions.tolist(), scores.tolist())]
     
     def get_accommodations_for_profile(self, profile: str) -> List[Dict[str, Any]]:
         """Récupère les hébergements recommandés"""
         if not self.fuseki:
             return []
-            
-        query = "hebergements"
+        accommodations = self._memoized_or(("accommodations",), lambda: self._fetch("accommodations"), [])
         
-        try:
-            results_json = self.fuseki.query(query)
-            accommodations = self.fuseki.parse_results(results_json)
-            
-            # Filter for eco-friendly ones first
-            eco_friendly = [acc for acc in accommodations 
-                          if int(acc.get('scoreDurabilité', acc.get('scoreDurabilite', 0))) >= 70]
-            return eco_friendly if eco_friendly else accommodations
-        except Exception as e:
-            print(f"Error getting accommodations: {e}")
-            return []
+        # Filter for eco-friendly ones first
+        eco_friendly = [dict(acc) for acc in accommodations 
+                      if _number(acc.get('scoreDurabilité', acc.get('scoreDurabilite')), 0) >= 70]
+        return eco_friendly if eco_friendly else [dict(acc) for acc in accommodations]
     
     def get_transport_options(self, carbon_sensitive: bool = False) -> List[Dict[str, Any]]:
         """Récupère les options de transport, triées par impact carbone"""
         if not self.fuseki:
             return []
-            
-        # Create mock transport data since it's not in mock client yet
-        transports = [
-            {"nom": "Train Régional", "kgCO2": "15", "type": "Train"},
-            {"nom": "Bus Électrique", "kgCO2": "25", "type": "Bus"},
-            {"nom": "Voiture Partagée", "kgCO2": "45", "type": "Voiture"},
-            {"nom": "Vélo", "kgCO2": "0", "type": "Velo"},
-            {"nom": "Avion Low-Cost", "kgCO2": "250", "type": "Avion"}
-        ]
+        transports = self._memoized_or(("transports",), lambda: self._fetch("transports"), []) or DEFAULT_TRANSPORTS
         
         # Add carbon score to each
-        scored = []
-        for transport in transports:
-            kg_co2 = float(transport.get('kgCO2', 100))
-            carbon = self.calculate_carbon_score(kg_co2)
-            transport['carbon'] = carbon
-            scored.append(transport)
+        scored = [self._with_carbon(transport) for transport in transports]
         
         # If carbon-sensitive, prioritize low-carbon options
         if carbon_sensitive:
-            scored.sort(key=lambda x: x['carbon']['score'], reverse=True)
+            scored.sort(key=lambda x: (-x['carbon']['score'], x['carbon']['kg_co2']))
         else:
-            scored.sort(key=lambda x: float(x.get('kgCO2', 100)))
+            scored.sort(key=lambda x: x['carbon']['kg_co2'])
         
         return scored
     
@@ -170,51 +395,153 @@ class RecommendationEngine:
         days: int = 3
     ) -> Dict[str, Any]:
         """Génère une recommandation complète de voyage"""
-        
-        activities = self.get_activities_for_profile(profile)
-        accommodations = self.get_accommodations_for_profile(profile)
-        transports = self.get_transport_options(carbon_priority)
-        
-        # Select best options
-        best_activities = activities[:min(days, len(activities))]
-        best_accommodation = accommodations[0] if accommodations else None
-        best_transport = transports[0] if transports else None
-        
+        return next(self.generate_recommendations_batch([{
+            "profile": profile,
+            "destination": destination,
+            "budget": budget,
+            "carbon_priority": carbon_priority,
+            "days": days,
+        }]))
+
+    def generate_recommendations_batch(self, travellers: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Recommandations pour plusieurs voyageurs (profile, destination, budget, carbon_priority, days)
+
+        Le catalogue est chargé une fois pour tout le lot; le top-k des activités
+        et les scores sont calculés en une passe vectorisée, puis les
+        recommandations sont produites une à une, dans l'ordre des voyageurs.
+        """
+        # Trois requêtes concurrentes (ou résultats déjà mémorisés pour cette version):
+        # toutes les activités pour le scoring, seulement le meilleur hébergement et transport
+        candidates = self._executor.submit(self.load_candidates)
+        accommodations = self._executor.submit(self.top_accommodations, 1)
+        transports = self._executor.submit(self.top_transports, 1)
+        candidates = candidates.result()
+        best_accommodation = next(iter(accommodations.result()), None)
+        best_transport = next(iter(transports.result()), None)
+        if not travellers:
+            return
+
+        travellers = [
+            dict(t, **{name: value for name, value in TRAVELLER_DEFAULTS.items() if t.get(name) is None})
+            for t in travellers
+        ]
+        profiles = [t["profile"] for t in travellers]
+        days = np.fromiter((max(int(t["days"]), 0) for t in travellers), dtype=np.int64, count=len(travellers))
+        # Une ligne de top-k par profil distinct, assez longue pour le plus long séjour
+        distinct = {profile: row for row, profile in enumerate(dict.fromkeys(profiles))}
+        rows = np.fromiter((distinct[p] for p in profiles), dtype=np.int64, count=len(profiles))
+        positions, scores = self.compatibility.top_k_many(
+            np.array([self.compatibility.profile_index(p) for p in distinct]),
+            candidates["activity_types"],
+            int(days.max()),
+        )
+
+        # Moyenne des `days` premiers scores de chaque voyageur via sommes cumulées
+        taken = np.minimum(days, scores.shape[1])
+        cumulated = np.concatenate([np.zeros((len(distinct), 1), dtype=np.int64), np.cumsum(scores, axis=1)], axis=1)
+        totals = cumulated[rows, taken]
+        rec_scores = np.zeros(len(travellers))
+        has_activities = taken > 0
+        rec_scores[has_activities] = totals[has_activities] / taken[has_activities] * 0.4
+
         # Calculate total carbon footprint
         total_co2 = 0
         if best_transport:
             total_co2 += float(best_transport.get('carbon', {}).get('kg_co2', 0))
-        
-        # Calculate recommendation score
-        rec_score = 0
-        if best_activities:
-            avg_activity_score = sum(a['match_score'] for a in best_activities) / len(best_activities)
-            rec_score += avg_activity_score * 0.4
-        
+
         if best_accommodation:
             acc_score = int(best_accommodation.get('scoreDurabilite', 70))
-            rec_score += acc_score * 0.3
+            rec_scores += acc_score * 0.3
         
         if best_transport:
             transport_score = best_transport.get('carbon', {}).get('score', 50)
-            rec_score += transport_score * 0.3
-        
-        rec_score = min(100, rec_score)
+            rec_scores += transport_score * 0.3
         
+        rec_scores = np.minimum(100, rec_scores)
+
+        activities = candidates["activities"]
+        positions, scores = positions.tolist(), scores.tolist()
+        for index, traveller in enumerate(travellers):
+            row, count = rows[index], int(taken[index])
+            # Copies: l'instantané est partagé
+            best_activities = [
+                dict(activities[p], match_score=int(score))
+                for p, score in zip(positions[row][:count], scores[row][:count])
+            ]
+            carbon_priority = traveller["carbon_priority"]
+            yield {
+                "profile": traveller["profile"],
+                "destination": traveller.get("destination"),
+                "duration_days": traveller["days"],
+                "recommendation_score": round(float(rec_scores[index]), 2),
+                "activities": best_activities,
+                "accommodation": best_accommodation,
+                "transport": best_transport,
+                "total_carbon_kg": round(total_co2, 2),
+                "budget": traveller["budget"],
+                "eco_friendly": carbon_priority,
+                "reasons": self._generate_reasons(traveller["profile"], best_activities, best_accommodation, carbon_priority)
+            }
+    
+    def optimize_itinerary(
+        self,
+        profile: str,
+        budget: float = 1000,
+        days: int = 3,
+        max_co2: Optional[float] = None,
+        carbon_priority: bool = False
+    ) -> Dict[str, Any]:
+        """Itinéraire (transport, hébergement, activités) de score maximal sous budget et plafond CO2
+
+        Coût: prix des activités, du transport et de l'hébergement (par nuit,
+        une nuit par jour); un prix inconnu compte pour 0. Retourne le meilleur
+        itinéraire et le front de Pareto (score, coût, CO2) des alternatives.
+        """
+        days = max(int(days), 0)
+        candidates = self._executor.submit(self.load_candidates)
+        accommodations = self._executor.submit(self.get_accommodations_for_profile, profile)
+        transports = self._executor.submit(self.get_transport_options)
+        candidates, accommodations, transports = candidates.result(), accommodations.result(), transports.result()
+
+        match = self.compatibility.row(profile)[candidates["activity_types"]] * candidates["activity_first"]
+        nights = max(days, 1)
+        result = self.optimizer.solve(
+            (match, candidates["activity_costs"], candidates["activity_co2"]),
+            (
+                [_number(a.get("prix"), 0) * nights for a in accommodations],
+                [_number(a.get("kgCO2"), 0) * nights for a in accommodations],
+            ),
+            ([_number(t.get("prix"), 0) for t in transports], [t["carbon"]["kg_co2"] for t in transports]),
+            days, budget, max_co2,
+        )
+
+        activities = candidates["activities"]
+        front = [
+            {
+                "match_score": int(option["match_score"]),
+                "average_match": round(option["match_score"] / len(option["activities"]), 2) if option["activities"] else 0,
+                "total_cost": round(option["cost"], 2),
+                "total_carbon_kg": round(option["kg_co2"], 2),
+                # Copies: l'instantané est partagé
+                "activities": [dict(activities[i], match_score=int(match[i])) for i in option["activities"]],
+                "accommodation": None if option["accommodation"] == NO_OPTION else accommodations[option["accommodation"]],
+                "transport": None if option["transport"] == NO_OPTION else transports[option["transport"]],
+            }
+            for option in result["front"]
+        ]
+        # Meilleur score; à score égal, le moins émetteur (carbon_priority) ou le moins cher
+        tie_break = ("total_carbon_kg", "total_cost") if carbon_priority else ("total_cost", "total_carbon_kg")
+        best = min(front, key=lambda o: (-o["match_score"], o[tie_break[0]], o[tie_break[1]]), default=None)
         return {
             "profile": profile,
-            "destination": destination,
-            "duration_days": days,
-            "recommendation_score": round(rec_score, 2),
-            "activities": best_activities,
-            "accommodation": best_accommodation,
-            "transport": best_transport,
-            "total_carbon_kg": round(total_co2, 2),
             "budget": budget,
-            "eco_friendly": carbon_priority,
-            "reasons": self._generate_reasons(profile, best_activities, best_accommodation, carbon_priority)
+            "duration_days": days,
+            "max_co2": max_co2,
+            "best": best,
+            "pareto_front": front,
+            "search": {name: result[name] for name in ("complete", "candidates", "examined", "elapsed_ms")},
         }
-    
+
     def _generate_reasons(self, profile: str, activities: List, accommodation: Dict, eco: bool) -> List[str]:
         """Génère les raisons de la recommandation"""
         reasons = []
@@ -0,0 +1,167 @@
+# SPARQL Result Cache (TTL + LRU)
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Iterator, AsyncIterator
+from config import CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES
+
+# Littéraux et IRI sont conservés tels quels, seul l'espacement autour est normalisé
+_PRESERVED_RE = re.compile(r'"""(?:.|\n)*?"""|\'\'\'(?:.|\n)*?\'\'\'|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|<[^<>\s]*>')
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(sparql_query: str) -> str:
+    """Normalise le texte d'une requête (espaces hors littéraux) pour en faire une clé de cache"""
+    parts = []
+    last = 0
+    for match in _PRESERVED_RE.finditer(sparql_query):
+        parts.append(_WHITESPACE_RE.sub(" ", sparql_query[last:match.start()]))
+        parts.append(match.group(0))
+        last = match.end()
+    parts.append(_WHITESPACE_RE.sub(" ", sparql_query[last:]))
+    return "".join(parts).strip()
+
+
+class ResultCache:
+    """Cache borné (LRU) de résultats SPARQL avec expiration (TTL)"""
+
+    def __init__(self, ttl: float = CACHE_TTL_SECONDS, max_entries: int = CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Incrémenté à chaque invalidation: un résultat lu avant une écriture
+        # ne doit pas être stocké après celle-ci
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Retourne la valeur en cache ou None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, generation: int = None):
+        """Stocke une valeur (ignorée si une invalidation a eu lieu depuis `generation`)"""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """Vide le cache (appelé après chaque mise à jour des données)"""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs du cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+class CachedFusekiClient:
+    """Enveloppe un client synchrone (query/update/parse_results) avec un ResultCache"""
+
+    def __init__(self, client, cache: ResultCache = None):
+        self.client = client
+        self.cache = cache if cache is not None else ResultCache()
+
+    def query(self, sparql_query: str) -> Dict[str, Any]:
+        """Exécute la requête, ou retourne le résultat en cache"""
+        key = normalize_query(sparql_query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        generation = self.cache.generation
+        results = self.client.query(sparql_query)
+        self.cache.set(key, results, generation)
+        return results
+
+    def query_stream(self, sparql_query: str) -> Iterator[Dict[str, str]]:
+        """Le streaming contourne le cache (résultats potentiellement volumineux)"""
+        return self.client.query_stream(sparql_query)
+
+    def update(self, sparql_update: str) -> bool:
+        """Exécute la mise à jour puis invalide le cache"""
+        try:
+            return self.client.update(sparql_update)
+        finally:
+            self.cache.invalidate()
+
+    def parse_results(self, results: Dict[str, Any], columnar: bool = False):
+        """Parse les résultats SPARQL"""
+        return self.client.parse_results(results, columnar)
+
+    def __getattr__(self, name):
+        # pool_stats(), close(), ... du client enveloppé
+        return getattr(self.client, name)
+
+
+class AsyncCachedFusekiClient:
+    """Équivalent asyncio de CachedFusekiClient (pour AsyncFusekiClient)"""
+
+    def __init__(self, client, cache: ResultCache = None):
+        self.client = client
+        self.cache = cache if cache is not None else ResultCache()
+
+    async def query(self, sparql_query: str) -> Dict[str, Any]:
+        """Exécute la requête, ou retourne le résultat en cache"""
+        key = normalize_query(sparql_query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        generation = self.cache.generation
+        results = await self.client.query(sparql_query)
+        self.cache.set(key, results, generation)
+        return results
+
+    def query_stream(self, sparql_query: str) -> AsyncIterator[Dict[str, str]]:
+        """Le streaming contourne le cache (résultats potentiellement volumineux)"""
+        return self.client.query_stream(sparql_query)
+
+    async def update(self, sparql_update: str) -> bool:
+        """Exécute la mise à jour puis invalide le cache"""
+        try:
+            return await self.client.update(sparql_update)
+        finally:
+            self.cache.invalidate()
+
+    def parse_results(self, results: Dict[str, Any], columnar: bool = False):
+        """Parse les résultats SPARQL"""
+        return self.client.parse_results(results, columnar)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
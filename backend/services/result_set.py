@@ -0,0 +1,148 @@
+# Columnar SPARQL Result Set
+import json
+from array import array
+from collections.abc import Mapping
+from typing import Dict, List, Any, Iterator, Optional
+
+UNBOUND = 0  # code réservé aux variables non liées (OPTIONAL)
+
+
+class ResultSet:
+    """Résultats SPARQL en colonnes, avec dictionnaire de valeurs partagé
+
+    Les noms de variables sont stockés une seule fois (head.vars), chaque
+    colonne est un tableau compact de codes entiers et chaque IRI ou littéral
+    distinct n'est conservé qu'une fois dans `values`.
+    """
+
+    __slots__ = ("vars", "values", "columns", "_codes", "_length")
+
+    def __init__(self, vars: List[str]):
+        self.vars = list(vars)
+        self.values: List[Optional[str]] = [None]
+        self.columns = [array("I") for _ in self.vars]
+        self._codes: Dict[str, int] = {}
+        self._length = 0
+
+    @classmethod
+    def from_sparql_json(cls, results: Dict[str, Any]) -> "ResultSet":
+        """Construit le ResultSet depuis une réponse application/sparql-results+json"""
+        bindings = results.get("results", {}).get("bindings", [])
+        vars = results.get("head", {}).get("vars")
+        if not vars:
+            # Réponse sans head.vars (mock): on collecte les variables dans l'ordre d'apparition
+            vars = list(dict.fromkeys(var for binding in bindings for var in binding))
+        result_set = cls(vars)
+        for binding in bindings:
+            result_set.append(binding)
+        return result_set
+
+    def _intern(self, value: str) -> int:
+        """Retourne le code d'une valeur, en l'ajoutant au dictionnaire si besoin"""
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def append(self, binding: Dict[str, Any]):
+        """Ajoute un binding SPARQL JSON ({var: {"type", "value"}})"""
+        for var, column in zip(self.vars, self.columns):
+            value_obj = binding.get(var)
+            if isinstance(value_obj, dict) and "value" in value_obj:
+                column.append(self._intern(value_obj["value"]))
+            elif value_obj is not None and not isinstance(value_obj, dict):
+                column.append(self._intern(str(value_obj)))
+            else:
+                column.append(UNBOUND)
+        self._length += 1
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator["Row"]:
+        for index in range(self._length):
+            yield Row(self, index)
+
+    def __getitem__(self, index: int) -> "Row":
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("ResultSet index out of range")
+        return Row(self, index)
+
+    def column(self, var: str) -> List[Optional[str]]:
+        """Valeurs d'une variable pour toutes les lignes"""
+        values = self.values
+        return [values[code] for code in self.columns[self.vars.index(var)]]
+
+    def to_dicts(self) -> List[Dict[str, str]]:
+        """Matérialise les lignes au format de parse_results()"""
+        return [row.to_dict() for row in self]
+
+    def to_json(self) -> str:
+        """Sérialise les lignes en tableau JSON d'objets
+
+        Chaque clé et chaque valeur distincte n'est encodée qu'une fois.
+        """
+        encoded = [None] + [json.dumps(value, ensure_ascii=False) for value in self.values[1:]]
+        keys = [json.dumps(var, ensure_ascii=False) + ":" for var in self.vars]
+        columns = self.columns
+        parts = []
+        for index in range(self._length):
+            fields = [
+                key + encoded[column[index]]
+                for key, column in zip(keys, columns)
+                if column[index] != UNBOUND
+            ]
+            parts.append("{" + ",".join(fields) + "}")
+        return "[" + ",".join(parts) + "]"
+
+    def to_columnar_json(self) -> str:
+        """Sérialise au format colonnes: {"vars": [...], "columns": [[...], ...]}"""
+        encoded = ["null"] + [json.dumps(value, ensure_ascii=False) for value in self.values[1:]]
+        columns = ["[" + ",".join(encoded[code] for code in column) + "]" for column in self.columns]
+        return '{"vars":' + json.dumps(self.vars, ensure_ascii=False) + ',"columns":[' + ",".join(columns) + "]}"
+
+
+class Row(Mapping):
+    """Vue paresseuse sur une ligne d'un ResultSet (aucune copie)"""
+
+    __slots__ = ("_result_set", "_index")
+
+    def __init__(self, result_set: ResultSet, index: int):
+        self._result_set = result_set
+        self._index = index
+
+    def __getitem__(self, var: str) -> str:
+        result_set = self._result_set
+        try:
+            code = result_set.columns[result_set.vars.index(var)][self._index]
+        except ValueError:
+            raise KeyError(var)
+        if code == UNBOUND:
+            raise KeyError(var)
+        return result_set.values[code]
+
+    def __iter__(self) -> Iterator[str]:
+        result_set = self._result_set
+        for var, column in zip(result_set.vars, result_set.columns):
+            if column[self._index] != UNBOUND:
+                yield var
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict[str, str]:
+        """Copie la ligne dans un dict"""
+        result_set = self._result_set
+        values = result_set.values
+        return {
+            var: values[column[self._index]]
+            for var, column in zip(result_set.vars, result_set.columns)
+            if column[self._index] != UNBOUND
+        }
+
+    def __repr__(self) -> str:
+        return f"Row({self.to_dict()!r})"
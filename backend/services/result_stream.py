@@ -0,0 +1,98 @@
+# Streaming SPARQL Results Parser
+import re
+import json
+import codecs
+from typing import Dict, List, Any, Iterable, Iterator, AsyncIterable, AsyncIterator
+
+_VARS_RE = re.compile(r'"vars"\s*:\s*(\[[^\]]*\])')
+_BINDINGS_RE = re.compile(r'"bindings"\s*:\s*\[')
+_SEPARATORS = " \t\r\n,"
+
+
+def binding_to_row(binding: Dict[str, Any]) -> Dict[str, str]:
+    """Convertit un binding SPARQL JSON en ligne {variable: valeur}"""
+    row = {}
+    for var, value_obj in binding.items():
+        if isinstance(value_obj, dict) and "value" in value_obj:
+            row[var] = value_obj["value"]
+    return row
+
+
+class SparqlJsonStreamParser:
+    """Parse incrémental d'un flux application/sparql-results+json
+
+    Les octets sont fournis au fil de l'eau via feed(); chaque binding est
+    décodé dès qu'il est complet et le tampon est tronqué au fur et à mesure,
+    si bien que la mémoire reste bornée par la taille d'une ligne.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._in_bindings = False
+        self.done = False
+        self.vars: List[str] = []
+
+    def feed(self, chunk: bytes) -> List[Dict[str, str]]:
+        """Ajoute un bloc d'octets et retourne les lignes devenues complètes"""
+        self._buffer += self._decoder.decode(chunk)
+        rows = []
+        if self.done:
+            return rows
+
+        if not self._in_bindings:
+            if not self.vars:
+                match = _VARS_RE.search(self._buffer)
+                if match:
+                    self.vars = json.loads(match.group(1))
+            match = _BINDINGS_RE.search(self._buffer)
+            if not match:
+                return rows
+            self._buffer = self._buffer[match.end():]
+            self._in_bindings = True
+
+        buffer = self._buffer
+        pos = 0
+        length = len(buffer)
+        while True:
+            while pos < length and buffer[pos] in _SEPARATORS:
+                pos += 1
+            if pos >= length:
+                break
+            if buffer[pos] == "]":
+                self.done = True
+                pos += 1
+                break
+            try:
+                binding, pos = self._json.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Binding incomplet: on attend le bloc suivant
+                break
+            rows.append(binding_to_row(binding))
+
+        self._buffer = "" if self.done else buffer[pos:]
+        return rows
+
+    def close(self):
+        """Vérifie que le flux s'est terminé proprement"""
+        self._buffer += self._decoder.decode(b"", final=True)
+        if self._in_bindings and not self.done:
+            raise Exception("Erreur parsing résultats: flux SPARQL tronqué")
+
+
+def iter_rows(chunks: Iterable[bytes]) -> Iterator[Dict[str, str]]:
+    """Itère sur les lignes d'un flux de résultats SPARQL JSON"""
+    parser = SparqlJsonStreamParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    parser.close()
+
+
+async def aiter_rows(chunks: AsyncIterable[bytes]) -> AsyncIterator[Dict[str, str]]:
+    """Version asyncio de iter_rows"""
+    parser = SparqlJsonStreamParser()
+    async for chunk in chunks:
+        for row in parser.feed(chunk):
+            yield row
+    parser.close()
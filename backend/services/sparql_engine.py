@@ -0,0 +1,1341 @@
+# SPARQL Evaluation Engine (in-memory)
+import re
+import heapq
+import functools
+import itertools
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+from .triple_store import (
+    TripleStore, Term, MISSING, RDF_NS, RDFS_NS, XSD_NS, OWL_NS, RDF_TYPE,
+    iri, literal, bnode,
+)
+
+
+class SparqlError(Exception):
+    """Requête SPARQL invalide ou non supportée par le moteur local"""
+
+
+DEFAULT_PREFIXES = {
+    "rdf": RDF_NS,
+    "rdfs": RDFS_NS,
+    "xsd": XSD_NS,
+    "owl": OWL_NS,
+}
+
+XSD_INTEGER = XSD_NS + "integer"
+XSD_DECIMAL = XSD_NS + "decimal"
+XSD_DOUBLE = XSD_NS + "double"
+XSD_BOOLEAN = XSD_NS + "boolean"
+NUMERIC_TYPES = {
+    XSD_INTEGER, XSD_DECIMAL, XSD_DOUBLE, XSD_NS + "float", XSD_NS + "int",
+    XSD_NS + "long", XSD_NS + "short", XSD_NS + "nonNegativeInteger",
+    XSD_NS + "positiveInteger",
+}
+TRUE = literal("true", XSD_BOOLEAN)
+FALSE = literal("false", XSD_BOOLEAN)
+
+# ---------------------------------------------------------------------------
+# Tokenizer
+# ---------------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+|\#[^\n]*)
+  | (?P<iri><[^<>"{}|^`\\\x00-\x20]*>)
+  | (?P<string>\"\"\"(?:[^\\]|\\.)*?\"\"\"|'''(?:[^\\]|\\.)*?'''|"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+  | (?P<lang>@[A-Za-z]+(?:-[A-Za-z0-9]+)*)
+  | (?P<var>[?$][\w]+)
+  | (?P<bnode>_:[\w.\-]+)
+  | (?P<number>\d*\.\d+(?:[eE][+-]?\d+)?|\d+[eE][+-]?\d+|\d+)
+  | (?P<pname>(?:[A-Za-z][\w.\-]*)?:(?:[\w\-.:%]*[\w\-:%])?)
+  | (?P<name>[A-Za-z_]\w*)
+  | (?P<punct>\^\^|&&|\|\||!=|<=|>=|[{}()\[\].;,*=<>!+\-/|^?])
+""", re.VERBOSE)
+
+_ESCAPES = {"t": "\t", "n": "\n", "r": "\r", "b": "\b", "f": "\f", '"': '"', "'": "'", "\\": "\\"}
+
+
+def _unescape(text: str) -> str:
+    return re.sub(r"\\(.)", lambda m: _ESCAPES.get(m.group(1), m.group(1)), text)
+
+
+def tokenize(text: str) -> List[Tuple[str, str]]:
+    """Découpe un texte SPARQL en jetons (type, valeur)"""
+    tokens = []
+    pos = 0
+    length = len(text)
+    while pos < length:
+        match = _TOKEN_RE.match(text, pos)
+        if not match:
+            raise SparqlError(f"Caractère inattendu à la position {pos}: {text[pos:pos + 20]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        pos = match.end()
+        if kind == "ws":
+            continue
+        tokens.append((kind, value))
+    tokens.append(("eof", ""))
+    return tokens
+
+# ---------------------------------------------------------------------------
+# AST
+# ---------------------------------------------------------------------------
+
+
+class Group:
+    """Motif de groupe { ... }: éléments évalués en séquence + filtres du groupe"""
+
+    def __init__(self):
+        self.elements: List[tuple] = []
+        self.filters: List[tuple] = []
+
+
+class Query:
+    """Requête SELECT/ASK analysée"""
+
+    def __init__(self):
+        self.form = "SELECT"
+        self.prefixes: Dict[str, str] = {}
+        self.distinct = False
+        self.projection: Optional[List[Tuple[str, Optional[tuple]]]] = None  # None = SELECT *
+        self.where = Group()
+        self.group_by: List[tuple] = []
+        self.having: List[tuple] = []
+        self.order_by: List[Tuple[tuple, bool]] = []
+        self.limit: Optional[int] = None
+        self.offset = 0
+        self.variables: List[str] = []  # variables du WHERE par ordre d'apparition
+        self.has_aggregates = False
+
+
+AGGREGATES = {"COUNT", "SUM", "AVG", "MIN", "MAX", "SAMPLE", "GROUP_CONCAT"}
+BUILTINS = {
+    "STR", "LANG", "DATATYPE", "BOUND", "IRI", "URI", "ISIRI", "ISURI", "ISBLANK",
+    "ISLITERAL", "ISNUMERIC", "REGEX", "CONTAINS", "STRSTARTS", "STRENDS", "LCASE",
+    "UCASE", "STRLEN", "STRAFTER", "STRBEFORE", "CONCAT", "ABS", "ROUND", "CEIL",
+    "FLOOR", "COALESCE", "IF", "SAMETERM", "LANGMATCHES", "REPLACE", "SUBSTR",
+}
+
+# ---------------------------------------------------------------------------
+# Parser
+# ---------------------------------------------------------------------------
+
+
+class Parser:
+    """Analyseur descendant récursif pour le sous-ensemble SPARQL 1.1 supporté"""
+
+    def __init__(self, text: str, default_prefixes: Dict[str, str] = None):
+        self.tokens = tokenize(text)
+        self.pos = 0
+        self.prefixes = dict(DEFAULT_PREFIXES)
+        if default_prefixes:
+            self.prefixes.update(default_prefixes)
+        self.variables: Dict[str, None] = {}
+        self._bnode_counter = itertools.count()
+
+    # --- Outils ---------------------------------------------------------
+
+    def peek(self, offset: int = 0) -> Tuple[str, str]:
+        return self.tokens[min(self.pos + offset, len(self.tokens) - 1)]
+
+    def next(self) -> Tuple[str, str]:
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def at_keyword(self, *keywords: str) -> bool:
+        kind, value = self.peek()
+        return kind == "name" and value.upper() in keywords
+
+    def at_punct(self, *values: str) -> bool:
+        kind, value = self.peek()
+        return kind == "punct" and value in values
+
+    def expect_punct(self, value: str):
+        kind, token = self.next()
+        if kind != "punct" or token != value:
+            raise SparqlError(f"'{value}' attendu, trouvé {token!r}")
+
+    def expect_keyword(self, keyword: str):
+        kind, value = self.next()
+        if kind != "name" or value.upper() != keyword:
+            raise SparqlError(f"{keyword} attendu, trouvé {value!r}")
+
+    def expect_var(self) -> str:
+        kind, value = self.next()
+        if kind != "var":
+            raise SparqlError(f"Variable attendue, trouvé {value!r}")
+        return value[1:]
+
+    # --- Prologue -------------------------------------------------------
+
+    def parse_prologue(self):
+        while True:
+            if self.at_keyword("PREFIX"):
+                self.next()
+                kind, value = self.next()
+                if kind != "pname" or not value.endswith(":"):
+                    raise SparqlError(f"Préfixe invalide: {value!r}")
+                kind, namespace = self.next()
+                if kind != "iri":
+                    raise SparqlError(f"IRI attendue pour le préfixe {value}")
+                self.prefixes[value[:-1]] = namespace[1:-1]
+            elif self.at_keyword("BASE"):
+                self.next()
+                self.next()
+            else:
+                return
+
+    # --- Requêtes -------------------------------------------------------
+
+    def parse_query(self) -> Query:
+        self.parse_prologue()
+        query = Query()
+        if self.at_keyword("ASK"):
+            self.next()
+            query.form = "ASK"
+            self._skip_dataset()
+            if self.at_keyword("WHERE"):
+                self.next()
+            query.where = self.parse_group()
+        elif self.at_keyword("SELECT"):
+            self.next()
+            self._parse_select_clause(query)
+            self._skip_dataset()
+            if self.at_keyword("WHERE"):
+                self.next()
+            query.where = self.parse_group()
+            self._parse_solution_modifiers(query)
+        else:
+            raise SparqlError(f"Forme de requête non supportée: {self.peek()[1]!r}")
+        if self.peek()[0] != "eof":
+            raise SparqlError(f"Jeton inattendu après la requête: {self.peek()[1]!r}")
+        query.prefixes = self.prefixes
+        query.variables = list(self.variables)
+        return query
+
+    def _skip_dataset(self):
+        while self.at_keyword("FROM"):
+            self.next()
+            if self.at_keyword("NAMED"):
+                self.next()
+            self.next()
+
+    def _parse_select_clause(self, query: Query):
+        if self.at_keyword("DISTINCT", "REDUCED"):
+            query.distinct = self.next()[1].upper() == "DISTINCT"
+        if self.at_punct("*"):
+            self.next()
+            return
+        projection = []
+        while True:
+            kind, value = self.peek()
+            if kind == "var":
+                self.next()
+                projection.append((value[1:], None))
+            elif self.at_punct("("):
+                self.next()
+                expr = self.parse_expression()
+                self.expect_keyword("AS")
+                name = self.expect_var()
+                self.expect_punct(")")
+                if _contains_aggregate(expr):
+                    query.has_aggregates = True
+                projection.append((name, expr))
+            else:
+                break
+        if not projection:
+            raise SparqlError("Clause SELECT vide")
+        query.projection = projection
+
+    def _parse_solution_modifiers(self, query: Query):
+        if self.at_keyword("GROUP"):
+            self.next()
+            self.expect_keyword("BY")
+            while self.peek()[0] == "var" or self.at_punct("("):
+                if self.at_punct("("):
+                    self.next()
+                    query.group_by.append(self.parse_expression())
+                    self.expect_punct(")")
+                else:
+                    query.group_by.append(("var", self.expect_var()))
+            query.has_aggregates = True
+        if self.at_keyword("HAVING"):
+            self.next()
+            while self.at_punct("("):
+                query.having.append(self.parse_bracketted())
+        if self.at_keyword("ORDER"):
+            self.next()
+            self.expect_keyword("BY")
+            while True:
+                if self.at_keyword("ASC", "DESC"):
+                    descending = self.next()[1].upper() == "DESC"
+                    query.order_by.append((self.parse_bracketted(), descending))
+                elif self.peek()[0] == "var":
+                    query.order_by.append((("var", self.expect_var()), False))
+                elif self.at_punct("("):
+                    query.order_by.append((self.parse_bracketted(), False))
+                else:
+                    break
+        while self.at_keyword("LIMIT", "OFFSET"):
+            keyword = self.next()[1].upper()
+            kind, value = self.next()
+            if kind != "number" or not value.isdigit():
+                raise SparqlError(f"Entier attendu après {keyword}")
+            if keyword == "LIMIT":
+                query.limit = int(value)
+            else:
+                query.offset = int(value)
+
+    # --- Motifs ---------------------------------------------------------
+
+    def parse_group(self) -> Group:
+        self.expect_punct("{")
+        group = Group()
+        triples: List[tuple] = []
+
+        def flush():
+            if triples:
+                group.elements.append(("bgp", list(triples)))
+                triples.clear()
+
+        while not self.at_punct("}"):
+            if self.at_keyword("OPTIONAL"):
+                self.next()
+                flush()
+                group.elements.append(("optional", self.parse_group()))
+            elif self.at_keyword("FILTER"):
+                self.next()
+                group.filters.append(self._parse_constraint())
+            elif self.at_keyword("MINUS"):
+                self.next()
+                flush()
+                group.elements.append(("minus", self.parse_group()))
+            elif self.at_keyword("BIND"):
+                self.next()
+                flush()
+                self.expect_punct("(")
+                expr = self.parse_expression()
+                self.expect_keyword("AS")
+                name = self.expect_var()
+                self.variables.setdefault(name)
+                self.expect_punct(")")
+                group.elements.append(("bind", name, expr))
+            elif self.at_keyword("VALUES"):
+                self.next()
+                flush()
+                group.elements.append(self._parse_values())
+            elif self.at_punct("{"):
+                flush()
+                branches = [self.parse_group()]
+                while self.at_keyword("UNION"):
+                    self.next()
+                    branches.append(self.parse_group())
+                if len(branches) == 1:
+                    group.elements.append(("group", branches[0]))
+                else:
+                    group.elements.append(("union", branches))
+            elif self.at_punct("."):
+                self.next()
+            elif self.peek()[0] == "eof":
+                raise SparqlError("'}' manquant")
+            else:
+                self.parse_triples(triples)
+        self.next()
+        flush()
+        return group
+
+    def _parse_constraint(self) -> tuple:
+        if self.at_punct("("):
+            return self.parse_bracketted()
+        return self.parse_primary()
+
+    def _parse_values(self) -> tuple:
+        names = []
+        if self.peek()[0] == "var":
+            names.append(self.expect_var())
+            single = True
+        else:
+            single = False
+            self.expect_punct("(")
+            while self.peek()[0] == "var":
+                names.append(self.expect_var())
+            self.expect_punct(")")
+        for name in names:
+            self.variables.setdefault(name)
+        rows = []
+        self.expect_punct("{")
+        while not self.at_punct("}"):
+            if single:
+                rows.append([self._parse_value_term()])
+            else:
+                self.expect_punct("(")
+                row = []
+                while not self.at_punct(")"):
+                    row.append(self._parse_value_term())
+                self.expect_punct(")")
+                if len(row) != len(names):
+                    raise SparqlError("Nombre de valeurs incohérent dans VALUES")
+                rows.append(row)
+        self.next()
+        return ("values", names, rows)
+
+    def _parse_value_term(self) -> Optional[Term]:
+        if self.at_keyword("UNDEF"):
+            self.next()
+            return None
+        node = self.parse_term_node()
+        if node[0] != "const":
+            raise SparqlError("VALUES n'accepte que des constantes")
+        return node[1]
+
+    def parse_triples(self, out: List[tuple]):
+        """Sujet + liste prédicat/objets (avec ';' et ',')"""
+        subject = self.parse_term_node(allow_blank_property_list=out)
+        if self.at_punct(".", "}") and subject[0] == "const" and subject[1][0] == "bnode":
+            return  # [ ... ] seul
+        self._parse_property_list(subject, out)
+
+    def _parse_property_list(self, subject: tuple, out: List[tuple]):
+        while True:
+            predicate = self._parse_verb()
+            while True:
+                obj = self.parse_term_node(allow_blank_property_list=out)
+                out.append((subject, predicate, obj))
+                if self.at_punct(","):
+                    self.next()
+                    continue
+                break
+            if self.at_punct(";"):
+                while self.at_punct(";"):
+                    self.next()
+                if self.at_punct(".", "}", "]") or self.peek()[0] == "eof":
+                    return
+                continue
+            return
+
+    def _parse_verb(self) -> tuple:
+        kind, value = self.peek()
+        if kind == "name" and value == "a":
+            self.next()
+            return ("const", iri(RDF_TYPE))
+        return self.parse_term_node()
+
+    def parse_term_node(self, allow_blank_property_list: List[tuple] = None) -> tuple:
+        """Variable ou terme constant d'un motif de triplet"""
+        kind, value = self.peek()
+        if kind == "var":
+            self.next()
+            self.variables.setdefault(value[1:])
+            return ("var", value[1:])
+        if kind == "punct" and value == "[" and allow_blank_property_list is not None:
+            self.next()
+            node = ("const", bnode(f"b{next(self._bnode_counter)}"))
+            if not self.at_punct("]"):
+                self._parse_property_list(node, allow_blank_property_list)
+            self.expect_punct("]")
+            return node
+        return ("const", self.parse_constant())
+
+    def parse_constant(self) -> Term:
+        kind, value = self.next()
+        if kind == "iri":
+            return iri(value[1:-1])
+        if kind == "pname":
+            return iri(self.expand(value))
+        if kind == "bnode":
+            return bnode(value[2:])
+        if kind == "string":
+            return self._parse_literal_suffix(_string_value(value))
+        if kind == "number":
+            return _number_literal(value)
+        if kind == "punct" and value in "+-" and self.peek()[0] == "number":
+            number = self.next()[1]
+            return _number_literal(number if value == "+" else "-" + number)
+        if kind == "name" and value.lower() in ("true", "false"):
+            return literal(value.lower(), XSD_BOOLEAN)
+        raise SparqlError(f"Terme inattendu: {value!r}")
+
+    def _parse_literal_suffix(self, text: str) -> Term:
+        kind, value = self.peek()
+        if kind == "lang":
+            self.next()
+            return literal(text, lang=value[1:])
+        if kind == "punct" and value == "^^":
+            self.next()
+            datatype = self.parse_constant()
+            if datatype[0] != "uri":
+                raise SparqlError("Datatype invalide")
+            return literal(text, datatype[1])
+        return literal(text)
+
+    def expand(self, pname: str) -> str:
+        prefix, _, local = pname.partition(":")
+        if prefix not in self.prefixes:
+            raise SparqlError(f"Préfixe non déclaré: {prefix}:")
+        return self.prefixes[prefix] + local
+
+    # --- Expressions ----------------------------------------------------
+
+    def parse_bracketted(self) -> tuple:
+        self.expect_punct("(")
+        expr = self.parse_expression()
+        self.expect_punct(")")
+        return expr
+
+    def parse_expression(self) -> tuple:
+        left = self._parse_and()
+        while self.at_punct("||"):
+            self.next()
+            left = ("or", left, self._parse_and())
+        return left
+
+    def _parse_and(self) -> tuple:
+        left = self._parse_relational()
+        while self.at_punct("&&"):
+            self.next()
+            left = ("and", left, self._parse_relational())
+        return left
+
+    def _parse_relational(self) -> tuple:
+        left = self._parse_additive()
+        if self.at_punct("=", "!=", "<", ">", "<=", ">="):
+            op = self.next()[1]
+            return ("cmp", op, left, self._parse_additive())
+        if self.at_keyword("IN") or (self.at_keyword("NOT") and self.peek(1)[1].upper() == "IN"):
+            negated = self.next()[1].upper() == "NOT"
+            if negated:
+                self.next()
+            self.expect_punct("(")
+            options = []
+            while not self.at_punct(")"):
+                options.append(self.parse_expression())
+                if self.at_punct(","):
+                    self.next()
+            self.next()
+            return ("in", negated, left, options)
+        return left
+
+    def _parse_additive(self) -> tuple:
+        left = self._parse_multiplicative()
+        while self.at_punct("+", "-"):
+            op = self.next()[1]
+            left = ("arith", op, left, self._parse_multiplicative())
+        return left
+
+    def _parse_multiplicative(self) -> tuple:
+        left = self._parse_unary()
+        while self.at_punct("*", "/"):
+            op = self.next()[1]
+            left = ("arith", op, left, self._parse_unary())
+        return left
+
+    def _parse_unary(self) -> tuple:
+        if self.at_punct("!"):
+            self.next()
+            return ("not", self._parse_unary())
+        if self.at_punct("-"):
+            self.next()
+            return ("neg", self._parse_unary())
+        if self.at_punct("+"):
+            self.next()
+            return self._parse_unary()
+        return self.parse_primary()
+
+    def parse_primary(self) -> tuple:
+        kind, value = self.peek()
+        if kind == "punct" and value == "(":
+            return self.parse_bracketted()
+        if kind == "var":
+            self.next()
+            return ("var", value[1:])
+        if kind == "name":
+            upper = value.upper()
+            if upper in AGGREGATES:
+                return self._parse_aggregate()
+            if upper == "NOT" and self.peek(1)[1].upper() == "EXISTS":
+                self.next()
+                self.next()
+                return ("not", ("exists", self.parse_group()))
+            if upper == "EXISTS":
+                self.next()
+                return ("exists", self.parse_group())
+            if upper in BUILTINS:
+                self.next()
+                return ("call", upper, self._parse_arguments())
+            if value.lower() in ("true", "false"):
+                self.next()
+                return ("const", literal(value.lower(), XSD_BOOLEAN))
+            raise SparqlError(f"Fonction non supportée: {value}")
+        if kind in ("iri", "pname"):
+            term = self.parse_constant()
+            if self.at_punct("("):
+                # Cast xsd:integer(?x), xsd:string(?x), ...
+                return ("cast", term[1], self._parse_arguments())
+            return ("const", term)
+        return ("const", self.parse_constant())
+
+    def _parse_arguments(self) -> List[tuple]:
+        self.expect_punct("(")
+        args = []
+        while not self.at_punct(")"):
+            args.append(self.parse_expression())
+            if self.at_punct(","):
+                self.next()
+        self.next()
+        return args
+
+    def _parse_aggregate(self) -> tuple:
+        name = self.next()[1].upper()
+        self.expect_punct("(")
+        distinct = False
+        if self.at_keyword("DISTINCT"):
+            self.next()
+            distinct = True
+        if self.at_punct("*"):
+            self.next()
+            expr = None
+        else:
+            expr = self.parse_expression()
+        separator = " "
+        if self.at_punct(";"):
+            self.next()
+            self.expect_keyword("SEPARATOR")
+            self.expect_punct("=")
+            separator = _string_value(self.next()[1])
+        self.expect_punct(")")
+        return ("agg", name, distinct, expr, separator)
+
+    # --- Mises à jour ---------------------------------------------------
+
+    def parse_update(self) -> List[Tuple[str, List[tuple]]]:
+        """INSERT DATA / DELETE DATA, séparées par ';'"""
+        operations = []
+        while True:
+            self.parse_prologue()
+            if self.peek()[0] == "eof":
+                break
+            if self.at_keyword("INSERT", "DELETE"):
+                operation = self.next()[1].upper()
+                self.expect_keyword("DATA")
+                triples: List[tuple] = []
+                self.expect_punct("{")
+                while not self.at_punct("}"):
+                    if self.at_punct("."):
+                        self.next()
+                    elif self.peek()[0] == "eof":
+                        raise SparqlError("'}' manquant")
+                    else:
+                        self.parse_triples(triples)
+                self.next()
+                for triple in triples:
+                    if any(node[0] == "var" for node in triple):
+                        raise SparqlError(f"{operation} DATA n'accepte pas de variables")
+                operations.append((operation, [tuple(node[1] for node in triple) for triple in triples]))
+            else:
+                raise SparqlError(f"Opération de mise à jour non supportée: {self.peek()[1]!r}")
+            if self.at_punct(";"):
+                self.next()
+                continue
+            if self.peek()[0] != "eof":
+                raise SparqlError(f"Jeton inattendu: {self.peek()[1]!r}")
+        return operations
+
+
+def _string_value(token: str) -> str:
+    if token[:3] in ('"""', "'''"):
+        return _unescape(token[3:-3])
+    return _unescape(token[1:-1])
+
+
+def _number_literal(text: str) -> Term:
+    if "e" in text.lower():
+        return literal(text, XSD_DOUBLE)
+    if "." in text:
+        return literal(text, XSD_DECIMAL)
+    return literal(text, XSD_INTEGER)
+
+
+def _contains_aggregate(expr) -> bool:
+    if not isinstance(expr, tuple):
+        return False
+    if expr[0] == "agg":
+        return True
+    return any(
+        _contains_aggregate(child) if isinstance(child, tuple)
+        else isinstance(child, list) and any(_contains_aggregate(c) for c in child)
+        for child in expr[1:]
+    )
+
+
+def parse_query(text: str, default_prefixes: Dict[str, str] = None) -> Query:
+    """Analyse une requête SELECT/ASK"""
+    return Parser(text, default_prefixes).parse_query()
+
+
+def parse_update(text: str, default_prefixes: Dict[str, str] = None) -> List[Tuple[str, List[tuple]]]:
+    """Analyse une requête INSERT DATA / DELETE DATA"""
+    return Parser(text, default_prefixes).parse_update()
+
+# ---------------------------------------------------------------------------
+# Évaluation des expressions
+# ---------------------------------------------------------------------------
+
+
+class _ExprError(Exception):
+    """Erreur de typage SPARQL: le FILTER est évalué à faux"""
+
+
+def _numeric_value(term: Term):
+    if term[0] != "literal" or term[2] not in NUMERIC_TYPES:
+        return None
+    try:
+        if term[2] in (XSD_DECIMAL, XSD_DOUBLE, XSD_NS + "float") or "." in term[1] or "e" in term[1].lower():
+            return float(term[1])
+        return int(term[1])
+    except ValueError:
+        return None
+
+
+def _numeric_literal(value) -> Term:
+    if isinstance(value, bool):
+        return TRUE if value else FALSE
+    if isinstance(value, int):
+        return literal(str(value), XSD_INTEGER)
+    if value == int(value) and abs(value) < 1e15:
+        return literal(repr(float(value)), XSD_DECIMAL)
+    return literal(repr(value), XSD_DOUBLE)
+
+
+def _bool(value: bool) -> Term:
+    return TRUE if value else FALSE
+
+
+def effective_boolean(term: Term) -> bool:
+    """Valeur booléenne effective (EBV) d'un terme"""
+    if term[0] != "literal":
+        raise _ExprError("EBV d'une IRI")
+    if term[2] == XSD_BOOLEAN:
+        return term[1] in ("true", "1")
+    number = _numeric_value(term)
+    if number is not None:
+        return number != 0
+    if term[2] in ("", XSD_NS + "string") or term[2].startswith("@"):
+        return term[1] != ""
+    raise _ExprError("EBV indéfinie")
+
+
+def _string_arg(term: Term) -> str:
+    if term[0] != "literal":
+        raise _ExprError("Littéral attendu")
+    return term[1]
+
+
+def _compare(op: str, left: Term, right: Term) -> bool:
+    left_num, right_num = _numeric_value(left), _numeric_value(right)
+    if left_num is not None and right_num is not None:
+        a, b = left_num, right_num
+    elif op in ("=", "!="):
+        same = left == right
+        return same if op == "=" else not same
+    elif left[0] == "literal" and right[0] == "literal" and left[2] == right[2]:
+        a, b = left[1], right[1]
+    else:
+        raise _ExprError("Comparaison de types incompatibles")
+    if op == "=":
+        return a == b
+    if op == "!=":
+        return a != b
+    if op == "<":
+        return a < b
+    if op == ">":
+        return a > b
+    if op == "<=":
+        return a <= b
+    return a >= b
+
+
+def order_key(term: Optional[Term]) -> tuple:
+    """Clé de tri SPARQL: non lié < nœud anonyme < IRI < littéral (numériques par valeur)"""
+    if term is None:
+        return (0,)
+    if term[0] == "bnode":
+        return (1, term[1])
+    if term[0] == "uri":
+        return (2, term[1])
+    number = _numeric_value(term)
+    if number is not None:
+        return (3, 0, number)
+    return (3, 1, term[1], term[2])
+
+# ---------------------------------------------------------------------------
+# Moteur
+# ---------------------------------------------------------------------------
+
+
+class SparqlEngine:
+    """Évalue des requêtes SPARQL (BGP, OPTIONAL, FILTER, UNION, VALUES, agrégats,
+    ORDER BY, LIMIT/OFFSET) directement sur les index d'un TripleStore"""
+
+    def __init__(self, store: TripleStore, default_prefixes: Dict[str, str] = None):
+        self.store = store
+        self.default_prefixes = default_prefixes or {}
+
+    # --- API publique ---------------------------------------------------
+
+    def query(self, text: str) -> Dict[str, Any]:
+        """Exécute une requête et retourne un résultat application/sparql-results+json"""
+        query = parse_query(text, self.default_prefixes)
+        run = _Execution(self.store)
+        if query.form == "ASK":
+            found = next(run.eval_group(query.where, {}), None) is not None
+            return {"head": {}, "boolean": found}
+        variables, solutions = run.select(query)
+        bindings = []
+        for solution in solutions:
+            binding = {}
+            for name in variables:
+                term_id = solution.get(name)
+                if term_id is not None:
+                    binding[name] = term_to_json(run.term(term_id))
+            bindings.append(binding)
+        return {"head": {"vars": variables}, "results": {"bindings": bindings}}
+
+    def iter_rows(self, text: str) -> Iterator[Dict[str, str]]:
+        """Exécute une requête SELECT et produit les lignes {variable: valeur} à la demande"""
+        query = parse_query(text, self.default_prefixes)
+        if query.form != "SELECT":
+            raise SparqlError("Le streaming n'est supporté que pour SELECT")
+        run = _Execution(self.store)
+        variables, solutions = run.select(query)
+        for solution in solutions:
+            row = {}
+            for name in variables:
+                term_id = solution.get(name)
+                if term_id is not None:
+                    row[name] = run.term(term_id)[1]
+            yield row
+
+    def update(self, text: str) -> int:
+        """Applique INSERT DATA / DELETE DATA; retourne le nombre de triplets modifiés"""
+        changed = 0
+        for operation, triples in parse_update(text, self.default_prefixes):
+            if operation == "INSERT":
+                changed += self.store.add_many(triples)
+            else:
+                changed += sum(1 for triple in triples if self.store.remove(*triple))
+        return changed
+
+
+def term_to_json(term: Term) -> Dict[str, str]:
+    """Encode un terme au format SPARQL JSON"""
+    kind, value, extra = term
+    if kind == "uri":
+        return {"type": "uri", "value": value}
+    if kind == "bnode":
+        return {"type": "bnode", "value": value}
+    if extra.startswith("@"):
+        return {"type": "literal", "value": value, "xml:lang": extra[1:]}
+    if extra:
+        return {"type": "literal", "value": value, "datatype": extra}
+    return {"type": "literal", "value": value}
+
+
+class _Execution:
+    """État d'une exécution: termes calculés (BIND, agrégats) hors du dictionnaire du store"""
+
+    def __init__(self, store: TripleStore):
+        self.store = store
+        self._local_terms: List[Term] = []
+        self._local_ids: Dict[Term, int] = {}
+
+    # --- Termes ---------------------------------------------------------
+
+    def term(self, term_id: int) -> Term:
+        if term_id >= 0:
+            return self.store.terms[term_id]
+        return self._local_terms[-term_id - 1]
+
+    def term_id(self, term: Term) -> int:
+        """Identifiant d'un terme: celui du store s'il existe, sinon un identifiant local négatif"""
+        term_id = self.store.lookup(term)
+        if term_id != MISSING:
+            return term_id
+        term_id = self._local_ids.get(term)
+        if term_id is None:
+            self._local_terms.append(term)
+            term_id = -len(self._local_terms)
+            self._local_ids[term] = term_id
+        return term_id
+
+    # --- SELECT ---------------------------------------------------------
+
+    def select(self, query: Query) -> Tuple[List[str], Iterator[Dict[str, int]]]:
+        solutions = self.eval_group(query.where, {})
+
+        if query.has_aggregates:
+            solutions = iter(self._aggregate(query, solutions))
+        elif query.projection:
+            solutions = self._extend(query.projection, solutions)
+
+        if query.projection is None:
+            variables = query.variables
+        else:
+            variables = [name for name, _ in query.projection]
+
+        # DISTINCT avant la sélection partielle: sinon les doublons occupent les k places
+        if query.distinct:
+            solutions = self._distinct(variables, solutions)
+        if query.order_by:
+            keep = None if query.limit is None else query.offset + query.limit
+            solutions = iter(self._order(query.order_by, solutions, keep))
+        if query.offset or query.limit is not None:
+            stop = None if query.limit is None else query.offset + query.limit
+            solutions = itertools.islice(solutions, query.offset, stop)
+        return variables, solutions
+
+    def _extend(self, projection, solutions):
+        expressions = [(name, expr) for name, expr in projection if expr is not None]
+        for solution in solutions:
+            if expressions:
+                solution = dict(solution)
+                for name, expr in expressions:
+                    try:
+                        solution[name] = self.term_id(self.eval_expr(expr, solution))
+                    except _ExprError:
+                        pass
+            yield solution
+
+    def _distinct(self, variables, solutions):
+        seen = set()
+        for solution in solutions:
+            key = tuple(solution.get(name) for name in variables)
+            if key not in seen:
+                seen.add(key)
+                yield solution
+
+    def _order(self, conditions, solutions, keep: Optional[int]) -> List[Dict[str, int]]:
+        def keys(solution):
+            result = []
+            for expr, _ in conditions:
+                try:
+                    result.append(order_key(self.eval_expr(expr, solution)))
+                except _ExprError:
+                    result.append(order_key(None))
+            return result
+
+        def compare(a, b):
+            for (key_a, key_b, (_, descending)) in zip(a[0], b[0], conditions):
+                if key_a != key_b:
+                    try:
+                        less = key_a < key_b
+                    except TypeError:
+                        less = str(key_a) < str(key_b)
+                    return (1 if less else -1) if descending else (-1 if less else 1)
+            return 0
+
+        decorated = ((keys(solution), index, solution) for index, solution in enumerate(solutions))
+        sort_key = functools.cmp_to_key(lambda a, b: compare(a, b) or (a[1] - b[1]))
+        if keep is not None:
+            # ORDER BY ... LIMIT k: sélection partielle en O(n log k)
+            ordered = heapq.nsmallest(keep, decorated, key=sort_key)
+        else:
+            ordered = sorted(decorated, key=sort_key)
+        return [solution for _, _, solution in ordered]
+
+    def _aggregate(self, query: Query, solutions) -> List[Dict[str, int]]:
+        groups: Dict[tuple, List[Dict[str, int]]] = {}
+        for solution in solutions:
+            key = []
+            for expr in query.group_by:
+                try:
+                    key.append(self.term_id(self.eval_expr(expr, solution)))
+                except _ExprError:
+                    key.append(None)
+            groups.setdefault(tuple(key), []).append(solution)
+        if not groups and not query.group_by:
+            groups[()] = []
+
+        results = []
+        for key, members in groups.items():
+            row = {}
+            for expr, term_id in zip(query.group_by, key):
+                if expr[0] == "var" and term_id is not None:
+                    row[expr[1]] = term_id
+            if not all(self._having_ok(condition, row, members) for condition in query.having):
+                continue
+            for name, expr in query.projection or []:
+                if expr is None:
+                    continue
+                try:
+                    row[name] = self.term_id(self.eval_expr(expr, row, members))
+                except _ExprError:
+                    pass
+            results.append(row)
+        return results
+
+    def _having_ok(self, condition, row, members) -> bool:
+        try:
+            return effective_boolean(self.eval_expr(condition, row, members))
+        except _ExprError:
+            return False
+
+    # --- Motifs ---------------------------------------------------------
+
+    def eval_group(self, group: Group, solution: Dict[str, int]) -> Iterator[Dict[str, int]]:
+        stream = iter((solution,))
+        for element in group.elements:
+            stream = self._apply(element, stream)
+        if not group.filters:
+            return stream
+        return (s for s in stream if all(self._filter_ok(f, s) for f in group.filters))
+
+    def _filter_ok(self, expr, solution) -> bool:
+        try:
+            return effective_boolean(self.eval_expr(expr, solution))
+        except _ExprError:
+            return False
+
+    def _apply(self, element, stream):
+        kind = element[0]
+        if kind == "bgp":
+            patterns = [self._compile_pattern(pattern) for pattern in element[1]]
+            if any(node == ("const", MISSING) for pattern in patterns for node in pattern):
+                return iter(())
+            return (result for solution in stream for result in self._eval_bgp(patterns, solution))
+        if kind == "optional":
+            return self._left_join(element[1], stream)
+        if kind == "group":
+            return (result for solution in stream for result in self.eval_group(element[1], solution))
+        if kind == "union":
+            return (
+                result
+                for solution in stream
+                for branch in element[1]
+                for result in self.eval_group(branch, solution)
+            )
+        if kind == "minus":
+            return self._minus(element[1], stream)
+        if kind == "bind":
+            return self._bind(element[1], element[2], stream)
+        if kind == "values":
+            return self._values(element[1], element[2], stream)
+        raise SparqlError(f"Élément non supporté: {kind}")
+
+    def _compile_pattern(self, pattern):
+        compiled = []
+        for node in pattern:
+            if node[0] == "var":
+                compiled.append(node)
+            else:
+                compiled.append(("const", self.store.lookup(node[1])))
+        return tuple(compiled)
+
+    def _eval_bgp(self, patterns, solution) -> Iterator[Dict[str, int]]:
+        if not patterns:
+            yield solution
+            return
+        store = self.store
+        # Jointure par boucles imbriquées: on résout d'abord le motif le plus sélectif
+        best_index = 0
+        best_bound = None
+        best_cost = None
+        for index, pattern in enumerate(patterns):
+            bound = [node[1] if node[0] == "const" else solution.get(node[1]) for node in pattern]
+            cost = store.estimate(*bound)
+            if best_cost is None or cost < best_cost:
+                best_index, best_bound, best_cost = index, bound, cost
+                if cost == 0:
+                    return
+        pattern = patterns[best_index]
+        rest = patterns[:best_index] + patterns[best_index + 1:]
+        free = [(position, node[1]) for position, node in enumerate(pattern)
+                if node[0] == "var" and best_bound[position] is None]
+        if any(term_id is not None and term_id < 0 for term_id in best_bound):
+            # Variable liée à un terme calculé (BIND/VALUES) absent du store
+            return
+        for triple in store.match_ids(*best_bound):
+            extended = dict(solution)
+            consistent = True
+            for position, name in free:
+                value = triple[position]
+                previous = extended.get(name)
+                if previous is None:
+                    extended[name] = value
+                elif previous != value:
+                    consistent = False
+                    break
+            if consistent:
+                yield from self._eval_bgp(rest, extended)
+
+    def _left_join(self, group: Group, stream):
+        for solution in stream:
+            matched = False
+            for result in self.eval_group(group, solution):
+                matched = True
+                yield result
+            if not matched:
+                yield solution
+
+    def _minus(self, group: Group, stream):
+        excluded = list(self.eval_group(group, {}))
+        for solution in stream:
+            removed = False
+            for other in excluded:
+                shared = [name for name in other if name in solution]
+                if shared and all(solution[name] == other[name] for name in shared):
+                    removed = True
+                    break
+            if not removed:
+                yield solution
+
+    def _bind(self, name, expr, stream):
+        for solution in stream:
+            try:
+                value = self.term_id(self.eval_expr(expr, solution))
+            except _ExprError:
+                yield solution
+                continue
+            extended = dict(solution)
+            extended[name] = value
+            yield extended
+
+    def _values(self, names, rows, stream):
+        encoded = [[None if term is None else self.term_id(term) for term in row] for row in rows]
+        for solution in stream:
+            for row in encoded:
+                extended = dict(solution)
+                compatible = True
+                for name, value in zip(names, row):
+                    if value is None:
+                        continue
+                    previous = extended.get(name)
+                    if previous is None:
+                        extended[name] = value
+                    elif previous != value:
+                        compatible = False
+                        break
+                if compatible:
+                    yield extended
+
+    # --- Expressions ----------------------------------------------------
+
+    def eval_expr(self, expr, solution: Dict[str, int], group: List[Dict[str, int]] = None) -> Term:
+        kind = expr[0]
+        if kind == "var":
+            term_id = solution.get(expr[1])
+            if term_id is None:
+                raise _ExprError(f"?{expr[1]} non liée")
+            return self.term(term_id)
+        if kind == "const":
+            return expr[1]
+        if kind == "and":
+            # Logique ternaire SPARQL: une erreur et un faux donnent faux
+            try:
+                left = effective_boolean(self.eval_expr(expr[1], solution, group))
+            except _ExprError:
+                if not effective_boolean(self.eval_expr(expr[2], solution, group)):
+                    return FALSE
+                raise
+            if not left:
+                return FALSE
+            return _bool(effective_boolean(self.eval_expr(expr[2], solution, group)))
+        if kind == "or":
+            try:
+                left = effective_boolean(self.eval_expr(expr[1], solution, group))
+            except _ExprError:
+                if effective_boolean(self.eval_expr(expr[2], solution, group)):
+                    return TRUE
+                raise
+            if left:
+                return TRUE
+            return _bool(effective_boolean(self.eval_expr(expr[2], solution, group)))
+        if kind == "not":
+            return _bool(not effective_boolean(self.eval_expr(expr[1], solution, group)))
+        if kind == "cmp":
+            left = self.eval_expr(expr[2], solution, group)
+            right = self.eval_expr(expr[3], solution, group)
+            return _bool(_compare(expr[1], left, right))
+        if kind == "in":
+            left = self.eval_expr(expr[2], solution, group)
+            found = False
+            for option in expr[3]:
+                try:
+                    if _compare("=", left, self.eval_expr(option, solution, group)):
+                        found = True
+                        break
+                except _ExprError:
+                    continue
+            return _bool(found != expr[1])
+        if kind == "arith":
+            left = _numeric_value(self.eval_expr(expr[2], solution, group))
+            right = _numeric_value(self.eval_expr(expr[3], solution, group))
+            if left is None or right is None:
+                raise _ExprError("Opérande non numérique")
+            op = expr[1]
+            if op == "+":
+                return _numeric_literal(left + right)
+            if op == "-":
+                return _numeric_literal(left - right)
+            if op == "*":
+                return _numeric_literal(left * right)
+            if right == 0:
+                raise _ExprError("Division par zéro")
+            return _numeric_literal(left / right)
+        if kind == "neg":
+            value = _numeric_value(self.eval_expr(expr[1], solution, group))
+            if value is None:
+                raise _ExprError("Opérande non numérique")
+            return _numeric_literal(-value)
+        if kind == "exists":
+            return _bool(next(self.eval_group(expr[1], solution), None) is not None)
+        if kind == "call":
+            return self._call(expr[1], expr[2], solution, group)
+        if kind == "cast":
+            return self._cast(expr[1], self.eval_expr(expr[2][0], solution, group))
+        if kind == "agg":
+            if group is None:
+                raise _ExprError("Agrégat hors groupe")
+            return self._eval_aggregate(expr, group)
+        raise _ExprError(f"Expression inconnue: {kind}")
+
+    def _call(self, name: str, args: List[tuple], solution, group) -> Term:
+        if name == "BOUND":
+            return _bool(args[0][0] == "var" and solution.get(args[0][1]) is not None)
+        if name == "COALESCE":
+            for arg in args:
+                try:
+                    return self.eval_expr(arg, solution, group)
+                except _ExprError:
+                    continue
+            raise _ExprError("COALESCE sans valeur")
+        if name == "IF":
+            condition = effective_boolean(self.eval_expr(args[0], solution, group))
+            return self.eval_expr(args[1] if condition else args[2], solution, group)
+
+        values = [self.eval_expr(arg, solution, group) for arg in args]
+        first = values[0] if values else None
+        if name == "STR":
+            if first[0] == "bnode":
+                raise _ExprError("STR d'un nœud anonyme")
+            return literal(first[1])
+        if name == "LANG":
+            return literal(first[2][1:] if first[2].startswith("@") else "")
+        if name == "DATATYPE":
+            if first[0] != "literal":
+                raise _ExprError("DATATYPE d'une IRI")
+            return iri(first[2] if first[2] and not first[2].startswith("@") else XSD_NS + "string")
+        if name in ("IRI", "URI"):
+            return iri(first[1])
+        if name in ("ISIRI", "ISURI"):
+            return _bool(first[0] == "uri")
+        if name == "ISBLANK":
+            return _bool(first[0] == "bnode")
+        if name == "ISLITERAL":
+            return _bool(first[0] == "literal")
+        if name == "ISNUMERIC":
+            return _bool(_numeric_value(first) is not None)
+        if name == "SAMETERM":
+            return _bool(values[0] == values[1])
+        if name == "LANGMATCHES":
+            tag, pattern = _string_arg(values[0]).lower(), _string_arg(values[1]).lower()
+            return _bool(tag != "" if pattern == "*" else tag == pattern or tag.startswith(pattern + "-"))
+        if name == "REGEX":
+            flags = re.IGNORECASE if len(values) > 2 and "i" in _string_arg(values[2]) else 0
+            try:
+                return _bool(re.search(_string_arg(values[1]), _string_arg(first), flags) is not None)
+            except re.error:
+                raise _ExprError("Expression régulière invalide")
+        if name == "REPLACE":
+            flags = re.IGNORECASE if len(values) > 3 and "i" in _string_arg(values[3]) else 0
+            replacement = re.sub(r"\$(\d)", r"\\\1", _string_arg(values[2]))
+            return literal(re.sub(_string_arg(values[1]), replacement, _string_arg(first), flags=flags))
+        if name == "CONTAINS":
+            return _bool(_string_arg(values[1]) in _string_arg(first))
+        if name == "STRSTARTS":
+            return _bool(_string_arg(first).startswith(_string_arg(values[1])))
+        if name == "STRENDS":
+            return _bool(_string_arg(first).endswith(_string_arg(values[1])))
+        if name == "LCASE":
+            return (first[0], _string_arg(first).lower(), first[2])
+        if name == "UCASE":
+            return (first[0], _string_arg(first).upper(), first[2])
+        if name == "STRLEN":
+            return literal(str(len(_string_arg(first))), XSD_INTEGER)
+        if name == "SUBSTR":
+            text = _string_arg(first)
+            start = int(_numeric_value(values[1]) or 1) - 1
+            if len(values) > 2:
+                return literal(text[start:start + int(_numeric_value(values[2]) or 0)])
+            return literal(text[start:])
+        if name == "STRAFTER":
+            text, marker = _string_arg(first), _string_arg(values[1])
+            index = text.find(marker)
+            return literal("" if index < 0 else text[index + len(marker):])
+        if name == "STRBEFORE":
+            text, marker = _string_arg(first), _string_arg(values[1])
+            index = text.find(marker)
+            return literal("" if index < 0 else text[:index])
+        if name == "CONCAT":
+            return literal("".join(_string_arg(value) for value in values))
+        if name in ("ABS", "ROUND", "CEIL", "FLOOR"):
+            number = _numeric_value(first)
+            if number is None:
+                raise _ExprError("Opérande non numérique")
+            import math
+            function = {"ABS": abs, "ROUND": round, "CEIL": math.ceil, "FLOOR": math.floor}[name]
+            return _numeric_literal(function(number))
+        raise _ExprError(f"Fonction non supportée: {name}")
+
+    def _cast(self, datatype: str, value: Term) -> Term:
+        text = value[1]
+        try:
+            if datatype in (XSD_INTEGER, XSD_NS + "int"):
+                return literal(str(int(float(text))), XSD_INTEGER)
+            if datatype in (XSD_DECIMAL, XSD_DOUBLE, XSD_NS + "float"):
+                return literal(repr(float(text)), datatype)
+        except ValueError:
+            raise _ExprError(f"Conversion impossible vers {datatype}")
+        if datatype == XSD_NS + "string":
+            return literal(text)
+        if datatype == XSD_BOOLEAN:
+            return _bool(text in ("true", "1"))
+        return literal(text, datatype)
+
+    def _eval_aggregate(self, expr, group: List[Dict[str, int]]) -> Term:
+        _, name, distinct, argument, separator = expr
+        if argument is None:
+            if name != "COUNT":
+                raise _ExprError(f"{name}(*) invalide")
+            if distinct:
+                return literal(str(len({tuple(sorted(s.items())) for s in group})), XSD_INTEGER)
+            return literal(str(len(group)), XSD_INTEGER)
+
+        values = []
+        for solution in group:
+            try:
+                values.append(self.eval_expr(argument, solution))
+            except _ExprError:
+                continue
+        if distinct:
+            values = list(dict.fromkeys(values))
+
+        if name == "COUNT":
+            return literal(str(len(values)), XSD_INTEGER)
+        if name == "SAMPLE":
+            if not values:
+                raise _ExprError("SAMPLE vide")
+            return values[0]
+        if name == "GROUP_CONCAT":
+            return literal(separator.join(value[1] for value in values))
+        if name in ("MIN", "MAX"):
+            if not values:
+                raise _ExprError(f"{name} vide")
+            chooser = min if name == "MIN" else max
+            return chooser(values, key=order_key)
+        numbers = [_numeric_value(value) for value in values]
+        if any(number is None for number in numbers):
+            raise _ExprError(f"{name} sur des valeurs non numériques")
+        if name == "SUM":
+            return _numeric_literal(sum(numbers)) if numbers else literal("0", XSD_INTEGER)
+        if not numbers:
+            return literal("0", XSD_INTEGER)
+        return _numeric_literal(sum(numbers) / len(numbers))
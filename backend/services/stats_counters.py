@@ -0,0 +1,133 @@
+# Materialised Statistics (/stats)
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Iterable, Optional
+from config import STATS_RECONCILE_SECONDS
+from .triple_store import Triple, RDF_TYPE
+from .class_hierarchy import ClassHierarchy, get_class_hierarchy
+
+# Compteur -> classe comptée (avec ses sous-classes)
+STATS_CLASSES = {
+    "totalVoyageurs": "Voyageur",
+    "totalDestinations": "Destination",
+    "totalHebergements": "Hebergement",
+    "totalActivites": "ActiviteTouristique",
+}
+
+
+class StatsCounters:
+    """Compteurs de ressources par classe, lus en O(1)
+
+    `observe()` les incrémente avec les triplets écrits par le backend
+    (sujets distincts ayant reçu un rdf:type de la classe ou d'une
+    sous-classe). Un sujet déjà présent peut ainsi être compté deux fois: la
+    réconciliation (un COUNT par classe, en parallèle) remet les compteurs
+    à jour, au premier accès puis au plus tard toutes les `reconcile_interval`
+    secondes, en arrière-plan. `revision` change avec les compteurs (écriture
+    observée ou recomptage qui les corrige): elle entre dans l'ETag de /stats.
+    """
+
+    def __init__(self, client, hierarchy: ClassHierarchy = None, classes: Dict[str, str] = None, reconcile_interval: float = STATS_RECONCILE_SECONDS):
+        self.client = client
+        self.hierarchy = hierarchy if hierarchy is not None else get_class_hierarchy()
+        self.classes = classes if classes is not None else STATS_CLASSES
+        self.reconcile_interval = reconcile_interval
+        self._class_counters: Dict[str, list] = {}
+        for name, class_name in self.classes.items():
+            for class_iri in self.hierarchy.subclasses(class_name):
+                self._class_counters.setdefault(class_iri, []).append(name)
+        self._queries = {
+            name: f"""PREFIX eco: <{self.hierarchy.namespace}>
+SELECT (COUNT(DISTINCT ?resource) AS ?total)
+WHERE {{
+  {self.hierarchy.type_pattern("resource", class_name)}
+}}"""
+            for name, class_name in self.classes.items()
+        }
+        self._counters: Dict[str, int] = {}
+        self.revision = 0
+        self._lock = threading.Lock()
+        self._reconciling = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=len(self.classes) + 1, thread_name_prefix="stats")
+        self._reconciled_at: Optional[float] = None
+        self._reconciled_on: Optional[str] = None
+        # Écritures observées pendant une réconciliation: la suivante est avancée
+        self._dirty = False
+        self.stats_counters = {"observed": 0, "reconciliations": 0, "drift": 0, "errors": 0}
+
+    def observe(self, triples: Iterable[Triple]):
+        """Met à jour les compteurs après une écriture"""
+        subjects: Dict[str, set] = {}
+        rdf_type = RDF_TYPE
+        for s, p, o in triples:
+            if p[1] == rdf_type:
+                for name in self._class_counters.get(o[1], ()):
+                    subjects.setdefault(name, set()).add(s)
+        if not subjects:
+            return
+        with self._lock:
+            for name, added in subjects.items():
+                self._counters[name] = self._counters.get(name, 0) + len(added)
+            self.revision += 1
+            self.stats_counters["observed"] += sum(len(added) for added in subjects.values())
+            self._dirty = True
+
+    def reconcile(self) -> Dict[str, int]:
+        """Recompte chaque classe (requêtes COUNT parallèles) et remplace les compteurs"""
+        with self._reconciling:
+            with self._lock:
+                self._dirty = False
+            futures = {name: self._executor.submit(self._count, query) for name, query in self._queries.items()}
+            try:
+                counts = {name: future.result() for name, future in futures.items()}
+            except Exception as e:
+                with self._lock:
+                    self.stats_counters["errors"] += 1
+                    # Nouvel essai après un intervalle (ou à la prochaine lecture si jamais réconcilié)
+                    if self._reconciled_at is not None:
+                        self._reconciled_at = time.monotonic()
+                print(f"Error reconciling stats: {e}")
+                return self.counts()
+            with self._lock:
+                if self._reconciled_on is not None:
+                    self.stats_counters["drift"] += sum(abs(counts[name] - self._counters.get(name, 0)) for name in counts)
+                self.stats_counters["reconciliations"] += 1
+                if counts != self._counters:
+                    self.revision += 1
+                self._counters = counts
+                # Une écriture observée pendant les COUNT peut manquer au résultat
+                self._reconciled_at = 0.0 if self._dirty else time.monotonic()
+                self._reconciled_on = datetime.now().isoformat()
+            return dict(counts)
+
+    def _count(self, query: str) -> int:
+        rows = self.client.parse_results(self.client.query(query))
+        return int(float(rows[0]["total"])) if rows and rows[0].get("total") else 0
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {name: self._counters.get(name, 0) for name in self.classes}
+
+    def snapshot(self) -> Dict[str, str]:
+        """Compteurs courants (valeurs textuelles, comme une ligne de résultat SPARQL)
+
+        Le premier appel attend la réconciliation initiale; ensuite, une
+        réconciliation périmée est relancée en arrière-plan sans attendre.
+        """
+        with self._lock:
+            reconciled_at = self._reconciled_at
+        if reconciled_at is None:
+            self.reconcile()
+        elif time.monotonic() - reconciled_at >= self.reconcile_interval and not self._reconciling.locked():
+            self._executor.submit(self.reconcile)
+        return {name: str(value) for name, value in self.counts().items()}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                self.stats_counters,
+                reconciled_at=self._reconciled_on,
+                reconcile_interval_seconds=self.reconcile_interval,
+            )
@@ -0,0 +1,113 @@
+# NL -> SPARQL Translation Cache
+import os
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from config import TRANSLATION_CACHE_MAX_ENTRIES, TRANSLATION_CACHE_FILE
+from .gazetteer import normalize
+
+# Seules les traductions coûteuses (appel LLM) sont persistées: celles par
+# motifs dépendent du code et du gazetteer courant et se recalculent vite
+PERSISTED_BACKENDS = ("gemini",)
+
+
+def normalize_question(question: str) -> str:
+    """Clé de cache: minuscules, sans accents, ponctuation et espaces réduits à un espace
+
+    Le gazetteer et la classification travaillent sur ce même texte: deux
+    questions de même clé donnent toujours la même traduction.
+    """
+    return normalize(question)
+
+
+class TranslationCache:
+    """Cache LRU borné des traductions question -> SPARQL, avec compteurs par backend"""
+
+    def __init__(self, max_entries: int = TRANSLATION_CACHE_MAX_ENTRIES, path: Optional[str] = TRANSLATION_CACHE_FILE):
+        self.max_entries = max_entries
+        self.path = path or None
+        self._entries: "OrderedDict[tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self._counters: Dict[str, Dict[str, int]] = {}
+        if self.path:
+            self.load()
+
+    def _counter(self, backend: str) -> Dict[str, int]:
+        counter = self._counters.get(backend)
+        if counter is None:
+            counter = self._counters[backend] = {"hits": 0, "misses": 0}
+        return counter
+
+    def get(self, question: str, backend: str, context: Any = None) -> Optional[str]:
+        """Traduction en cache pour ce backend (et ce contexte, ex. version du gazetteer)"""
+        key = (backend, context, normalize_question(question))
+        with self._lock:
+            sparql_query = self._entries.get(key)
+            counter = self._counter(backend)
+            if sparql_query is None:
+                counter["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            counter["hits"] += 1
+            return sparql_query
+
+    def set(self, question: str, backend: str, sparql_query: str, context: Any = None):
+        key = (backend, context, normalize_question(question))
+        with self._lock:
+            self._entries[key] = sparql_query
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            backends = {}
+            for backend, counter in self._counters.items():
+                lookups = counter["hits"] + counter["misses"]
+                backends[backend] = dict(counter, hit_rate=round(counter["hits"] / lookups, 4) if lookups else 0.0)
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "evictions": self.evictions,
+                "backends": backends,
+            }
+
+    # --- Persistance --------------------------------------------------------
+
+    def load(self):
+        """Recharge les traductions persistées (fichier absent ou illisible: cache vide)"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as source:
+                entries = json.load(source)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for entry in entries[-self.max_entries:]:
+                if entry.get("backend") in PERSISTED_BACKENDS:
+                    self._entries[(entry["backend"], None, entry["question"])] = entry["sparql"]
+
+    def save(self):
+        """Écrit les traductions persistables (écriture atomique)"""
+        if not self.path:
+            return
+        with self._lock:
+            entries = [
+                {"backend": backend, "question": question, "sparql": sparql_query}
+                for (backend, context, question), sparql_query in self._entries.items()
+                if backend in PERSISTED_BACKENDS and context is None
+            ]
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as out:
+                json.dump(entries, out, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️  Cache de traductions non sauvegardé: {e}")
@@ -0,0 +1,340 @@
+# In-Memory Triple Store
+import re
+from typing import Dict, List, Tuple, Iterable, Iterator, Optional, Callable
+
+RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+RDFS_NS = "http://www.w3.org/2000/01/rdf-schema#"
+XSD_NS = "http://www.w3.org/2001/XMLSchema#"
+OWL_NS = "http://www.w3.org/2002/07/owl#"
+
+RDF_TYPE = RDF_NS + "type"
+XSD_STRING = XSD_NS + "string"
+
+# Un terme RDF est un tuple (kind, value, extra):
+#   ("uri", iri, "")
+#   ("literal", lexical, datatype_iri | "@lang" | "")
+#   ("bnode", label, "")
+Term = Tuple[str, str, str]
+Triple = Tuple[Term, Term, Term]
+
+# Caractères interdits dans une IRI entre chevrons (IRIREF de SPARQL 1.1)
+_IRI_FORBIDDEN = re.compile(r'[<>"{}|^`\\\x00-\x20]')
+_BNODE_LABEL = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_.-]*$")
+_LANG_TAG = re.compile(r"^@[A-Za-z]+(-[A-Za-z0-9]+)*$")
+
+MISSING = -1  # identifiant d'un terme constant absent du dictionnaire
+
+
+def iri(value: str) -> Term:
+    """Construit un terme IRI"""
+    return ("uri", value, "")
+
+
+def literal(value, datatype: str = None, lang: str = None) -> Term:
+    """Construit un terme littéral (typé ou avec langue)"""
+    if lang:
+        return ("literal", str(value), "@" + lang.lower())
+    if datatype and datatype != XSD_STRING:
+        return ("literal", str(value), datatype)
+    return ("literal", str(value), "")
+
+
+def bnode(label: str) -> Term:
+    """Construit un nœud anonyme"""
+    return ("bnode", label, "")
+
+
+def escape_string(value: str) -> str:
+    """Échappe une chaîne pour un littéral entre guillemets (SPARQL, N-Triples)"""
+    return (
+        str(value).replace("\\", "\\\\").replace('"', '\\"')
+        .replace("\n", "\\n").replace("\r", "\\r").replace("\t", "\\t")
+    )
+
+
+def check_iri(value: str) -> str:
+    """L'IRI elle-même si elle peut être écrite entre chevrons, sinon ValueError"""
+    if not value or _IRI_FORBIDDEN.search(value):
+        raise ValueError(f"IRI invalide: {value!r}")
+    return value
+
+
+def term_to_sparql(term: Term) -> str:
+    """Terme en syntaxe SPARQL/N-Triples (IRI complètes, sans préfixe); ValueError si non représentable"""
+    kind, value, extra = term
+    if kind == "uri":
+        return f"<{check_iri(value)}>"
+    if kind == "bnode":
+        if not _BNODE_LABEL.match(value):
+            raise ValueError(f"Nœud anonyme invalide: {value!r}")
+        return f"_:{value}"
+    if extra.startswith("@"):
+        if not _LANG_TAG.match(extra):
+            raise ValueError(f"Langue invalide: {extra!r}")
+        return f'"{escape_string(value)}"{extra}'
+    return f'"{escape_string(value)}"^^<{check_iri(extra)}>' if extra else f'"{escape_string(value)}"'
+
+
+def triples_to_sparql(triples: Iterable[Triple]) -> str:
+    """Bloc de données pour INSERT DATA: une ligne `s p o .` par triplet"""
+    return "\n".join(" ".join(term_to_sparql(term) for term in triple) + " ." for triple in triples)
+
+
+def _index_add(index: Dict, a: int, b: int, c: int) -> bool:
+    """Ajoute (a, b, c) à un index à deux niveaux
+
+    Les feuilles contenant une seule valeur sont stockées comme un entier nu
+    et ne deviennent un set qu'à la deuxième valeur: la plupart des couples
+    (sujet, prédicat) n'ont qu'un objet.
+    """
+    level = index.get(a)
+    if level is None:
+        index[a] = {b: c}
+        return True
+    leaf = level.get(b)
+    if leaf is None:
+        level[b] = c
+        return True
+    if type(leaf) is set:
+        if c in leaf:
+            return False
+        leaf.add(c)
+        return True
+    if leaf == c:
+        return False
+    level[b] = {leaf, c}
+    return True
+
+
+def _index_remove(index: Dict, a: int, b: int, c: int):
+    """Retire (a, b, c) d'un index à deux niveaux"""
+    level = index[a]
+    leaf = level[b]
+    if type(leaf) is set:
+        leaf.discard(c)
+        if len(leaf) == 1:
+            level[b] = next(iter(leaf))
+    else:
+        del level[b]
+        if not level:
+            del index[a]
+
+
+def _leaf_values(leaf) -> Iterable[int]:
+    return leaf if type(leaf) is set else (leaf,)
+
+
+def _leaf_contains(leaf, value: int) -> bool:
+    return value in leaf if type(leaf) is set else leaf == value
+
+
+def _leaf_size(leaf) -> int:
+    return len(leaf) if type(leaf) is set else 1
+
+
+class TripleStore:
+    """Triple store en mémoire, termes encodés en entiers et indexés SPO/POS/OSP"""
+
+    def __init__(self):
+        self.terms: List[Term] = []
+        self._term_ids: Dict[Term, int] = {}
+        self.spo: Dict[int, Dict[int, object]] = {}
+        self.pos: Dict[int, Dict[int, object]] = {}
+        self.osp: Dict[int, Dict[int, object]] = {}
+        self.size = 0
+        self._predicate_counts: Dict[int, int] = {}
+        self._listeners: List[Callable[[List[Triple]], None]] = []
+
+    def __len__(self) -> int:
+        return self.size
+
+    # --- Dictionnaire de termes -------------------------------------------
+
+    def encode(self, term: Term) -> int:
+        """Retourne l'identifiant d'un terme, en l'ajoutant au dictionnaire si besoin"""
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = len(self.terms)
+            self.terms.append(term)
+            self._term_ids[term] = term_id
+        return term_id
+
+    def lookup(self, term: Term) -> int:
+        """Identifiant d'un terme, ou MISSING s'il n'apparaît pas dans le store"""
+        return self._term_ids.get(term, MISSING)
+
+    def decode(self, term_id: int) -> Term:
+        return self.terms[term_id]
+
+    # --- Écriture -------------------------------------------------------
+
+    def add_ids(self, s: int, p: int, o: int) -> bool:
+        """Ajoute un triplet déjà encodé; retourne False s'il existait"""
+        if not _index_add(self.spo, s, p, o):
+            return False
+        _index_add(self.pos, p, o, s)
+        _index_add(self.osp, o, s, p)
+        self._predicate_counts[p] = self._predicate_counts.get(p, 0) + 1
+        self.size += 1
+        return True
+
+    def add(self, s: Term, p: Term, o: Term) -> bool:
+        """Ajoute un triplet"""
+        added = self.add_ids(self.encode(s), self.encode(p), self.encode(o))
+        if added and self._listeners:
+            self._notify([(s, p, o)])
+        return added
+
+    def add_many(self, triples: Iterable[Triple]) -> int:
+        """Ajoute plusieurs triplets et notifie les écouteurs une seule fois"""
+        added = []
+        encode = self.encode
+        for s, p, o in triples:
+            if self.add_ids(encode(s), encode(p), encode(o)):
+                added.append((s, p, o))
+        if added and self._listeners:
+            self._notify(added)
+        return len(added)
+
+    def add_many_ids(self, triples: Iterable[Tuple[int, int, int]]) -> int:
+        """Ajoute des triplets déjà encodés (chargement en masse) et notifie les écouteurs une seule fois"""
+        add_ids = self.add_ids
+        added = [triple for triple in triples if add_ids(*triple)]
+        if added and self._listeners:
+            terms = self.terms
+            self._notify([(terms[s], terms[p], terms[o]) for s, p, o in added])
+        return len(added)
+
+    def remove(self, s: Term, p: Term, o: Term) -> bool:
+        """Retire un triplet"""
+        s_id, p_id, o_id = self.lookup(s), self.lookup(p), self.lookup(o)
+        if MISSING in (s_id, p_id, o_id) or not self.contains_ids(s_id, p_id, o_id):
+            return False
+        _index_remove(self.spo, s_id, p_id, o_id)
+        _index_remove(self.pos, p_id, o_id, s_id)
+        _index_remove(self.osp, o_id, s_id, p_id)
+        self._predicate_counts[p_id] -= 1
+        self.size -= 1
+        return True
+
+    def add_listener(self, callback: Callable[[List[Triple]], None]):
+        """Enregistre une fonction appelée avec les triplets nouvellement ajoutés"""
+        self._listeners.append(callback)
+
+    def _notify(self, triples: List[Triple]):
+        for callback in self._listeners:
+            callback(triples)
+
+    # --- Lecture --------------------------------------------------------
+
+    def contains_ids(self, s: int, p: int, o: int) -> bool:
+        level = self.spo.get(s)
+        if level is None:
+            return False
+        leaf = level.get(p)
+        return leaf is not None and _leaf_contains(leaf, o)
+
+    def match_ids(self, s: Optional[int] = None, p: Optional[int] = None, o: Optional[int] = None) -> Iterator[Tuple[int, int, int]]:
+        """Itère sur les triplets (encodés) correspondant au motif, None = joker
+
+        L'index est choisi selon les positions liées: SPO pour s, s+p, s+p+o;
+        POS pour p, p+o; OSP pour o, o+s.
+        """
+        if MISSING in (s, p, o):
+            return
+        if s is not None:
+            level = self.spo.get(s)
+            if level is None:
+                return
+            if p is not None:
+                leaf = level.get(p)
+                if leaf is None:
+                    return
+                if o is not None:
+                    if _leaf_contains(leaf, o):
+                        yield (s, p, o)
+                    return
+                for obj in _leaf_values(leaf):
+                    yield (s, p, obj)
+                return
+            if o is not None:
+                leaf = self.osp.get(o, {}).get(s)
+                if leaf is not None:
+                    for pred in _leaf_values(leaf):
+                        yield (s, pred, o)
+                return
+            for pred, leaf in level.items():
+                for obj in _leaf_values(leaf):
+                    yield (s, pred, obj)
+            return
+        if p is not None:
+            level = self.pos.get(p)
+            if level is None:
+                return
+            if o is not None:
+                leaf = level.get(o)
+                if leaf is not None:
+                    for subj in _leaf_values(leaf):
+                        yield (subj, p, o)
+                return
+            for obj, leaf in level.items():
+                for subj in _leaf_values(leaf):
+                    yield (subj, p, obj)
+            return
+        if o is not None:
+            level = self.osp.get(o)
+            if level is None:
+                return
+            for subj, leaf in level.items():
+                for pred in _leaf_values(leaf):
+                    yield (subj, pred, o)
+            return
+        for subj, level in self.spo.items():
+            for pred, leaf in level.items():
+                for obj in _leaf_values(leaf):
+                    yield (subj, pred, obj)
+
+    def estimate(self, s: Optional[int] = None, p: Optional[int] = None, o: Optional[int] = None) -> int:
+        """Estimation grossière du nombre de triplets correspondant au motif (sert à ordonner les jointures)"""
+        if MISSING in (s, p, o):
+            return 0
+        if s is not None:
+            level = self.spo.get(s)
+            if level is None:
+                return 0
+            if p is not None:
+                leaf = level.get(p)
+                return 0 if leaf is None else (1 if o is not None else _leaf_size(leaf))
+            if o is not None:
+                leaf = self.osp.get(o, {}).get(s)
+                return 0 if leaf is None else _leaf_size(leaf)
+            return len(level) * 2
+        if p is not None:
+            level = self.pos.get(p)
+            if level is None:
+                return 0
+            if o is not None:
+                leaf = level.get(o)
+                return 0 if leaf is None else _leaf_size(leaf)
+            return self._predicate_counts.get(p, 0)
+        if o is not None:
+            level = self.osp.get(o)
+            return 0 if level is None else len(level) * 2
+        return self.size
+
+    def triples(self, s: Term = None, p: Term = None, o: Term = None) -> Iterator[Triple]:
+        """Itère sur les triplets (décodés) correspondant au motif"""
+        ids = [None if term is None else self.lookup(term) for term in (s, p, o)]
+        terms = self.terms
+        for s_id, p_id, o_id in self.match_ids(*ids):
+            yield (terms[s_id], terms[p_id], terms[o_id])
+
+    def objects(self, s: Term, p: Term) -> Iterator[Term]:
+        """Objets de (s, p, ?)"""
+        for _, _, o in self.triples(s, p, None):
+            yield o
+
+    def subjects(self, p: Term, o: Term) -> Iterator[Term]:
+        """Sujets de (?, p, o)"""
+        for s, _, _ in self.triples(None, p, o):
+            yield s
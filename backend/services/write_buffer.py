@@ -0,0 +1,322 @@
+# Write-Behind Buffer (avis, signalements)
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple
+from config import (
+    ONTOLOGY_NS,
+    WRITE_JOURNAL_FILE,
+    WRITE_BATCH_SIZE,
+    WRITE_FLUSH_INTERVAL_MS,
+    WRITE_MAX_PENDING,
+    WRITE_MAX_RETRIES,
+    WRITE_RETRY_BACKOFF_MS,
+    WRITE_JOURNAL_FSYNC,
+)
+from .triple_store import RDF_NS, XSD_NS
+
+
+class BufferFull(Exception):
+    """File d'écriture pleine: le client doit réessayer plus tard"""
+
+
+class WriteBehindBuffer:
+    """Écritures différées vers Fuseki, journalisées localement avant acquittement
+
+    `submit()` ajoute l'enregistrement (triplets SPARQL de la forme
+    `eco:x rdf:type eco:Avis ; ... .`) au journal NDJSON puis à la file, et
+    rend la main. Un thread regroupe la file en une seule mise à jour
+    `INSERT DATA` dès `max_batch` enregistrements ou après `flush_interval`.
+    Un lot en échec est retenté (attente exponentielle) puis remis en tête de
+    file et coupé en deux au prochain envoi, jusqu'à isoler l'enregistrement
+    fautif. Celui-ci est mis de côté pendant l'envoi des suivants: s'ils
+    passent, Fuseki est disponible et l'enregistrement part dans le journal
+    des rejets (`dead_letter_path`); sinon c'est une panne et il reprend sa
+    place. Rejouer un INSERT DATA est sans effet de bord. Au redémarrage, les
+    enregistrements du journal non confirmés sont rejoués.
+    """
+
+    def __init__(
+        self,
+        client,
+        journal_path: Optional[str] = WRITE_JOURNAL_FILE,
+        max_batch: int = WRITE_BATCH_SIZE,
+        flush_interval: float = WRITE_FLUSH_INTERVAL_MS / 1000,
+        max_pending: int = WRITE_MAX_PENDING,
+        max_retries: int = WRITE_MAX_RETRIES,
+        retry_backoff: float = WRITE_RETRY_BACKOFF_MS / 1000,
+        fsync: bool = WRITE_JOURNAL_FSYNC,
+        prefixes: Dict[str, str] = None,
+        dead_letter_path: Optional[str] = None,
+    ):
+        self.client = client
+        self.journal_path = journal_path or None
+        if dead_letter_path is None and self.journal_path is not None:
+            dead_letter_path = os.path.splitext(self.journal_path)[0] + ".dead_letter.ndjson"
+        self.dead_letter_path = dead_letter_path or None
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.fsync = fsync
+        prefixes = prefixes if prefixes is not None else {"eco": ONTOLOGY_NS, "rdf": RDF_NS, "xsd": XSD_NS}
+        self._prologue = "".join(f"PREFIX {name}: <{namespace}>\n" for name, namespace in prefixes.items())
+        # (id, triplets, instant d'ajout); le lot en cours d'envoi reste compté dans la profondeur
+        self._pending: List[Tuple[str, str, float]] = []
+        self._inflight: List[Tuple[str, str, float]] = []
+        # Isolement d'un enregistrement fautif: les `_window` premiers de la file
+        # contiennent un échec, envoyés par lots de `_limit`; `_suspect` attend
+        # qu'un autre lot passe pour être rejeté
+        self._window = 0
+        self._limit = max_batch
+        self._suspect: Optional[Tuple[str, str, float]] = None
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._retry_at = 0.0
+        self._journal_lines = 0
+        self.stats_counters = {
+            "submitted": 0,
+            "rejected": 0,
+            "flushed": 0,
+            "batches": 0,
+            "retries": 0,
+            "failed_batches": 0,
+            "replayed": 0,
+            "dead_lettered": 0,
+        }
+        self._flush_ms = {"last": 0.0, "max": 0.0, "total": 0.0}
+        self._last_error: Optional[str] = None
+        self._replay()
+
+    # --- Ajout -------------------------------------------------------------
+
+    def submit(self, record_id: str, triples: str, timeout: float = 0) -> int:
+        """Journalise et met en file un enregistrement; retourne la profondeur de file
+
+        File pleine (`max_pending`): attend au plus `timeout` secondes qu'un
+        lot parte, puis lève BufferFull.
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while self._depth() >= self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats_counters["rejected"] += 1
+                    raise BufferFull(f"File d'écriture pleine ({self.max_pending} en attente)")
+                self._changed.wait(remaining)
+            self._append_journal([{"id": record_id, "data": triples}])
+            self._pending.append((record_id, triples, time.monotonic()))
+            self.stats_counters["submitted"] += 1
+            self._ensure_started()
+            self._changed.notify_all()
+            return self._depth()
+
+    def _depth(self) -> int:
+        return len(self._pending) + len(self._inflight) + (self._suspect is not None)
+
+    # --- Envoi -------------------------------------------------------------
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._changed:
+                while not self._ready():
+                    if self._stopping and not self._pending:
+                        return
+                    self._changed.wait(self._wait_time())
+            # À l'arrêt, un lot qui échoue reste au journal (rejoué au prochain démarrage)
+            if not self.flush() and self._stopping:
+                return
+
+    def _ready(self) -> bool:
+        """Un lot peut partir: taille atteinte, délai écoulé ou arrêt demandé (pas pendant une attente de reprise)"""
+        if not self._pending or self._inflight:
+            return False
+        now = time.monotonic()
+        if self._stopping:
+            return True
+        if now < self._retry_at:
+            return False
+        return len(self._pending) >= self.max_batch or now - self._pending[0][2] >= self.flush_interval
+
+    def _wait_time(self) -> Optional[float]:
+        if not self._pending:
+            return None
+        now = time.monotonic()
+        return max(0.001, self._retry_at - now, self._pending[0][2] + self.flush_interval - now)
+
+    def flush(self) -> int:
+        """Envoie un lot (au plus max_batch enregistrements); retourne le nombre écrit"""
+        with self._changed:
+            if not self._pending or self._inflight:
+                return 0
+            batch = self._pending[:min(self.max_batch, self._limit)]
+            del self._pending[:len(batch)]
+            self._inflight = batch
+        update = self._prologue + "INSERT DATA {\n" + "\n".join(triples for _, triples, _ in batch) + "\n}"
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                with self._changed:
+                    self.stats_counters["retries"] += 1
+                    if self._stopping:
+                        break
+                time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            start = time.perf_counter()
+            try:
+                self.client.update(update)
+            except Exception as e:
+                error = e
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            with self._changed:
+                self._flush_ms["last"] = elapsed
+                self._flush_ms["max"] = max(self._flush_ms["max"], elapsed)
+                self._flush_ms["total"] += elapsed
+                self.stats_counters["batches"] += 1
+                self.stats_counters["flushed"] += len(batch)
+                done = [record_id for record_id, _, _ in batch]
+                if self._suspect is not None:
+                    # Fuseki accepte les autres écritures: l'enregistrement isolé est en cause
+                    self._dead_letter(self._suspect)
+                    done.append(self._suspect[0])
+                    self._suspect = None
+                # Reste de la fenêtre (contient l'échec) envoyé d'un bloc, coupé s'il échoue
+                self._window = max(0, self._window - len(batch))
+                self._limit = self._window or self.max_batch
+                self._inflight = []
+                self._append_journal([{"done": done}])
+                self._changed.notify_all()
+            return len(batch)
+
+        with self._changed:
+            self.stats_counters["failed_batches"] += 1
+            self._last_error = str(error) if error else "arrêt pendant les reprises"
+            self._pending[:0] = batch
+            self._inflight = []
+            if self._suspect is not None:
+                # Les suivants échouent aussi: panne, l'enregistrement isolé reprend sa place
+                self._pending.insert(0, self._suspect)
+                self._suspect = None
+                self._window, self._limit = 0, self.max_batch
+            elif len(batch) > 1:
+                # Moitié suivante au prochain essai, jusqu'à isoler l'enregistrement fautif
+                self._window, self._limit = len(batch), (len(batch) + 1) // 2
+            elif len(self._pending) > 1 and not self._stopping:
+                # Isolé: mis de côté, les suivants partent tout de suite et servent de témoin
+                self._suspect = self._pending.pop(0)
+                self._window, self._limit = 0, self.max_batch
+                self._changed.notify_all()
+                return 0
+            # Prochain essai après flush_interval
+            self._retry_at = time.monotonic() + max(self.flush_interval, self.retry_backoff)
+            self._changed.notify_all()
+        return 0
+
+    def _dead_letter(self, record: Tuple[str, str, float]):
+        """Écarte définitivement un enregistrement refusé par Fuseki (appelé verrou tenu)"""
+        self.stats_counters["dead_lettered"] += 1
+        if self.dead_letter_path is None:
+            return
+        entry = {"id": record[0], "data": record[1], "error": self._last_error, "at": time.time()}
+        os.makedirs(os.path.dirname(self.dead_letter_path) or ".", exist_ok=True)
+        with open(self.dead_letter_path, "a", encoding="utf-8") as dead_letters:
+            dead_letters.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            dead_letters.flush()
+            if self.fsync:
+                os.fsync(dead_letters.fileno())
+
+    def stop(self, timeout: float = 5.0) -> bool:
+        """Vide la file (dernières tentatives) et arrête le thread; True si tout a été écrit"""
+        with self._changed:
+            self._stopping = True
+            self._retry_at = 0.0
+            self._changed.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._changed:
+            return self._depth() == 0
+
+    # --- Journal -----------------------------------------------------------
+
+    def _append_journal(self, entries: List[Dict[str, Any]]):
+        """Ajoute des lignes au journal (appelé verrou tenu); compacté quand il ne reste rien à écrire"""
+        if self.journal_path is None:
+            return
+        if not self._pending and not self._inflight and self._suspect is None and "done" in entries[-1]:
+            # Tout est confirmé: le journal repart de zéro
+            self._rewrite_journal([])
+            return
+        with open(self.journal_path, "a", encoding="utf-8") as journal:
+            journal.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries))
+            journal.flush()
+            if self.fsync:
+                os.fsync(journal.fileno())
+        self._journal_lines += len(entries)
+        if self._journal_lines > 4 * self.max_pending:
+            self._rewrite_journal(([self._suspect] if self._suspect else []) + self._inflight + self._pending)
+
+    def _rewrite_journal(self, records: List[Tuple[str, str, float]]):
+        """Remplace atomiquement le journal par les seuls enregistrements non confirmés"""
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        temporary = self.journal_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as journal:
+            for record_id, triples, _ in records:
+                journal.write(json.dumps({"id": record_id, "data": triples}, ensure_ascii=False) + "\n")
+            journal.flush()
+            if self.fsync:
+                os.fsync(journal.fileno())
+        os.replace(temporary, self.journal_path)
+        self._journal_lines = len(records)
+
+    def _replay(self):
+        """Recharge les enregistrements journalisés mais jamais confirmés (arrêt brutal)"""
+        if self.journal_path is None:
+            return
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        if not os.path.exists(self.journal_path):
+            return
+        records: Dict[str, str] = {}
+        with open(self.journal_path, encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # dernière ligne tronquée par un arrêt brutal
+                if "done" in entry:
+                    for record_id in entry["done"]:
+                        records.pop(record_id, None)
+                elif "id" in entry:
+                    records[entry["id"]] = entry["data"]
+        now = time.monotonic()
+        with self._changed:
+            self._pending = [(record_id, triples, now) for record_id, triples in records.items()]
+            self.stats_counters["replayed"] = len(self._pending)
+            self._rewrite_journal(self._pending)
+            if self._pending:
+                self._ensure_started()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._changed:
+            batches = self.stats_counters["batches"]
+            return dict(
+                self.stats_counters,
+                queue_depth=self._depth(),
+                max_pending=self.max_pending,
+                oldest_pending_ms=round((time.monotonic() - self._pending[0][2]) * 1000, 2) if self._pending else 0,
+                flush_ms_last=round(self._flush_ms["last"], 2),
+                flush_ms_max=round(self._flush_ms["max"], 2),
+                flush_ms_avg=round(self._flush_ms["total"] / batches, 2) if batches else 0,
+                last_error=self._last_error,
+                dead_letter_path=self.dead_letter_path,
+            )
@@ -0,0 +1,151 @@
+import json
+from fastapi.testclient import TestClient
+import main
+
+client = TestClient(main.app)
+
+def test_batch_runs_items_concurrently_and_reports_errors_per_item():
+    """Un aller-retour pour la page d'accueil; un élément invalide n'interrompt pas le lot"""
+    response = client.post("/batch", json={"items": [
+        {"id": "destinations", "template": "destinations"},
+        {"id": "stats", "template": "statistiques"},
+        {"id": "page", "template": "hebergements", "limit": 2},
+        {"id": "nl", "question": "Quels hébergements à Djerba ?"},
+        {"id": "broken", "sparql": "SELECT ?x WHERE {"},
+        {"id": "ambiguous", "question": "Destinations ?", "sparql": "ASK {}"},
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    items = {item["id"]: item for item in body["results"]}
+    assert [item["id"] for item in body["results"]] == ["destinations", "stats", "page", "nl", "broken", "ambiguous"]
+    assert items["destinations"]["count"] == 5
+    assert items["stats"]["results"][0]["totalDestinations"] == "5"
+    assert items["page"]["count"] == 2 and items["page"]["next_cursor"] and items["page"]["next_offset"] == 2
+    assert [row["nom"] for row in items["nl"]["results"]] == ["Hotel Écologique Paradise"]
+    assert "error" in items["broken"] and "error" in items["ambiguous"]
+    assert body["errors"] == 2
+    assert all(item["execution_time"] >= 0 for item in body["results"])
+
+    too_many = client.post("/batch", json={"items": [{"sparql": "ASK {}"}] * (main.BATCH_MAX_ITEMS + 1)})
+    assert too_many.status_code == 400
+    for page in ({"limit": -1}, {"limit": main.MAX_PAGE_SIZE + 1}, {"offset": -1}):
+        assert client.post("/batch", json={"items": [dict(page, template="destinations")]}).status_code == 422
+
+def test_recommendation_batch_streams_ndjson_with_comparison():
+    travellers = [{"profile": "Culture", "destination": "Djerba"}, {"profile": "Famille", "destination": "Tunis", "days": 1}]
+    response = client.post("/recommendation/batch", json={"travellers": travellers, "compare": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    *recommendations, trailer = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["profile"] for r in recommendations] == ["Culture", "Famille"]
+    assert len(recommendations[1]["activities"]) == 1
+    assert len(trailer["comparison"]["packages"]) == 2
+
+    as_json = client.post("/recommendation/batch?stream=json", json={"travellers": travellers}).json()
+    assert as_json["count"] == 2 and "comparison" not in as_json
+    assert as_json["results"] == recommendations
+
+    nulls = {"profile": "Culture", "destination": "Djerba", "days": None, "budget": None, "carbon_priority": None}
+    [defaulted] = client.post("/recommendation/batch?stream=json", json={"travellers": [nulls]}).json()["results"]
+    assert defaulted == recommendations[0] and defaulted["duration_days"] == 3
+
+def test_carbon_calculator_batch_accepts_json_and_csv():
+    single = client.get("/recommendation/carbon-calculator", params={"transport_type": "Avion", "distance_km": 1000}).json()
+    assert single["total_co2_kg"] == 255.0 and single["carbon_level"] == "Élevé"
+    assert [a["transport"] for a in single["alternatives"]] == ["Velo", "Train", "Bus"]
+
+    legs = {"transport_type": ["Avion", "Train", "Fusée"], "distance_km": [1000, 100, 10]}
+    body = client.post("/recommendation/carbon-calculator/batch?alternatives=2", json=legs).json()
+    assert body["count"] == 3 and body["total_co2_kg"] == [255.0, 4.1, 2.0]
+    assert body["carbon_score"] == [0.0, 100.0, 100.0]
+    # Le transport du trajet n'est jamais proposé; un type inconnu reçoit le facteur par défaut
+    assert body["alternatives"] == [["Velo", "Train"], ["Velo", "Bus"], ["Velo", "Train"]]
+    assert body["savings"][1] == [4.1, -4.8]
+
+    csv_body = "transport_type,distance_km\nAvion,1000\nTrain,100\nFusée,10\n"
+    response = client.post("/recommendation/carbon-calculator/batch?alternatives=2&format=csv",
+                           content=csv_body.encode(), headers={"content-type": "text/csv"})
+    lines = response.text.splitlines()
+    assert response.headers["content-type"].startswith("text/csv")
+    assert lines[0] == "transport,distance_km,total_co2_kg,carbon_level,carbon_score,alternative_1,alternative_2"
+    assert lines[1] == "Avion,1000.0,255.0,Élevé,0.0,Velo,Train"
+    assert len(lines) == 4
+
+    assert client.post("/recommendation/carbon-calculator/batch", json={"transport_type": ["Bus"], "distance_km": [-1]}).status_code == 400
+    assert client.post("/recommendation/carbon-calculator/batch", json={"transport_type": ["Bus"], "distance_km": []}).status_code == 400
+
+def test_reviews_are_acknowledged_then_written_in_batches(tmp_path, monkeypatch):
+    from services.write_buffer import WriteBehindBuffer
+    buffer = WriteBehindBuffer(main.fuseki_client, str(tmp_path / "journal.ndjson"), max_batch=2, flush_interval=5)
+    monkeypatch.setattr(main, "write_buffer", buffer)
+    review = {"voyageur": 'Sami "le guide"', "attraction_id": "Oasis", "note": 4, "commentaire": "Superbe\\n} ; DROP"}
+    first = client.post("/avis", json=review)
+    second = client.post("/signalement-eco", json={
+        "voyageur": "Sami", "destination": "Douz", "type_signalement": "pollution", "description": "Déchets"})
+    assert first.status_code == second.status_code == 202
+    assert first.json()["avis_id"].startswith("avis_")
+    assert buffer.stop()
+    assert buffer.stats()["flushed"] == 2 and buffer.stats()["batches"] == 1
+    # Littéraux échappés: le commentaire est stocké tel quel
+    rows = main.fuseki_client.parse_results(main.fuseki_client.query(
+        f'PREFIX eco: <{main.ONTOLOGY_NS}> SELECT ?v ?c WHERE {{ ?a a eco:Avis ; eco:voyageur ?v ; eco:commentaire ?c }}'))
+    assert {"v": review["voyageur"], "c": review["commentaire"]} in rows
+    assert client.get("/metrics").json()["write_buffer"]["queue_depth"] == 0
+
+def test_bulk_ingest_validates_rows_and_writes_in_chunks():
+    reviews = "\n".join([
+        json.dumps({"voyageur": "Lina", "attraction_id": "Oasis", "note": 5, "commentaire": 'Très "belle" oasis'}),
+        json.dumps({"voyageur": "Omar", "attraction_id": "Oasis", "note": 9, "commentaire": "Note hors bornes"}),
+        "{pas du json",
+        "",
+        json.dumps({"voyageur": "Nour", "attraction_id": "Djerba", "note": 4.5, "commentaire": "Bien"}),
+    ])
+    response = client.post("/ingest/avis?job_id=reviews", files={"file": ("avis.ndjson", reviews.encode(), "application/x-ndjson")})
+    report = response.json()
+    assert response.status_code == 200 and report["status"] == "done"
+    assert (report["rows"], report["accepted"], report["rejected"], report["chunks"]) == (4, 2, 2, 1)
+    assert [e["line"] for e in report["errors"]] == [2, 3] and "note" in report["errors"][0]["error"]
+    rows = main.fuseki_client.parse_results(main.fuseki_client.query(
+        f'PREFIX eco: <{main.ONTOLOGY_NS}> SELECT ?c WHERE {{ ?a a eco:Avis ; eco:voyageur "Lina" ; eco:commentaire ?c }}'))
+    assert rows == [{"c": 'Très "belle" oasis'}]
+
+    catalogue = "nom,localiseDans,scoreDurabilite,description\nLac de Tunis,Tunis,77,\nIchkeul bis,Bizerte,150,Score invalide\n"
+    report = client.post("/ingest/destinations?target=store", files={"file": ("destinations.csv", catalogue.encode(), "text/csv")}).json()
+    assert (report["accepted"], report["rejected"]) == (1, 1)
+    names = [d["nom"] for d in client.get("/destinations").json()["destinations"]]
+    assert "Lac de Tunis" in names and "Ichkeul bis" not in names
+    # Compteurs de /stats tenus à jour par l'ingestion, sans recompter
+    assert client.get("/stats").json()["statistics"]["totalDestinations"] == "6"
+    assert client.get("/ingest/jobs").json()["jobs"][1]["job_id"] == "reviews"
+
+    # Type hors ontologie ou IRI forgée: ligne rejetée, les suivantes sont écrites
+    activities = "\n".join([
+        json.dumps({"nom": "Piège", "type": f"Musee> . <http://evil/s> <{main.ONTOLOGY_NS}type> <{main.ONTOLOGY_NS}Destination"}),
+        json.dumps({"nom": "Hors piste", "type": "Hors piste"}),
+        json.dumps({"nom": "Kayak Bizerte", "type": "Sportive", "kgCO2": 0.5}),
+    ])
+    report = client.post("/ingest/activites", files={"file": ("activites.ndjson", activities.encode(), "application/x-ndjson")}).json()
+    assert report["status"] == "done" and (report["accepted"], report["rejected"]) == (1, 2)
+    assert all("sous-classe" in e["error"] for e in report["errors"])
+    rows = main.fuseki_client.parse_results(main.fuseki_client.query(
+        f'PREFIX eco: <{main.ONTOLOGY_NS}> SELECT ?a WHERE {{ ?a a eco:ActiviteSportive }}'))
+    assert {"a": main.ONTOLOGY_NS + "Kayak_Bizerte"} in rows
+    assert not main.fuseki_client.parse_results(main.fuseki_client.query("SELECT ?p WHERE { <http://evil/s> ?p ?o }"))
+
+    assert client.post("/ingest/inconnu", files={"file": ("x.csv", b"nom\n", "text/csv")}).status_code == 404
+    assert client.post("/ingest/avis", files={"file": ("x.bin", b"", "application/octet-stream")}).status_code == 400
+
+def test_stats_etag_follows_counter_reconciliation():
+    """Un recomptage change /stats sans écriture: l'ancien ETag ne doit plus donner 304"""
+    main.stats_counters.reconcile()
+    total = int(client.get("/stats").json()["statistics"]["totalDestinations"])
+    # Destination déjà présente: comptée une seconde fois jusqu'à la réconciliation
+    catalogue = "nom,localiseDans,scoreDurabilite\nÎle de Djerba - Eco-Resort,Djerba,90\n"
+    assert client.post("/ingest/destinations?target=store", files={"file": ("destinations.csv", catalogue.encode(), "text/csv")}).json()["accepted"] == 1
+    response = client.get("/stats")
+    etag = response.headers["etag"]
+    assert response.json()["statistics"]["totalDestinations"] == str(total + 1)
+    assert client.get("/stats", headers={"If-None-Match": etag}).status_code == 304
+    main.stats_counters.reconcile()
+    response = client.get("/stats", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.json()["statistics"]["totalDestinations"] == str(total)
@@ -0,0 +1,28 @@
+import pytest
+from services.bulk_ingest import BulkIngestJob
+from services.triple_store import iri, literal, term_to_sparql
+
+
+def test_rows_with_invalid_terms_are_rejected_and_failed_chunks_counted():
+    def to_triples(row):
+        node = iri("http://example.org/" + row["id"])
+        return [(node, iri("http://example.org/nom"), literal(row.get("nom", "")))]
+
+    written = []
+
+    def write_chunk(triples):
+        if any(t[2][1] == "panne" for t in triples):
+            raise Exception("Fuseki 400")
+        written.extend(triples)
+
+    rows = [(1, {"id": "a b"}, None), (2, {"id": "a", "nom": "ok"}, None), (3, {"id": "b", "nom": "panne"}, None), (4, {"id": "c"}, None)]
+    report = BulkIngestJob("j", "test", to_triples, write_chunk, chunk_triples=1).run(iter(rows))
+    assert (report["rows"], report["accepted"], report["rejected"], report["chunks"], report["failed_chunks"]) == (4, 2, 2, 2, 1)
+    assert report["status"] == "partial" and [e["line"] for e in report["errors"]] == [1, 3]
+    assert "IRI invalide" in report["errors"][0]["error"] and len(written) == 2
+
+
+@pytest.mark.parametrize("term", [iri("http://x/a> . <http://evil/s"), iri("http://x/a b"), iri('http://x/"'), literal("x", lang="fr\" . <x")])
+def test_term_to_sparql_rejects_unsafe_terms(term):
+    with pytest.raises(ValueError):
+        term_to_sparql(term)
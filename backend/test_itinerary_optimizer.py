@@ -0,0 +1,36 @@
+import itertools
+import numpy as np
+from services.itinerary_optimizer import ItineraryOptimizer, pareto_mask
+from services.mock_fuseki_client import MockFusekiClient
+from services.recommendation_engine import RecommendationEngine
+
+def test_pareto_mask_keeps_first_of_duplicates():
+    assert pareto_mask(np.array([[3, 1], [1, 3], [2, 2], [1, 1], [3, 1]])).tolist() == [True, True, True, False, False]
+
+def test_itinerary_optimizer_matches_brute_force_and_respects_caps():
+    """Petits catalogues: même optimum qu'une énumération exhaustive; contraintes toujours tenues"""
+    for seed in range(10):
+        rng = np.random.default_rng(seed)
+        match, cost, co2 = rng.integers(0, 101, 9).astype(float), rng.uniform(5, 200, 9), rng.uniform(0, 20, 9)
+        stays, transports = (rng.uniform(50, 300, 3), rng.uniform(0, 30, 3)), (rng.uniform(10, 200, 3), rng.uniform(0, 100, 3))
+        budget, max_co2 = rng.uniform(200, 700), rng.uniform(30, 150)
+        best = max(
+            (match[list(chosen)].sum() for s in range(3) for t in range(3) for k in range(4)
+             for chosen in itertools.combinations(range(9), k)
+             if stays[0][s] + transports[0][t] + cost[list(chosen)].sum() <= budget
+             and stays[1][s] + transports[1][t] + co2[list(chosen)].sum() <= max_co2),
+            default=None,
+        )
+        front = ItineraryOptimizer(time_budget=10).solve((match, cost, co2), stays, transports, 3, budget, max_co2)["front"]
+        assert (front[0]["match_score"] if front else None) == best
+        assert all(o["cost"] <= budget and o["kg_co2"] <= max_co2 and len(o["activities"]) <= 3 for o in front)
+
+def test_engine_itinerary_on_mock_catalogue():
+    engine = RecommendationEngine(MockFusekiClient())
+    itinerary = engine.optimize_itinerary("Culture", budget=250, days=3, max_co2=20)
+    best = itinerary["best"]
+    assert best["total_cost"] <= 250 and best["total_carbon_kg"] <= 20
+    assert best["activities"][0]["nom"] == "Visite Artisans Médina" and best["transport"]["nom"] == "Vélo"
+    scores = [o["match_score"] for o in itinerary["pareto_front"]]
+    assert scores == sorted(scores, reverse=True) and itinerary["search"]["complete"]
+    assert engine.optimize_itinerary("Culture", budget=50)["best"] is None  # aucun hébergement abordable
@@ -74,5 +74,168 @@ def test_nl_conversion():
     print(f"📊 Taux de réussite: {(success_count/len(test_questions)*100):.1f}%")
     print(f"{'=' * 80}\n")
 
+def test_intent_classifier_single_pass():
+    """Une seule intention, déterministe: la première mentionnée l'emporte"""
+    converter = NLToSparqlConverter()
+    assert converter.detect_query_type("Liste tous les hébergements avec certification Green Globe") == "hebergements"
+    assert converter.detect_query_type("Impact environnemental du transport") == "impacts_eco"
+    assert converter.detect_query_type("Quelles destinations sont durables?") == "destinations"
+    assert converter.detect_query_type("bonjour") == "generic"
+    questions = ["Quels sont les hébergements écologiques disponibles?", "émission carbone de mon voyage", "Donne moi un conseil"]
+    assert converter.detect_query_types(questions) == ["hebergements", "transports_eco", "recommandations"]
+
+def test_gazetteer_places_feed_sparql_filters():
+    """Lieux du store reconnus sans accents, mots entiers, et mis à jour à l'insertion"""
+    from config import ONTOLOGY_NS
+    from services.gazetteer import Gazetteer
+    client = MockFusekiClient()
+    gazetteer = Gazetteer.from_store(client.store)
+    gazetteer.watch(client.store)
+    converter = NLToSparqlConverter(gazetteer=gazetteer)
+
+    assert converter.extract_places("Destinations à DJÉRBA ?") == {"region": "Djerba"}
+    assert converter.extract_places("Voyage en Tunisie") == {}  # 'Tunis' n'est pas un mot entier ici
+
+    client.update(f"""PREFIX eco: <{ONTOLOGY_NS}>
+INSERT DATA {{ eco:Lac_Sud rdf:type eco:Destination ; eco:nom "Lac Sud" ; eco:localiseDans "Tunis \\"Sud\\"" . }}""")
+    assert converter.extract_places('destinations à tunis "sud"') == {"region": 'Tunis "Sud"'}
+    sparql_query = converter.convert_question_to_sparql('Quelles destinations à Tunis "Sud" ?')
+    rows = client.parse_results(client.query(sparql_query))
+    assert [row["nom"] for row in rows] == ["Lac Sud"]
+
+def test_questions_sharing_a_cache_key_get_the_same_places():
+    """Ponctuation ignorée par le gazetteer comme par la clé: traduction en cache = traduction fraîche"""
+    from services.gazetteer import Gazetteer
+    from services.translation_cache import TranslationCache
+    gazetteer = Gazetteer.from_store(MockFusekiClient().store)
+    cached = NLToSparqlConverter(gazetteer=gazetteer, translation_cache=TranslationCache(path=None))
+    fresh = NLToSparqlConverter(gazetteer=gazetteer, translation_cache=TranslationCache(max_entries=0, path=None))
+    first = cached.convert_question_to_sparql("Destinations: Île de Djerba - Eco-Resort")
+    second = "Destinations: Île de Djerba Eco Resort"
+    assert cached.convert_question_to_sparql(second) == fresh.convert_question_to_sparql(second) == first
+    assert 'FILTER(STR(?nom) = "Île de Djerba - Eco-Resort")' in first
+
+def test_translation_cache_normalises_evicts_and_persists(tmp_path):
+    """Questions équivalentes partagent une entrée; seules les traductions Gemini sont persistées"""
+    from services.translation_cache import TranslationCache
+    path = str(tmp_path / "translations.json")
+    cache = TranslationCache(max_entries=2, path=path)
+    converter = NLToSparqlConverter(translation_cache=cache)
+    first = converter.convert_question_to_sparql("Quels hébergements écologiques ?")
+    assert converter.convert_question_to_sparql("  quels HEBERGEMENTS, ecologiques") == first
+    assert cache.stats()["backends"]["pattern"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+    # Même clé, même traduction sans le cache: la classification ignore aussi les accents
+    uncached = NLToSparqlConverter(translation_cache=TranslationCache(max_entries=0, path=None))
+    assert uncached.convert_question_to_sparql("  quels HEBERGEMENTS, ecologiques") == first
+    for accented, plain in [("Quelles activités ?", "quelles activites ?"), ("Où dormir", "ou dormir"), ("Émission carbone", "emission carbone")]:
+        assert uncached.detect_query_type(plain) == uncached.detect_query_type(accented) != "generic"
+
+    cache.set("Où dormir à Djerba ?", "gemini", "SELECT ?h WHERE { ?h a wm:Hebergement }")
+    cache.set("Activités culturelles", "pattern", "SELECT ?a WHERE { ?a a wm:Musee }")
+    assert cache.get("Quels hébergements écologiques ?", "pattern", 0) is None  # plus ancienne: évincée
+    assert cache.stats()["evictions"] == 1
+    cache.save()
+
+    reloaded = TranslationCache(path=path)
+    assert reloaded.get("ou dormir a djerba", "gemini") == "SELECT ?h WHERE { ?h a wm:Hebergement }"
+    assert reloaded.get("Activités culturelles", "pattern") is None
+    assert reloaded.stats()["entries"] == 1
+
+def test_async_gemini_coalesces_and_falls_back_on_budget():
+    """Questions identiques: un seul appel; appel trop lent: repli sur les motifs"""
+    import asyncio
+
+    class StubModel:
+        def __init__(self, delay):
+            self.delay, self.prompts = delay, []
+
+        async def generate_content_async(self, prompt):
+            self.prompts.append(prompt)
+            await asyncio.sleep(self.delay)
+            return type("Response", (), {"text": "  SELECT ?h WHERE { ?h a wm:Hebergement }\n"})()
+
+    async def ask(converter, questions):
+        return await asyncio.gather(*(converter.aconvert_question_to_sparql(q) for q in questions))
+
+    fast = NLToSparqlConverter(model=StubModel(0.01), timeout=1)
+    results = asyncio.run(ask(fast, ["Où dormir ?", "où dormir", "OU DORMIR !"]))
+    assert len(set(results)) == 1 and results[0].endswith("SELECT ?h WHERE { ?h a wm:Hebergement }")
+    assert len(fast.model.prompts) == 1 and fast.gemini_stats["coalesced"] == 2
+    assert asyncio.run(ask(fast, ["Où dormir"])) == results[:1]  # servi par le cache
+    assert len(fast.model.prompts) == 1
+
+    slow = NLToSparqlConverter(model=StubModel(5), timeout=0.05)
+    [sparql_query] = asyncio.run(ask(slow, ["Quels hébergements écologiques ?"]))
+    assert sparql_query == NLToSparqlConverter().convert_question_to_sparql("Quels hébergements écologiques ?")
+    assert slow.gemini_stats["timeouts"] == 1
+    assert slow.translation_cache.stats()["entries"] == 1  # seule la traduction par motifs est gardée
+
+def test_sync_gemini_calls_stay_under_the_cap_after_timeouts():
+    """Client synchrone hors budget: le thread encore occupé compte toujours dans la limite"""
+    import asyncio
+    import threading
+    import time
+
+    class BlockingModel:
+        def __init__(self):
+            self.running, self.peak, self.lock = 0, 0, threading.Lock()
+
+        def generate_content(self, prompt):
+            with self.lock:
+                self.running += 1
+                self.peak = max(self.peak, self.running)
+            time.sleep(0.2)
+            with self.lock:
+                self.running -= 1
+            return type("Response", (), {"text": "SELECT ?h WHERE { ?h a wm:Hebergement }"})()
+
+    async def waves(converter):
+        for wave in range(4):
+            await asyncio.gather(*(converter.aconvert_question_to_sparql(f"hébergement {wave} {i}") for i in range(3)))
+
+    converter = NLToSparqlConverter(model=BlockingModel(), max_concurrency=2, timeout=0.05)
+    asyncio.run(waves(converter))
+    assert converter.gemini_stats["timeouts"] == 12 and converter.model.peak == 2
+
+def test_llm_output_is_validated_before_execution():
+    """Blocs de code retirés, préfixes implicites déclarés, formes déjà vues tranchées sans ré-analyse"""
+    import pytest
+    from services.query_validator import QueryValidator
+    from services.sparql_engine import SparqlError
+    validator = QueryValidator()
+    checked = validator.validate('```sparql\nSELECT ?nom WHERE { ?d a wm:Destination ; wm:nom ?nom FILTER(?nom = "Djerba") }\n```')
+    assert checked.startswith("PREFIX wm: <") and checked.endswith("}")
+    validator.validate('SELECT ?nom WHERE { ?d a wm:Destination ; wm:nom ?nom FILTER(?nom = "Tozeur") }')
+    assert validator.stats()["hits"] == 1
+    for invalid in ("SELECT ?x WHERE { ?d wm:nom ?nom }", "SELECT ?nom WHERE { ?d wm:nom ?nom", "Voici la requête demandée"):
+        with pytest.raises(SparqlError):
+            validator.validate(invalid)
+
+    # SPARQL 1.1 hors du moteur local: transmis à Fuseki après vérification de la structure
+    for accepted in (
+        "SELECT ?d WHERE { ?d rdf:type/rdfs:subClassOf* wm:Destination }",
+        "SELECT ?d WHERE { ?d ^wm:localiseDans|wm:proche ?x }",
+        "SELECT ?d ?n WHERE { { SELECT ?d (COUNT(?a) AS ?n) WHERE { ?a wm:localiseDans ?d } GROUP BY ?d } }",
+        "CONSTRUCT { ?d wm:nom ?n } WHERE { ?d wm:nom ?n }",
+    ):
+        assert validator.validate(accepted).startswith("PREFIX")
+    assert validator.stats()["unchecked"] == 4
+    for invalid in (
+        "SELECT ?d WHERE { ?d rdf:type/rdfs:subClassOf* wm:Destination",
+        "SELECT ?x WHERE { ?d rdf:type/rdfs:subClassOf* wm:Destination }",
+        "SELECT ?d WHERE { ?d inconnu:p/wm:q ?x }",
+    ):
+        with pytest.raises(SparqlError):
+            validator.validate(invalid)
+
+    class StubModel:
+        def generate_content(self, prompt):
+            assert "Hebergement" in prompt and "localiseDans" not in prompt  # schéma de l'ontologie seule
+            return type("Response", (), {"text": "SELECT ?nom WHERE { ?h wm:nom ?x }"})()
+
+    converter = NLToSparqlConverter(model=StubModel())
+    expected = NLToSparqlConverter().convert_question_to_sparql("Quels hébergements ?")
+    assert converter.convert_question_to_sparql("Quels hébergements ?") == expected
+
 if __name__ == "__main__":
     test_nl_conversion()
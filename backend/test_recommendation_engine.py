@@ -0,0 +1,68 @@
+import random
+import time
+from config import ONTOLOGY_NS
+from services.mock_fuseki_client import MockFusekiClient
+from services.recommendation_engine import RecommendationEngine, top_k
+
+def test_recommendation_candidates_are_fetched_concurrently_once_per_version(stub_client):
+    """Latence ≈ la requête la plus lente; instantané réutilisé jusqu'à la prochaine écriture"""
+    rows = [{"id": "a", "s": 1}, {"id": "b", "s": 3}, {"id": "b", "s": 3}, {"id": "c", "s": 3}, {"id": "d", "s": 2}]
+    assert [r["id"] for r in top_k(iter(rows), 3, lambda r: r["s"], "id")] == ["b", "c", "d"]
+
+    client = stub_client(delay=0.2)
+    engine = RecommendationEngine(client)
+    start = time.perf_counter()
+    recommendation = engine.generate_recommendation("Culture", "Djerba", carbon_priority=True)
+    assert time.perf_counter() - start < 0.5 and client.calls == 3
+    assert recommendation["transport"]["nom"] == "Vélo"
+    assert recommendation["activities"][0]["match_score"] == 100
+    assert recommendation["accommodation"]["nom"] == "Hotel Écologique Paradise"
+    # Seuls le meilleur hébergement et le meilleur transport sont demandés au store
+    assert sum("ORDER BY DESC(?scoreDurabilite)\nLIMIT" in q or "ORDER BY ASC(COALESCE(?kgCO2" in q for q in client.queries) == 2
+
+    engine.generate_recommendation("Adventure", "Djerba")
+    assert client.calls == 3
+    assert "match_score" not in engine.load_candidates()["activities"][0]  # instantané non modifié
+    client.mock.update(f"""PREFIX eco: <{ONTOLOGY_NS}>
+INSERT DATA {{ eco:Ferry_Djerba rdf:type eco:Ferry ; eco:nom "Ferry Djerba" ; eco:kgCO2 "30" . }}""")
+    assert "Ferry Djerba" in [t["nom"] for t in engine.get_transport_options()]
+    assert client.calls == 4
+
+def test_failed_candidate_loads_are_not_memoized(stub_client):
+    """Panne passagère: réponse vide, mais rechargée au prochain appel sans attendre une écriture"""
+    engine = RecommendationEngine(stub_client(failures=1))
+    assert engine.load_candidates()["activities"] == []
+    assert len(engine.load_candidates()["activities"]) == 5
+
+def test_compatibility_matrix_top_k_matches_full_sort():
+    """Gather + argpartition: même ordre qu'un tri complet stable, y compris aux égalités"""
+    matrix = RecommendationEngine().compatibility
+    rng = random.Random(7)
+    types = [rng.choice(list(matrix.types) + ["TypeInconnu", ""]) for _ in range(2000)]
+    indices = matrix.encode(types)
+    for profile in ("Culture", "Famille", "ProfilInconnu"):
+        expected = sorted(range(len(types)), key=lambda i: -matrix.score(profile, types[i]))
+        for k in (1, 25, None):
+            positions, scores = matrix.top_k(profile, indices, k)
+            assert positions.tolist() == expected[:k]
+            assert scores.tolist() == [matrix.score(profile, types[i]) for i in expected[:k]]
+    assert matrix.score("Adventure", "Atelier_d'artisanat") == 40  # hérité d'ActiviteEducative
+    assert matrix.score("Culture", "TypeInconnu") == 50
+
+def test_recommendation_batch_matches_single_calls():
+    """Un chargement du catalogue pour tout le lot, mêmes résultats qu'appel par appel"""
+    engine = RecommendationEngine(MockFusekiClient())
+    travellers = [
+        {"profile": "Culture", "destination": "Djerba", "days": 2},
+        {"profile": "Adventure", "destination": "Tozeur", "budget": 500, "carbon_priority": True, "days": 5},
+        {"profile": "ProfilInconnu", "destination": "Tunis", "days": 0},
+        {"profile": "Culture", "destination": "Sousse", "days": 40},
+    ]
+    fetched = []
+    load_candidates = engine.load_candidates
+    engine.load_candidates = lambda: fetched.append(1) or load_candidates()
+    batch = list(engine.generate_recommendations_batch(travellers))
+    assert len(fetched) == 1
+    assert batch == [engine.generate_recommendation(**t) for t in travellers]
+    assert [len(r["activities"]) for r in batch[:3]] == [2, 5, 0]
+    assert engine.compare_packages(batch)["best_experience"]["profile"] == "Culture"
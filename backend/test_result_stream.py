@@ -0,0 +1,34 @@
+import json
+import pytest
+from services.result_stream import SparqlJsonStreamParser, iter_rows
+
+def _document(count):
+    return json.dumps({
+        "head": {"vars": ["nom", "bindings"]},
+        "results": {"bindings": [
+            {"nom": {"type": "literal", "value": f"Île {i} }}]\""}} for i in range(count)
+        ]}
+    }, ensure_ascii=False).encode("utf-8")
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 100000])
+def test_rows_survive_any_chunking(chunk_size):
+    """Les lignes sont identiques quel que soit le découpage du flux (y compris au milieu d'un caractère UTF-8)"""
+    doc = _document(30)
+    rows = list(iter_rows(doc[i:i + chunk_size] for i in range(0, len(doc), chunk_size)))
+    assert len(rows) == 30
+    assert rows[12] == {"nom": "Île 12 }]\""}
+
+def test_buffer_is_trimmed_as_rows_are_decoded():
+    """Le tampon ne conserve que la ligne incomplète en cours"""
+    parser = SparqlJsonStreamParser()
+    doc = _document(1000)
+    for i in range(0, len(doc), 512):
+        parser.feed(doc[i:i + 512])
+        assert len(parser._buffer) < 1024
+    assert parser.done
+    assert parser.vars == ["nom", "bindings"]
+
+def test_truncated_stream_raises():
+    doc = _document(5)
+    with pytest.raises(Exception):
+        list(iter_rows([doc[:len(doc) // 2]]))
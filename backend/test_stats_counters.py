@@ -0,0 +1,20 @@
+import threading
+from config import ONTOLOGY_NS
+from services.stats_counters import StatsCounters
+from services.triple_store import iri, literal, RDF_TYPE
+
+def test_stats_counters_follow_writes_and_reconcile_in_parallel(stub_client):
+    """Écritures comptées sans requête; la réconciliation (COUNT parallèles) corrige la dérive"""
+    client = stub_client()
+    counters = StatsCounters(client, reconcile_interval=3600)
+    assert counters.snapshot() == {"totalVoyageurs": "3", "totalDestinations": "5", "totalHebergements": "5", "totalActivites": "5"}
+    assert client.calls == 4 and len(client.threads) > 1 and threading.current_thread().name not in client.threads
+
+    node = iri(ONTOLOGY_NS + "Destination_Nouvelle")
+    triples = [(node, iri(RDF_TYPE), iri(ONTOLOGY_NS + "Destination")), (node, iri(ONTOLOGY_NS + "nom"), literal("Nouvelle"))]
+    client.mock.insert_triples(triples)
+    counters.observe(triples)
+    counters.observe(triples)  # écriture rejouée: compteur en avance jusqu'à la réconciliation
+    assert counters.snapshot()["totalDestinations"] == "7" and client.calls == 4
+    assert counters.reconcile()["totalDestinations"] == 6
+    assert counters.stats()["drift"] == 1 and counters.stats()["reconciliations"] == 2
@@ -0,0 +1,178 @@
+import os
+import pytest
+from config import ONTOLOGY_NS
+from services.triple_store import TripleStore, iri, literal, RDF_TYPE, XSD_NS
+from services.sparql_engine import SparqlEngine, SparqlError
+from services.mock_fuseki_client import MockFusekiClient
+from services.nl_to_sparql import NLToSparqlConverter
+
+EX = "http://example.org/#"
+
+def _store():
+    store = TripleStore()
+    for i in range(20):
+        node = iri(f"{EX}h{i}")
+        store.add(node, iri(RDF_TYPE), iri(EX + ("Hotel" if i % 2 else "Gite")))
+        store.add(node, iri(EX + "nom"), literal(f"Lieu {i}"))
+        store.add(node, iri(EX + "score"), literal(i * 5, XSD_NS + "integer"))
+        if i % 4 == 0:
+            store.add(node, iri(EX + "ville"), literal("Djerba"))
+    return store
+
+def test_indexes_answer_every_pattern_shape():
+    store = _store()
+    hotel, rdf_type, nom = store.lookup(iri(EX + "Hotel")), store.lookup(iri(RDF_TYPE)), store.lookup(iri(EX + "nom"))
+    h3 = store.lookup(iri(EX + "h3"))
+    assert len(store) == 65
+    assert len(list(store.match_ids(None, rdf_type, hotel))) == 10
+    assert len(list(store.match_ids(h3, None, None))) == 3
+    assert len(list(store.match_ids(h3, None, hotel))) == 1
+    assert list(store.objects(iri(EX + "h3"), iri(EX + "nom"))) == [literal("Lieu 3")]
+    assert store.estimate(None, nom, None) == 20
+    assert not store.add(iri(EX + "h3"), iri(EX + "nom"), literal("Lieu 3"))
+    assert store.remove(iri(EX + "h3"), iri(EX + "nom"), literal("Lieu 3"))
+    assert len(store) == 64 and store.estimate(h3, nom, None) == 0
+
+def test_bgp_optional_filter_limit():
+    engine = SparqlEngine(_store(), {"ex": EX})
+    results = engine.query("""
+        SELECT ?h ?nom ?ville WHERE {
+          ?h a ex:Hotel ; ex:nom ?nom ; ex:score ?score .
+          OPTIONAL { ?h ex:ville ?ville }
+          FILTER(?score >= 50 && CONTAINS(?nom, "Lieu"))
+        } ORDER BY DESC(?score) LIMIT 3""")
+    rows = results["results"]["bindings"]
+    assert results["head"]["vars"] == ["h", "nom", "ville"]
+    assert [row["nom"]["value"] for row in rows] == ["Lieu 19", "Lieu 17", "Lieu 15"]
+    assert all("ville" not in row for row in rows)
+    # DISTINCT appliqué avant la sélection des k premiers
+    distinct = engine.query("SELECT DISTINCT ?ville WHERE { ?h ex:score ?s OPTIONAL { ?h ex:ville ?ville } } ORDER BY ?ville LIMIT 2")
+    assert len(distinct["results"]["bindings"]) == 2
+
+def test_aggregates_and_updates():
+    engine = SparqlEngine(_store(), {"ex": EX})
+    count = 'SELECT (COUNT(DISTINCT ?h) AS ?n) WHERE { ?h a ex:Gite }'
+    assert engine.query(count)["results"]["bindings"][0]["n"]["value"] == "10"
+    engine.update('PREFIX ex: <http://example.org/#> INSERT DATA { ex:new a ex:Gite ; ex:nom "Nouveau \\"gîte\\"" . }')
+    assert engine.query(count)["results"]["bindings"][0]["n"]["value"] == "11"
+    assert engine.query('ASK { ?h ex:nom "Nouveau \\"gîte\\"" }')["boolean"] is True
+    engine.update("DELETE DATA { ex:new a ex:Gite }")
+    assert engine.query(count)["results"]["bindings"][0]["n"]["value"] == "10"
+    with pytest.raises(SparqlError):
+        engine.query("SELECT ?x WHERE { ?x undeclared:p ?y }")
+
+@pytest.mark.parametrize("query_type, expected", [
+    ("destinations", 5), ("hebergements", 5), ("activites", 5), ("certifications", 3), ("voyageurs", 3),
+])
+def test_mock_client_evaluates_converter_templates(query_type, expected):
+    """Le mock exécute les requêtes réellement générées par NLToSparqlConverter"""
+    client = MockFusekiClient()
+    query = NLToSparqlConverter().build_sparql_query(query_type)
+    rows = client.parse_results(client.query(query))
+    assert len(rows) == expected
+    assert all(row["nom"] for row in rows)
+
+def test_mock_client_update_is_visible():
+    client = MockFusekiClient()
+    client.update(f"""PREFIX eco: <{ONTOLOGY_NS}>
+INSERT DATA {{ eco:Oasis_Tozeur rdf:type eco:Destination ; eco:nom "Oasis de Tozeur" . }}""")
+    query = NLToSparqlConverter().build_sparql_query("destinations")
+    names = {row["nom"] for row in client.parse_results(client.query(query))}
+    assert "Oasis de Tozeur" in names
+    assert client.version == 1
+
+def test_ontology_snapshot_is_reused_until_source_changes(tmp_path, monkeypatch):
+    from config import ONTOLOGY_FILE, ONTOLOGY_SOURCE_NS
+    from services import rdf_loader
+    source = tmp_path / "onto.rdf"
+    source.write_bytes(open(ONTOLOGY_FILE, "rb").read())
+    snapshot = str(tmp_path / "onto.snapshot")
+    namespaces = {ONTOLOGY_SOURCE_NS: EX}
+
+    parsed = TripleStore()
+    assert rdf_loader.load_ontology(parsed, str(source), snapshot, namespaces) > 100
+    subclass = iri("http://www.w3.org/2000/01/rdf-schema#subClassOf")
+    assert iri(EX + "ActiviteTouristique") in parsed.objects(iri(EX + "ActiviteSportive"), subclass)
+
+    # Deuxième chargement: le XML n'est pas re-parsé
+    monkeypatch.setattr(rdf_loader, "parse_rdfxml", lambda path: pytest.fail("re-parse inattendu"))
+    mapped = TripleStore()
+    rdf_loader.load_ontology(mapped, str(source), snapshot, namespaces)
+    assert set(mapped.triples()) == set(parsed.triples())
+
+    # Fichier touché sans changement: un seul hachage, puis de nouveau le chemin rapide
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    rdf_loader.load_ontology(TripleStore(), str(source), snapshot, namespaces)
+    monkeypatch.setattr(rdf_loader, "file_sha256", lambda path: pytest.fail("re-hachage inattendu"))
+    rdf_loader.load_ontology(TripleStore(), str(source), snapshot, namespaces)
+    monkeypatch.undo()
+
+    # Contenu modifié: le snapshot est invalidé
+    source.write_text(source.read_text().replace("ActiviteSportive", "ActiviteNautique"))
+    changed = TripleStore()
+    rdf_loader.load_ontology(changed, str(source), snapshot, namespaces)
+    assert changed.lookup(iri(EX + "ActiviteNautique")) != -1
+
+def test_subclass_closure_drives_templates_and_scores():
+    from services.class_hierarchy import get_class_hierarchy
+    from services.recommendation_engine import RecommendationEngine
+    hierarchy = get_class_hierarchy()
+    assert hierarchy.is_subclass("Randonnee", "ActiviteTouristique")
+    assert ONTOLOGY_NS + "Musee" in hierarchy.subclasses("ActiviteTouristique")
+    assert not hierarchy.is_subclass("Spa", "Hebergement")
+    engine = RecommendationEngine(hierarchy=hierarchy)
+    # Musee absent de la matrice Adventure: score de ActiviteCulturelle
+    assert engine.calculate_match_score("Adventure", "Musee") == 30
+    assert engine.calculate_match_score("Culture", "Musee") == 95
+
+    # Une ressource typée uniquement par une sous-classe est trouvée
+    client = MockFusekiClient()
+    client.update(f"""PREFIX eco: <{ONTOLOGY_NS}>
+INSERT DATA {{ eco:Spa_Tozeur rdf:type eco:Spa ; eco:nom "Spa de Tozeur" . }}""")
+    rows = client.parse_results(client.query(NLToSparqlConverter().build_sparql_query("activites")))
+    assert len(rows) == 6 and {"Spa de Tozeur"} <= {row["nom"] for row in rows}
+
+def test_templates_bind_typed_params_and_paginate():
+    """Valeurs échappées, paramètres typés, pages par clé qui couvrent tout le catalogue"""
+    from services.class_hierarchy import get_class_hierarchy
+    from services.query_templates import TemplateRegistry, paginate
+    client = MockFusekiClient()
+    registry = TemplateRegistry(get_class_hierarchy())
+    run = lambda query: client.parse_results(client.query(query))
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = paginate(run(registry.render("destinations", limit=3, after=cursor)), "destination", 2)
+        seen += [row["nom"] for row in rows]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 5
+    assert [row["nom"] for row in run(registry.render("destinations", limit=2, offset=3))] == seen[3:5]
+
+    # Hébergement sur trois lignes (certifications multiples): aucune ligne perdue, par curseur ou par OFFSET
+    client.update(f"""PREFIX eco: <{ONTOLOGY_NS}>
+INSERT DATA {{ eco:Gite_Rural_Nomade eco:aCertification "EcoLabel", "Clef Verte" . }}""")
+    expected = sorted(map(str, run(registry.render("hebergements"))))
+    by_cursor, by_offset, cursor, offset = [], [], None, 0
+    while True:
+        rows, cursor = paginate(run(registry.render("hebergements", limit=4, after=cursor)), "hebergement", 3)
+        by_cursor += rows
+        if cursor is None:
+            break
+    while True:
+        rows, more = paginate(run(registry.render("hebergements", limit=4, offset=offset)), "hebergement", 3)
+        by_offset += rows
+        if more is None:
+            break
+        offset += len(rows)
+    assert len(expected) == 7 and sorted(map(str, by_cursor)) == sorted(map(str, by_offset)) == expected
+
+    assert run(registry.render("destinations_region", {"region": 'Djerba" || true || "'})) == []
+    cultural = run(registry.render("activites", {"type": "culturelle", "max_co2": "1"}))
+    assert [row["nom"] for row in cultural] == ["Visite Artisans Médina"]
+    certified = run(registry.render("hebergements", {"certification": "GreenGlobe", "region": "Douz"}))
+    assert [row["nom"] for row in certified] == ["Gîte Rural Nomade"]
+    for invalid in ({"type": "Hotel"}, {"max_co2": "nan"}, {"region": "Djerba"}):
+        with pytest.raises(ValueError):
+            registry.render("activites", invalid)
@@ -0,0 +1,49 @@
+import json
+import time
+import pytest
+from config import ONTOLOGY_NS
+from services.write_buffer import WriteBehindBuffer, BufferFull
+
+def _count_avis(mock):
+    rows = mock.parse_results(mock.query(f"PREFIX eco: <{ONTOLOGY_NS}> SELECT (COUNT(?a) AS ?n) WHERE {{ ?a a eco:Avis }}"))
+    return int(rows[0]["n"])
+
+def test_write_behind_buffer_retries_replays_and_applies_backpressure(tmp_path, stub_client):
+    """Lot en échec remis en file; journal rejoué au redémarrage; file pleine -> BufferFull"""
+    journal = str(tmp_path / "journal.ndjson")
+    client = stub_client(failures=10 ** 6)  # panne: rien n'est écarté
+    buffer = WriteBehindBuffer(client, journal, max_batch=10, flush_interval=0.01, max_pending=3, max_retries=1, retry_backoff=0.001)
+    for i in range(3):
+        buffer.submit(f"a{i}", f'eco:avis_{i} rdf:type eco:Avis ; eco:commentaire "n°{i}" .')
+    with pytest.raises(BufferFull):
+        buffer.submit("a3", "eco:avis_3 rdf:type eco:Avis .", timeout=0.05)
+    assert not buffer.stop(timeout=1)
+    stats = buffer.stats()
+    assert stats["queue_depth"] == 3 and stats["failed_batches"] >= 1 and stats["rejected"] == 1
+    assert stats["batches"] == 0 and stats["dead_lettered"] == 0 and "indisponible" in stats["last_error"]
+
+    # Redémarrage: les trois avis non confirmés sont rejoués en un seul INSERT DATA
+    client = stub_client()
+    replayed = WriteBehindBuffer(client, journal, max_batch=10, flush_interval=0.01)
+    deadline = time.monotonic() + 2
+    while replayed.stats()["flushed"] < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert replayed.stats()["replayed"] == 3 and len(client.updates) == 1
+    assert client.updates[0].count("INSERT DATA") == 1 and _count_avis(client.mock) == 3
+    assert replayed.stop() and open(journal).read() == ""
+
+def test_write_behind_buffer_dead_letters_a_rejected_record(tmp_path, stub_client):
+    """Un enregistrement refusé est isolé par dichotomie et écarté; les autres passent"""
+    client = stub_client(reject="eco:invalide")
+    buffer = WriteBehindBuffer(client, str(tmp_path / "journal.ndjson"), max_batch=8, flush_interval=0.01, max_retries=1, retry_backoff=0.001)
+    for i in range(5):
+        buffer.submit(f"a{i}", "eco:invalide ." if i == 2 else f"eco:avis_{i} rdf:type eco:Avis .")
+    deadline = time.monotonic() + 5
+    while buffer.stats()["queue_depth"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stats = buffer.stats()
+    assert (stats["queue_depth"], stats["flushed"], stats["dead_lettered"]) == (0, 4, 1)
+    assert _count_avis(client.mock) == 4
+    dead = [json.loads(line) for line in open(buffer.dead_letter_path)]
+    assert [d["id"] for d in dead] == ["a2"] and "400" in dead[0]["error"]
+    assert buffer.stop() and open(buffer.journal_path).read() == ""
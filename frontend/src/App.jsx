@@ -11,6 +11,8 @@ import Statistics from './components/Statistics'
 import Recommendations from './components/Recommendations'
 
 const API_BASE_URL = 'http://localhost:8000'
+const DATASETS = ['destinations', 'hebergements', 'activites', 'certifications']
+const PAGE_SIZE = 1000 // MAX_PAGE_SIZE du backend
 
 function App() {
   const [activeTab, setActiveTab] = useState('dashboard')
@@ -27,19 +29,37 @@ function App() {
     const fetchData = async () => {
       try {
         setLoading(true)
-        const [destRes, hebRes, activRes, certRes, statsRes] = await Promise.all([
-          axios.get(`${API_BASE_URL}/destinations`),
-          axios.get(`${API_BASE_URL}/hebergements`),
-          axios.get(`${API_BASE_URL}/activites`),
-          axios.get(`${API_BASE_URL}/certifications`),
-          axios.get(`${API_BASE_URL}/stats`)
-        ])
+        // Un seul aller-retour: le backend exécute les requêtes en parallèle
+        const batchRes = await axios.post(`${API_BASE_URL}/batch`, {
+          items: [
+            ...DATASETS.map((template) => ({ id: template, template, limit: PAGE_SIZE })),
+            { id: 'statistiques', template: 'statistiques' }
+          ]
+        })
+        const results = Object.fromEntries(batchRes.data.results.map((item) => [item.id, item]))
+        const rows = Object.fromEntries(DATASETS.map((template) => [template, results[template]?.results || []]))
 
-        setDestinations(destRes.data.destinations || [])
-        setHebergements(hebRes.data.hebergements || [])
-        setActivites(activRes.data.activites || [])
-        setCertifications(certRes.data.certifications || [])
-        setStats(statsRes.data.statistics || {})
+        // Pages suivantes (next_cursor): un lot par tour pour les catalogues encore incomplets
+        const nextPage = (item) => ({ id: item.id, template: item.id, limit: PAGE_SIZE, after: item.next_cursor })
+        let pending = DATASETS.map((template) => results[template]).filter((item) => item?.next_cursor).map(nextPage)
+        while (pending.length) {
+          const pageRes = await axios.post(`${API_BASE_URL}/batch`, { items: pending })
+          pending = []
+          for (const item of pageRes.data.results) {
+            if (item.error) {
+              console.error(`Page suivante de ${item.id}:`, item.error)
+              continue
+            }
+            rows[item.id].push(...item.results)
+            if (item.next_cursor) pending.push(nextPage(item))
+          }
+        }
+
+        setDestinations(rows.destinations)
+        setHebergements(rows.hebergements)
+        setActivites(rows.activites)
+        setCertifications(rows.certifications)
+        setStats(results.statistiques?.results?.[0] || {})
         setError(null)
       } catch (err) {
         console.error('Erreur lors du chargement des données:', err)